@@ -1,12 +1,6 @@
-import uvicorn
-
 from app.aplication import app
+from app.server import main
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="debug"
-    ) 
\ No newline at end of file
+    # Production serving by default; pass --reload for the development server
+    main()
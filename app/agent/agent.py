@@ -1,46 +1,308 @@
-from typing import Dict, Any
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from langgraph.graph import StateGraph, START, END
+from langgraph.graph.state import CompiledStateGraph
 
+from app.agent.memory import ConversationMemory, get_memory_store
 from app.agent.nodes import Nodes
+from app.agent.openai_service import llm_calls
 from app.agent.schema import State
 from app.core import logger
+from app.core.logging import clip
+from app.core.metrics import node_seconds, request_seconds, timed
+from app.core.config import get_settings
+from app.tools.todoist.client import api_calls, current_token
+from app.tools.todoist.tasks import TodoistTools
 
 class Agent:
-    
+    # Skompilowany graf współdzielony przez wszystkie żądania w procesie
+    _workflow: Optional[CompiledStateGraph] = None
+    _lock = threading.Lock()
+    _stats: Dict[str, float] = {
+        "compile_seconds": 0.0,
+        "compiles": 0,
+        "requests": 0,
+        "graph_overhead_seconds_total": 0.0,
+    }
+    # Latency i tokeny w podziale na tryb pracy grafu
+    _mode_stats: Dict[str, Dict[str, float]] = {}
+
     def __init__(self, config: Dict[str, Any] = None):
         """
         Inicjalizacja agenta.
-        
+
         Args:
             config: Konfiguracja agenta
         """
         self.config = config or {}
-        self.workflow = self._create_workflow()
+        self.workflow = self.get_workflow()
 
-    def _create_workflow(self) -> StateGraph:
+    @staticmethod
+    def _create_workflow() -> CompiledStateGraph:
         """
         Tworzy graf przepływu pracy agenta.
         """
         workflow = StateGraph(State)
-        
-        # Dodanie węzłów
-        workflow.add_node("understand", Nodes.understand_node)
-        workflow.add_node("execute", Nodes.execute_tool_node)
-        workflow.add_node("finalize", Nodes.finalizer_node)
+
+        # Dodanie węzłów; czas każdego uruchomienia trafia do metryk
+        workflow.add_node("plan", timed(node_seconds, "node", "plan")(Nodes.plan_node))
+        workflow.add_node("understand", timed(node_seconds, "node", "understand")(Nodes.understand_node))
+        workflow.add_node("execute", timed(node_seconds, "node", "execute")(Nodes.execute_tool_node))
+        workflow.add_node("finalize", timed(node_seconds, "node", "finalize")(Nodes.finalizer_node))
         # Dodanie krawędzi
-        workflow.add_edge(START, "understand")
+        workflow.add_conditional_edges(START, Nodes.mode_router, ["plan", "understand"])
+        workflow.add_conditional_edges("plan", Nodes.plan_router, ["understand", "finalize"])
         workflow.add_conditional_edges("understand", Nodes.decision_router, ["execute", "finalize"])
         workflow.add_conditional_edges("execute", Nodes.decision_router, ["execute", "finalize"])
         workflow.add_edge("finalize", END)
-        
+
         return workflow.compile()
-    
-    @classmethod
-    async def process(cls, input: str) -> str:
-        agent = cls()
-        workflow = agent._create_workflow()
-        state = State(input=input)
-        logger.info(f"State: {state}")
-        result = await workflow.ainvoke(state)
+
+    @classmethod
+    def _compile(cls) -> CompiledStateGraph:
+        started = time.perf_counter()
+        workflow = cls._create_workflow()
+        elapsed = time.perf_counter() - started
+        cls._stats["compile_seconds"] = elapsed
+        cls._stats["compiles"] += 1
+        logger.info(f"Agent workflow compiled in {elapsed * 1000:.1f} ms")
+        return workflow
+
+    @classmethod
+    def get_workflow(cls) -> CompiledStateGraph:
+        """
+        Zwraca skompilowany graf, kompilując go przy pierwszym użyciu.
+        """
+        if cls._workflow is None:
+            with cls._lock:
+                if cls._workflow is None:
+                    cls._workflow = cls._compile()
+        return cls._workflow
+
+    @classmethod
+    def reload(cls) -> CompiledStateGraph:
+        """
+        Kompiluje graf od nowa i podmienia go atomowo.
+
+        Żądania w trakcie wykonania kończą się na poprzedniej instancji grafu.
+        """
+        workflow = cls._compile()
+        with cls._lock:
+            cls._workflow = workflow
+        return workflow
+
+    @classmethod
+    def stats(cls) -> Dict[str, float]:
+        requests = cls._stats["requests"]
+        overhead_total = cls._stats["graph_overhead_seconds_total"]
+        return {
+            "compile_ms": cls._stats["compile_seconds"] * 1000,
+            "compiles": cls._stats["compiles"],
+            "requests": requests,
+            "avg_graph_overhead_ms": (overhead_total / requests * 1000) if requests else 0.0,
+            "modes": {
+                mode: {
+                    "requests": stats["requests"],
+                    "fallbacks": stats["fallbacks"],
+                    "avg_latency_ms": stats["latency_seconds_total"] / stats["requests"] * 1000,
+                    "avg_llm_calls": stats["llm_calls"] / stats["requests"],
+                    "avg_prompt_tokens": stats["prompt_tokens"] / stats["requests"],
+                    "avg_completion_tokens": stats["completion_tokens"] / stats["requests"],
+                    "avg_todoist_calls": stats["todoist_calls"] / stats["requests"],
+                }
+                for mode, stats in cls._mode_stats.items()
+            },
+        }
+
+    @classmethod
+    def _record_usage(
+        cls, mode: str, latency: float, calls: List[Dict[str, Any]], todoist_calls: List[str], fallback: bool
+    ) -> Dict[str, Any]:
+        """
+        Zapisuje latency i zużycie tokenów żądania, zwraca podsumowanie do odpowiedzi.
+        """
+        usage = {
+            "mode": mode,
+            "fallback": fallback,
+            "latency_ms": round(latency * 1000, 1),
+            "llm_calls": len(calls),
+            "prompt_tokens": sum(call["prompt_tokens"] for call in calls),
+            "completion_tokens": sum(call["completion_tokens"] for call in calls),
+            "calls": calls,
+            "todoist_calls": len(todoist_calls),
+            "todoist_endpoints": {endpoint: todoist_calls.count(endpoint) for endpoint in sorted(set(todoist_calls))},
+        }
+        stats = cls._mode_stats.setdefault(mode, {
+            "requests": 0, "fallbacks": 0, "latency_seconds_total": 0.0,
+            "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "todoist_calls": 0,
+        })
+        request_seconds.observe(latency, mode)
+        stats["requests"] += 1
+        stats["fallbacks"] += int(fallback)
+        stats["latency_seconds_total"] += latency
+        stats["llm_calls"] += usage["llm_calls"]
+        stats["prompt_tokens"] += usage["prompt_tokens"]
+        stats["completion_tokens"] += usage["completion_tokens"]
+        stats["todoist_calls"] += usage["todoist_calls"]
+        return usage
+
+    @classmethod
+    def _prepare(
+        cls,
+        input: str,
+        mode: Optional[str],
+        llm_summary: bool,
+        stream: bool = False,
+        todoist_token: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+    ) -> Tuple[CompiledStateGraph, State]:
+        """
+        Pobiera graf, zapisuje narzut i buduje stan początkowy żądania.
+        """
+        started = time.perf_counter()
+        workflow = cls.get_workflow()
+        overhead = time.perf_counter() - started
+        cls._stats["requests"] += 1
+        cls._stats["graph_overhead_seconds_total"] += overhead
+        logger.debug("Graph overhead: {:.3f} ms", overhead * 1000)
+
+        mode = mode or get_settings().AGENT_MODE
+        state = State(
+            input=input,
+            mode=mode,
+            llm_summary=llm_summary,
+            stream=stream,
+            todoist_token=todoist_token,
+            conversation_id=conversation_id,
+        )
+        logger.info("State: {}", clip(dict(state)))
+        return workflow, state
+
+    @staticmethod
+    def _bind_request(state: State, calls: List[Dict[str, Any]], todoist_calls: List[str]) -> Tuple:
+        """
+        Ustawia kontekst żądania: listy wywołań LLM i Todoist oraz konto Todoist ze stanu.
+        """
+        token = state.todoist_token.get_secret_value() if state.todoist_token else None
+        return llm_calls.set(calls), api_calls.set(todoist_calls), current_token.set(token)
+
+    @staticmethod
+    def _unbind_request(tokens: Tuple) -> None:
+        calls_token, todoist_calls_token, account_token = tokens
+        llm_calls.reset(calls_token)
+        api_calls.reset(todoist_calls_token)
+        current_token.reset(account_token)
+
+    @staticmethod
+    async def _load_memory(state: State) -> Optional[ConversationMemory]:
+        """
+        Wczytuje pamięć rozmowy do stanu. Klucz zawiera konto Todoist, więc rozmowy
+        różnych kont się nie mieszają. Wywoływane po _bind_request.
+        """
+        store = get_memory_store()
+        if store is None or not state.conversation_id:
+            return None
+        memory = await store.load(f"{TodoistTools().user_key}:{state.conversation_id}")
+        state.memory = memory.render()
+        return memory
+
+    @staticmethod
+    async def _save_memory(memory: Optional[ConversationMemory], input: str, tool_calls: List[Dict[str, Any]]) -> None:
+        store = get_memory_store()
+        if store is None or memory is None:
+            return
+        memory.record(input, tool_calls)
+        await store.save(memory)
+
+    @classmethod
+    async def process(
+        cls,
+        input: str,
+        mode: Optional[str] = None,
+        llm_summary: bool = False,
+        todoist_token: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Uruchamia graf dla jednego żądania.
+
+        Args:
+            todoist_token: Token Todoist użytkownika; bez niego używane jest konto z konfiguracji
+            conversation_id: Identyfikator rozmowy; jej pamięć trafia do promptów, a wynik jest do niej dopisywany
+        """
+        started = time.perf_counter()
+        workflow, state = cls._prepare(
+            input, mode, llm_summary, todoist_token=todoist_token, conversation_id=conversation_id
+        )
+        calls: List[Dict[str, Any]] = []
+        todoist_calls: List[str] = []
+        tokens = cls._bind_request(state, calls, todoist_calls)
+        try:
+            memory = await cls._load_memory(state)
+            result = await workflow.ainvoke(state)
+            await cls._save_memory(memory, input, result["tool_calls"])
+        finally:
+            cls._unbind_request(tokens)
+        # Token nie może trafić do odpowiedzi, a pamięć rozmowy jest tylko kontekstem promptów
+        result.pop("todoist_token", None)
+        result.pop("memory", None)
+        result["usage"] = cls._record_usage(
+            state.mode, time.perf_counter() - started, calls, todoist_calls, result.get("plan_failed", False)
+        )
         return result
+
+    @classmethod
+    async def stream(
+        cls,
+        input: str,
+        mode: Optional[str] = None,
+        llm_summary: bool = False,
+        todoist_token: Optional[str] = None,
+        conversation_id: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Uruchamia graf i zwraca zdarzenia w trakcie jego wykonania.
+
+        Zdarzenia:
+            understanding: wynik węzła understand (understanding i steps)
+            tool_result: każde wywołanie narzędzia z węzłów plan/execute, zaraz po jego zakończeniu
+            token: fragment raportu końcowego z finalizera
+            final: final_response i usage, zawsze jako ostatnie zdarzenie
+        """
+        started = time.perf_counter()
+        workflow, state = cls._prepare(
+            input, mode, llm_summary, stream=True, todoist_token=todoist_token, conversation_id=conversation_id
+        )
+        calls: List[Dict[str, Any]] = []
+        todoist_calls: List[str] = []
+        tokens = cls._bind_request(state, calls, todoist_calls)
+        try:
+            memory = await cls._load_memory(state)
+            result = state.model_dump()
+            # Tool calls the running node has already streamed; they are not repeated from its update
+            streamed = 0
+            async for kind, chunk in workflow.astream(state, stream_mode=["updates", "custom"]):
+                if kind == "custom":
+                    if chunk["event"] == "tool_result":
+                        streamed += 1
+                    yield chunk
+                    continue
+                for node, update in chunk.items():
+                    if not update:
+                        continue
+                    seen = len(result["tool_calls"])
+                    result.update(update)
+                    if node == "understand":
+                        yield {"event": "understanding", "understanding": result["understanding"], "steps": result["steps"]}
+                    for tool_call in result["tool_calls"][seen + streamed:]:
+                        yield {"event": "tool_result", "node": node, "tool_call": tool_call}
+                    streamed = 0
+            await cls._save_memory(memory, input, result["tool_calls"])
+        finally:
+            cls._unbind_request(tokens)
+        usage = cls._record_usage(
+            state.mode, time.perf_counter() - started, calls, todoist_calls, result.get("plan_failed", False)
+        )
+        yield {"event": "final", "final_response": result["final_response"], "usage": usage}
@@ -0,0 +1,313 @@
+import asyncio
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.agent.openai_service import llm_call_stats
+from app.agent.prompts import execute_prompt, execute_tools_prompt
+from app.agent.schema.response import ExecuteResponse
+from app.agent import tools  # noqa: F401 - registers the agent tools
+from app.agent.registry import registry
+from app.core.config import get_settings
+from app.core.logging import clip
+from app.tools.todoist.tasks import TodoistTools
+
+MUTATING_STEPS = ("add", "update", "complete", "delete")
+READING_STEPS = ("list", "get")
+
+READING_TOOLS = ("get_", "search_")
+
+# Consecutive calls of these tools on the same task are merged into one request
+COALESCED_TOOLS = ("update_todoist_task",)
+
+QUOTED = re.compile(r"['\"]([^'\"]{3,})['\"]")
+
+# LLM call name of the execute step per tool-calling mode
+CALL_NAMES = {"json": "execute", "native": "execute_native"}
+
+
+class ExecutionStats:
+    """Planned steps per tool-calling mode and how many answers could not be parsed"""
+
+    def __init__(self):
+        self.plans = {mode: 0 for mode in CALL_NAMES}
+        self.parse_failures = {mode: 0 for mode in CALL_NAMES}
+
+    def record(self, mode: str, parse_failed: bool = False) -> None:
+        self.plans[mode] += 1
+        self.parse_failures[mode] += int(parse_failed)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        calls = llm_call_stats()
+        return {
+            mode: {
+                "plans": self.plans[mode],
+                "parse_failures": self.parse_failures[mode],
+                "parse_failure_rate": self.parse_failures[mode] / self.plans[mode] if self.plans[mode] else 0.0,
+                "avg_prompt_tokens": calls.get(name, {}).get("avg_prompt_tokens", 0.0),
+                "avg_completion_tokens": calls.get(name, {}).get("avg_completion_tokens", 0.0),
+            }
+            for mode, name in CALL_NAMES.items()
+        }
+
+
+execution_stats = ExecutionStats()
+
+
+def step_kind(step: str) -> str:
+    """Category of a step produced by Nodes._prepare_steps ("add: ..." -> "add")"""
+    return step.split(":", 1)[0].strip()
+
+
+def step_dependencies(steps: List[str]) -> List[List[int]]:
+    """
+    Indices of the steps each step has to wait for.
+
+    - list/get steps read the workspace, so they wait for every mutating step
+    - update/complete/delete steps wait for an add step when they mention a title it creates
+    - everything else is independent
+    """
+    dependencies: List[List[int]] = []
+    for i, step in enumerate(steps):
+        kind = step_kind(step)
+        deps = []
+        for j, other in enumerate(steps):
+            if i == j:
+                continue
+            other_kind = step_kind(other)
+            if kind in READING_STEPS and other_kind in MUTATING_STEPS:
+                deps.append(j)
+            elif kind in MUTATING_STEPS and kind != "add" and other_kind == "add" and _mentions_created_task(step, other):
+                deps.append(j)
+        dependencies.append(deps)
+    return dependencies
+
+
+def _mentions_created_task(step: str, add_step: str) -> bool:
+    step_lower = step.lower()
+    return any(title.lower() in step_lower for title in QUOTED.findall(add_step))
+
+
+def execution_waves(steps: List[str]) -> List[List[int]]:
+    """Group steps into waves; a wave only depends on the waves before it"""
+    dependencies = step_dependencies(steps)
+    level: Dict[int, int] = {}
+
+    def resolve(i: int, seen: Tuple[int, ...] = ()) -> int:
+        if i not in level:
+            parents = [d for d in dependencies[i] if d not in seen]
+            level[i] = 1 + max((resolve(d, seen + (i,)) for d in parents), default=-1)
+        return level[i]
+
+    for i in range(len(steps)):
+        resolve(i)
+    waves: List[List[int]] = [[] for _ in range(max(level.values(), default=-1) + 1)]
+    for i in range(len(steps)):
+        waves[level[i]].append(i)
+    return waves
+
+
+async def plan_step(
+    llm, step: str, tool_descriptions: str, mode: str = "json", memory: str = ""
+) -> Tuple[List[ExecuteResponse], Optional[str]]:
+    """Ask the LLM which tool calls a single step needs. Returns the actions or an error message."""
+    if mode == "native":
+        return await plan_step_native(llm, step, memory)
+    system_prompt = await execute_prompt(tool_descriptions, step, memory)
+    # Read before the next await, so the version matches the workspace shown in the prompt
+    workspace_version = TodoistTools.workspace_version()
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"User intent: {step}"}
+    ]
+    config = {
+        "messages": messages,
+        "jsonMode": True,
+        "name": CALL_NAMES["json"],
+        "workspace_version": workspace_version,
+    }
+    response = await llm.completion(config)
+    try:
+        execution_plan = json.loads(response)
+        logger.info("Execution plan: {}", clip(execution_plan))
+        if isinstance(execution_plan, dict) and execution_plan.get("error"):
+            execution_stats.record("json")
+            return [], execution_plan.get("info")
+        if isinstance(execution_plan, dict):
+            execution_plan = [execution_plan]
+        actions = [ExecuteResponse(**plan) for plan in execution_plan]
+    except (TypeError, ValueError):
+        execution_stats.record("json", parse_failed=True)
+        raise
+    execution_stats.record("json")
+    return actions, None
+
+
+async def plan_step_native(llm, step: str, memory: str = "") -> Tuple[List[ExecuteResponse], Optional[str]]:
+    """
+    Plan a step with native function calling: the registered tool schemas are passed to the
+    provider and its tool calls become the actions. A reply without tool calls is the error message.
+    """
+    system_prompt = await execute_tools_prompt(step, memory)
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"User intent: {step}"}
+    ]
+    config = {
+        "messages": messages,
+        "name": CALL_NAMES["native"],
+        "tools": registry.schemas,
+    }
+    response = await llm.completion(config, only_content=False)
+    message = response.choices[0].message
+    if not message.tool_calls:
+        execution_stats.record("native")
+        return [], message.content or "No tool matches this step"
+    try:
+        actions = [
+            ExecuteResponse(tool_name=call.function.name, arguments=json.loads(call.function.arguments or "{}"))
+            for call in message.tool_calls
+        ]
+    except (TypeError, ValueError):
+        execution_stats.record("native", parse_failed=True)
+        raise
+    logger.info("Execution plan: {}", clip(actions))
+    execution_stats.record("native")
+    return actions, None
+
+
+def coalesce_runs(planned: List[Tuple[str, ExecuteResponse]], indices: List[int]) -> List[List[int]]:
+    """
+    Split the actions on one task into runs executed as a single call each.
+
+    Consecutive updates of the task form one run; their fields are merged and later
+    values win, so several edits become one request. Every other action runs alone.
+    """
+    runs: List[List[int]] = []
+    for i in indices:
+        name = planned[i][1].tool_name
+        if runs and name in COALESCED_TOOLS and planned[runs[-1][-1]][1].tool_name == name:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+    return runs
+
+
+async def run_actions(
+    planned: List[Tuple[str, ExecuteResponse]],
+    semaphore: asyncio.Semaphore,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run (step, action) pairs concurrently. Actions on the same task keep their order,
+    and consecutive updates of a task are sent as one call (see coalesce_runs).
+    Arguments are checked against the tool's argument model before the call.
+    on_result is called with each tool call as soon as it finishes or fails.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(planned)
+    groups: Dict[str, List[int]] = {}
+    for i, (_, action) in enumerate(planned):
+        key = action.arguments.get("task_id") or f"action-{i}"
+        groups.setdefault(str(key), []).append(i)
+
+    def done(i: int, result: Dict[str, Any]) -> None:
+        results[i] = result
+        if on_result is not None:
+            on_result(result)
+
+    def fail(i: int, error: Exception) -> None:
+        step, action = planned[i]
+        done(i, {"step": step, "error": f"Tool {action.tool_name} failed: {error}"})
+        logger.error(f"Error executing tool: {error}")
+
+    async def run(indices: List[int]) -> None:
+        tool_name = planned[indices[0]][1].tool_name
+        arguments: Dict[str, Any] = {}
+        valid = []
+        for i in indices:
+            try:
+                arguments.update(registry.get(tool_name).validate(planned[i][1].arguments))
+                valid.append(i)
+            except Exception as e:
+                fail(i, e)
+        if not valid:
+            return
+        if len(valid) > 1:
+            logger.info("Coalesced {} {} calls on task {}", len(valid), tool_name, arguments.get("task_id"))
+        try:
+            async with semaphore:
+                result = await registry.get(tool_name)(**arguments)
+        except Exception as e:
+            for i in valid:
+                fail(i, e)
+            return
+        for i in valid:
+            done(i, {"step": planned[i][1].model_dump(), "result": result})
+            logger.info("Tool response: {}", clip(results[i]))
+
+    async def run_group(indices: List[int]) -> None:
+        for run_indices in coalesce_runs(planned, indices):
+            await run(run_indices)
+
+    await asyncio.gather(*(run_group(indices) for indices in groups.values()))
+    return results
+
+
+async def execute_steps(
+    llm, steps: List[str], memory: str = "", on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Plan and execute all steps, running independent steps concurrently.
+    EXECUTE_TOOL_CALLING picks JSON-mode planning or native function calling.
+
+    Steps are processed in dependency waves. Within a wave every step is planned with one
+    concurrent LLM call each, then all planned actions run together under
+    EXECUTE_MAX_CONCURRENCY. Tool calls on the same task run in step order.
+    Results are returned in step order. memory is the rendered conversation memory
+    shown to the planner, so follow-ups can refer to earlier tasks. on_result is called
+    with every tool call and planning error as soon as it is known (see run_actions).
+    """
+    settings = get_settings()
+    mode = settings.EXECUTE_TOOL_CALLING
+    tool_descriptions = registry.descriptions
+    plan_semaphore = asyncio.Semaphore(settings.PLAN_MAX_CONCURRENCY)
+    tool_semaphore = asyncio.Semaphore(settings.EXECUTE_MAX_CONCURRENCY)
+    results: Dict[int, List[Dict[str, Any]]] = {}
+
+    async def plan(step: str) -> Tuple[List[ExecuteResponse], Optional[str]]:
+        async with plan_semaphore:
+            try:
+                return await plan_step(llm, step, tool_descriptions, mode, memory)
+            except Exception as e:
+                logger.error(f"Error planning step: {e}")
+                return [], f"Could not plan step: {e}"
+
+    for wave in execution_waves(steps):
+        plans = await asyncio.gather(*(plan(steps[i]) for i in wave))
+        planned: List[Tuple[str, ExecuteResponse]] = []
+        owners: List[int] = []
+        for i, (actions, error) in zip(wave, plans):
+            results[i] = [{"step": steps[i], "error": error}] if error else []
+            if error and on_result is not None:
+                on_result(results[i][0])
+            planned.extend((steps[i], action) for action in actions)
+            owners.extend([i] * len(actions))
+        # All actions of a wave run together; owners map results back to their steps
+        for i, result in zip(owners, await run_actions(planned, tool_semaphore, on_result)):
+            results[i].append(result)
+
+    return [result for i in range(len(steps)) for result in results[i]]
+
+
+async def execute_plan(
+    actions: List[ExecuteResponse], step: str, on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Run a complete plan: changes first, then listing, detail and search reads so they see the changes.
+    """
+    semaphore = asyncio.Semaphore(get_settings().EXECUTE_MAX_CONCURRENCY)
+    writes = [(step, action) for action in actions if not action.tool_name.startswith(READING_TOOLS)]
+    reads = [(step, action) for action in actions if action.tool_name.startswith(READING_TOOLS)]
+    return await run_actions(writes, semaphore, on_result) + await run_actions(reads, semaphore, on_result)
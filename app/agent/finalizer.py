@@ -0,0 +1,129 @@
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+def _is_success(result: Any) -> bool:
+    if isinstance(result, list):
+        return True
+    return isinstance(result, dict) and result.get("success") is True
+
+
+def _task_lines(tasks: List[Dict[str, Any]]) -> str:
+    if not tasks:
+        return "Brak zadań."
+    return "\n".join(
+        f'  - {t["content"]}' + (f' (termin: {t["due"]})' if t.get("due") else "")
+        for t in tasks
+    )
+
+
+def _created(arguments: Dict[str, Any], result: Any) -> str:
+    return f'Utworzono zadanie "{result.get("content", arguments.get("title"))}".'
+
+
+def _named(template: str) -> Callable[[Dict[str, Any], Any], Optional[str]]:
+    # A bare task ID means nothing to the user; without the title the LLM writes the summary
+    def render(arguments: Dict[str, Any], result: Any) -> Optional[str]:
+        title = result.get("content")
+        return template.format(title=title) if title else None
+    return render
+
+
+def _bulk(action: str) -> Callable[[Dict[str, Any], Any], str]:
+    def render(arguments: Dict[str, Any], result: Any) -> str:
+        return f'{action} zadania: {len(result["results"])}.'
+    return render
+
+
+def _listed_tasks(arguments: Dict[str, Any], result: Any) -> str:
+    return f"Zadania ({len(result)}):\n{_task_lines(result)}"
+
+
+def _listed_projects(arguments: Dict[str, Any], result: Any) -> str:
+    names = ", ".join(p["name"] for p in result) or "brak"
+    return f"Projekty ({len(result)}): {names}"
+
+
+TEMPLATES: Dict[str, Callable[[Dict[str, Any], Any], Optional[str]]] = {
+    "create_todoist_task": _created,
+    "complete_todoist_task": _named('Oznaczono zadanie "{title}" jako wykonane.'),
+    "update_todoist_task": _named('Zaktualizowano zadanie "{title}".'),
+    "reopen_todoist_task": _named('Przywrócono zadanie "{title}".'),
+    "delete_todoist_task": _named('Usunięto zadanie "{title}".'),
+    "bulk_create_todoist_tasks": _bulk("Utworzono"),
+    "bulk_complete_todoist_tasks": _bulk("Oznaczono jako wykonane"),
+    "bulk_update_todoist_tasks": _bulk("Zaktualizowano"),
+    "bulk_delete_todoist_tasks": _bulk("Usunięto"),
+    "get_todoist_tasks": _listed_tasks,
+    "get_active_todoist_tasks": _listed_tasks,
+    "search_todoist_tasks": _listed_tasks,
+    "get_todoist_projects": _listed_projects,
+}
+
+
+def render_summary(tool_calls: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Render the final report without the LLM when the outcome is simple.
+
+    Returns None for outcomes that need the LLM finalizer: any error, a failed tool
+    result (listing tools return an error result when Todoist cannot be read), a tool
+    without a template or a task whose title is unknown.
+    """
+    lines = []
+    for call in tool_calls:
+        step = call.get("step")
+        if "error" in call or not isinstance(step, dict) or not _is_success(call.get("result")):
+            return None
+        template = TEMPLATES.get(step.get("tool_name"))
+        if template is None:
+            return None
+        line = template(step.get("arguments", {}), call["result"])
+        if line is None:
+            return None
+        lines.append(line)
+
+    summary = "\n".join(f"- {line}" for line in lines) or "Nie było potrzeby wykonywania żadnych działań."
+    return f"**Podsumowanie**:\n{summary}\n\n**Problemy i błędy**:\n- Brak"
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+class FinalizerStats:
+    """How often the fast path is taken and how much latency it saves"""
+
+    def __init__(self, window: int = 1000):
+        self.fast_path = 0
+        self.llm = 0
+        self._fast_latencies: Deque[float] = deque(maxlen=window)
+        self._llm_latencies: Deque[float] = deque(maxlen=window)
+
+    def record_fast_path(self, latency: float) -> None:
+        self.fast_path += 1
+        self._fast_latencies.append(latency)
+
+    def record_llm(self, latency: float) -> None:
+        self.llm += 1
+        self._llm_latencies.append(latency)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.fast_path + self.llm
+        fast, llm = list(self._fast_latencies), list(self._llm_latencies)
+        return {
+            "fast_path": self.fast_path,
+            "llm": self.llm,
+            "fast_path_ratio": self.fast_path / total if total else 0.0,
+            "llm_p50_ms": _percentile(llm, 50) * 1000,
+            "llm_p95_ms": _percentile(llm, 95) * 1000,
+            "fast_path_p50_ms": _percentile(fast, 50) * 1000,
+            "fast_path_p95_ms": _percentile(fast, 95) * 1000,
+            "saved_p50_ms": max(0.0, _percentile(llm, 50) - _percentile(fast, 50)) * 1000 if llm else 0.0,
+            "saved_p95_ms": max(0.0, _percentile(llm, 95) - _percentile(fast, 95)) * 1000 if llm else 0.0,
+        }
+
+
+finalizer_stats = FinalizerStats()
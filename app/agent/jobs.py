@@ -0,0 +1,502 @@
+"""
+Asynchronous chat jobs: /chat/jobs enqueues a request and returns its ID at once,
+agent workers run it, and the client polls for the result.
+
+Workers run in the API process (JOBS_WORKERS) or in separate processes sharing the
+SQLite queue:
+
+    python -m app.agent.jobs
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core import logger, metrics
+from app.core.config import get_settings
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+# A job is not re-run after it was interrupted: it may already have changed tasks in Todoist
+INTERRUPTED = "Interrupted before it finished; submit it again to retry"
+
+
+class JobQueueFull(Exception):
+    """JOBS_MAX_QUEUED jobs, or JOBS_MAX_QUEUED_PER_TENANT jobs of this tenant, are already waiting"""
+
+
+@dataclass
+class Job:
+    id: str
+    tenant: str
+    request: Dict[str, Any]
+    token: Optional[str] = field(default=None, repr=False)
+    status: str = QUEUED
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public view of the job; the tenant and its token are never returned"""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class InMemoryJobQueue:
+    """
+    Process-local queue with one FIFO per tenant.
+
+    claim serves tenants round-robin and skips those already running max_per_tenant
+    jobs, so one busy account cannot starve the others. Finished jobs are kept for
+    result_ttl seconds. Jobs die with the process, so claims need no lease.
+    """
+
+    lease: Optional[float] = None
+
+    def __init__(self, max_queued: int, max_queued_per_tenant: int, result_ttl: float):
+        self.max_queued = max_queued
+        self.max_queued_per_tenant = max_queued_per_tenant
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._queued: "OrderedDict[str, Deque[Job]]" = OrderedDict()
+        self._running: Dict[str, int] = {}
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+
+    async def put(self, job: Job) -> None:
+        waiting = self._queued.get(job.tenant, ())
+        if self.depth >= self.max_queued or len(waiting) >= self.max_queued_per_tenant:
+            raise JobQueueFull(f"Too many queued jobs ({self.depth} in total, {len(waiting)} for this account)")
+        self._jobs[job.id] = job
+        self._queued.setdefault(job.tenant, deque()).append(job)
+
+    async def claim(self, max_per_tenant: int) -> Optional[Job]:
+        for tenant, waiting in self._queued.items():
+            if self._running.get(tenant, 0) >= max_per_tenant:
+                continue
+            job = waiting.popleft()
+            # The tenant goes to the back of the line, or leaves it when nothing is left
+            del self._queued[tenant]
+            if waiting:
+                self._queued[tenant] = waiting
+            self._running[tenant] = self._running.get(tenant, 0) + 1
+            job.status, job.started_at = RUNNING, time.time()
+            return job
+        return None
+
+    async def renew(self, job: Job) -> None:
+        pass
+
+    async def finish(self, job: Job) -> None:
+        job.token = None
+        running = self._running.pop(job.tenant, 1) - 1
+        if running:
+            self._running[job.tenant] = running
+        self._finished[job.id] = job.finished_at
+        expired = time.time() - self.result_ttl
+        while self._finished and next(iter(self._finished.values())) < expired:
+            self._jobs.pop(self._finished.popitem(last=False)[0], None)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    @property
+    def depth(self) -> int:
+        return sum(len(waiting) for waiting in self._queued.values())
+
+    async def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.depth,
+            "running": sum(self._running.values()),
+            "tenants_waiting": len(self._queued),
+            "max_tenant_depth": max((len(waiting) for waiting in self._queued.values()), default=0),
+        }
+
+
+class SQLiteJobQueue:
+    """
+    Queue in a SQLite table, shared by the API and worker processes on one host.
+
+    A job is claimed in an IMMEDIATE transaction, so two workers never take the same
+    one. The next job comes from the tenant that started a job least recently, skipping
+    tenants at max_per_tenant running jobs. The token is stored only while the job is
+    waiting or running.
+
+    A claim holds a lease of `lease` seconds that the runner renews while the job runs.
+    A running job whose lease ran out belongs to a worker that died; it is marked failed
+    (and its token dropped) on startup and before each claim, so it stops counting
+    against its tenant's limit.
+    """
+
+    def __init__(
+        self, path: str, max_queued: int, max_queued_per_tenant: int, result_ttl: float, lease: float = 60.0
+    ):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_queued = max_queued
+        self.max_queued_per_tenant = max_queued_per_tenant
+        self.result_ttl = result_ttl
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, tenant TEXT NOT NULL, request TEXT NOT NULL, "
+                "token TEXT, status TEXT NOT NULL, result TEXT, error TEXT, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL, lease_until REAL)"
+            )
+            columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            if "lease_until" not in columns:
+                self._db.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status_tenant ON jobs (status, tenant)")
+        recovered = self._transaction(self._expire_leases)
+        if recovered:
+            logger.warning(f"Marked {recovered} jobs of stopped workers as failed")
+
+    @staticmethod
+    def _job(row: sqlite3.Row) -> Job:
+        return Job(
+            id=row["id"],
+            tenant=row["tenant"],
+            request=json.loads(row["request"]),
+            token=row["token"],
+            status=row["status"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=row["error"],
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+        )
+
+    def _transaction(self, work):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = work()
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    def _put(self, job: Job) -> None:
+        def work():
+            total, tenant = self._db.execute(
+                "SELECT COUNT(*), SUM(tenant = ?) FROM jobs WHERE status = ?", (job.tenant, QUEUED)
+            ).fetchone()
+            if total >= self.max_queued or (tenant or 0) >= self.max_queued_per_tenant:
+                raise JobQueueFull(f"Too many queued jobs ({total} in total, {tenant or 0} for this account)")
+            self._db.execute(
+                "INSERT INTO jobs (id, tenant, request, token, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job.id, job.tenant, json.dumps(job.request, ensure_ascii=False), job.token, job.status, job.created_at),
+            )
+        self._transaction(work)
+
+    def _expire_leases(self) -> int:
+        """Fail running jobs whose worker stopped renewing the lease; runs inside a transaction"""
+        now = time.time()
+        return self._db.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ?, token = NULL, lease_until = NULL "
+            "WHERE status = ? AND COALESCE(lease_until, 0) < ?",
+            (FAILED, INTERRUPTED, now, RUNNING, now),
+        ).rowcount
+
+    def _claim(self, max_per_tenant: int) -> Optional[Job]:
+        def work():
+            self._expire_leases()
+            row = self._db.execute(
+                "SELECT * FROM jobs j WHERE status = :queued "
+                "AND (SELECT COUNT(*) FROM jobs r WHERE r.tenant = j.tenant AND r.status = :running) < :limit "
+                "ORDER BY (SELECT COALESCE(MAX(s.started_at), 0) FROM jobs s WHERE s.tenant = j.tenant), created_at "
+                "LIMIT 1",
+                {"queued": QUEUED, "running": RUNNING, "limit": max_per_tenant},
+            ).fetchone()
+            if row is None:
+                return None
+            job = self._job(row)
+            job.status, job.started_at = RUNNING, time.time()
+            self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, lease_until = ? WHERE id = ?",
+                (job.status, job.started_at, job.started_at + self.lease, job.id),
+            )
+            return job
+        return self._transaction(work)
+
+    def _renew(self, job: Job) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = ?", (time.time() + self.lease, job.id, RUNNING)
+            )
+
+    def _finish(self, job: Job) -> None:
+        def work():
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, token = NULL, lease_until = NULL "
+                "WHERE id = ?",
+                (job.status, json.dumps(job.result, ensure_ascii=False, default=str) if job.result is not None else None,
+                 job.error, job.finished_at, job.id),
+            )
+            self._db.execute("DELETE FROM jobs WHERE finished_at < ?", (time.time() - self.result_ttl,))
+        job.token = None
+        self._transaction(work)
+
+    def _get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def _stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            tenants = self._db.execute(
+                "SELECT COUNT(*), COALESCE(MAX(depth), 0) FROM "
+                "(SELECT COUNT(*) AS depth FROM jobs WHERE status = ? GROUP BY tenant)", (QUEUED,)
+            ).fetchone()
+        return {
+            "queued": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "tenants_waiting": tenants[0],
+            "max_tenant_depth": tenants[1],
+        }
+
+    async def put(self, job: Job) -> None:
+        await asyncio.to_thread(self._put, job)
+
+    async def claim(self, max_per_tenant: int) -> Optional[Job]:
+        return await asyncio.to_thread(self._claim, max_per_tenant)
+
+    async def renew(self, job: Job) -> None:
+        await asyncio.to_thread(self._renew, job)
+
+    async def finish(self, job: Job) -> None:
+        await asyncio.to_thread(self._finish, job)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def stats(self) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._stats)
+
+
+class JobRunner:
+    """
+    Agent workers pulling from a job queue.
+
+    At most `workers` jobs run at once in this process and at most max_per_tenant per
+    account; with the SQLite queue that limit holds across every process sharing it.
+    Idle workers wake up on a new job or after poll_interval, which picks up jobs
+    submitted by other processes.
+    """
+
+    def __init__(self, queue, workers: int = 4, max_per_tenant: int = 1, poll_interval: float = 0.2):
+        self.queue = queue
+        self.workers = workers
+        self.max_per_tenant = max_per_tenant
+        self.poll_interval = poll_interval
+        self.counters = {
+            "submitted": 0, "rejected": 0, "succeeded": 0, "failed": 0,
+            "wait_seconds_total": 0.0, "run_seconds_total": 0.0,
+        }
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._changed: Optional[asyncio.Condition] = None
+        self._draining = False
+
+    def start(self) -> None:
+        """Start the workers on the running loop; does nothing if they already run or are draining"""
+        if self._tasks or not self.workers or self._draining:
+            return
+        self._wakeup, self._changed = asyncio.Event(), asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._work(), name=f"job-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def drain(self, timeout: float) -> None:
+        """
+        Stop claiming jobs and give the running ones up to timeout seconds to finish;
+        whatever still runs then is cancelled and marked failed. Queued jobs stay in the queue.
+        """
+        self._draining = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+            if pending:
+                logger.warning(f"Cancelling {len(pending)} job workers still running after {timeout} s")
+        await self.stop()
+
+    async def submit(self, request: Dict[str, Any], tenant: str, token: Optional[str] = None) -> Job:
+        job = Job(id=uuid.uuid4().hex, tenant=tenant, request=request, token=token)
+        try:
+            await self.queue.put(job)
+        except JobQueueFull:
+            self.counters["rejected"] += 1
+            raise
+        self.counters["submitted"] += 1
+        self.start()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def wait(self, job_id: str, timeout: float = 0.0) -> Optional[Job]:
+        """The job once it is done, or as it is when timeout runs out; None for an unknown ID"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.queue.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job.done or remaining <= 0:
+                return job
+            if self._changed is None:
+                await asyncio.sleep(min(remaining, self.poll_interval))
+                continue
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), min(remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _work(self) -> None:
+        while not self._draining:
+            try:
+                job = await self.queue.claim(self.max_per_tenant)
+            except Exception as e:
+                logger.error(f"Error claiming job: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+            # A finished job frees a slot of its tenant, so idle workers look again
+            self._wakeup.set()
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def _heartbeat(self, job: Job) -> None:
+        """Renew the job's lease while it runs, so other processes know its worker is alive"""
+        while True:
+            await asyncio.sleep(self.queue.lease / 3)
+            try:
+                await self.queue.renew(job)
+            except Exception as e:
+                logger.error(f"Error renewing lease of job {job.id}: {str(e)}")
+
+    async def _run(self, job: Job) -> None:
+        from app.agent.agent import Agent
+
+        self.counters["wait_seconds_total"] += job.started_at - job.created_at
+        started = time.perf_counter()
+        heartbeat = asyncio.create_task(self._heartbeat(job)) if self.queue.lease else None
+        cancelled = False
+        try:
+            job.result = await Agent.process(
+                job.request["input"],
+                mode=job.request.get("mode"),
+                llm_summary=job.request.get("llm_summary", False),
+                todoist_token=job.token,
+                conversation_id=job.request.get("conversation_id"),
+            )
+            job.status = SUCCEEDED
+        except asyncio.CancelledError:
+            # Shutdown: record the job as failed so its tenant is not blocked and the token is dropped
+            logger.warning(f"Job {job.id} cancelled while running")
+            job.status, job.error, cancelled = FAILED, INTERRUPTED, True
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}", exc_info=True)
+            job.status, job.error = FAILED, str(e)
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+        job.finished_at = time.time()
+        self.counters[job.status] += 1
+        self.counters["run_seconds_total"] += time.perf_counter() - started
+        try:
+            await self.queue.finish(job)
+        except Exception as e:
+            logger.error(f"Error saving result of job {job.id}: {str(e)}")
+        if cancelled:
+            raise asyncio.CancelledError
+
+    async def stats(self) -> Dict[str, Any]:
+        done = self.counters["succeeded"] + self.counters["failed"]
+        return {
+            "workers": len(self._tasks),
+            "max_per_tenant": self.max_per_tenant,
+            **await self.queue.stats(),
+            **self.counters,
+            "avg_wait_ms": self.counters["wait_seconds_total"] / done * 1000 if done else 0.0,
+            "avg_run_ms": self.counters["run_seconds_total"] / done * 1000 if done else 0.0,
+        }
+
+
+def create_job_queue():
+    settings = get_settings()
+    limits = (settings.JOBS_MAX_QUEUED, settings.JOBS_MAX_QUEUED_PER_TENANT, settings.JOBS_RESULT_TTL)
+    if settings.JOBS_BACKEND == "sqlite":
+        return SQLiteJobQueue(settings.JOBS_SQLITE_PATH, *limits, lease=settings.JOBS_LEASE_SECONDS)
+    return InMemoryJobQueue(*limits)
+
+
+@lru_cache()
+def get_job_runner() -> JobRunner:
+    settings = get_settings()
+    if settings.JOBS_BACKEND == "memory" and metrics.multiprocess_dir is not None:
+        # Jobs would only be found by polling the worker that accepted them
+        raise RuntimeError("The in-memory job queue cannot be shared by server workers; set JOBS_BACKEND=sqlite")
+    if settings.JOBS_BACKEND == "memory" and not settings.JOBS_WORKERS:
+        logger.warning("JOBS_WORKERS is 0 with the in-memory job queue; submitted jobs will never run")
+    return JobRunner(
+        create_job_queue(),
+        workers=settings.JOBS_WORKERS,
+        max_per_tenant=settings.JOBS_MAX_PER_TENANT,
+        poll_interval=settings.JOBS_POLL_INTERVAL,
+    )
+
+
+async def run_workers() -> None:
+    """Worker process: run JOBS_WORKERS agents against the shared SQLite queue until interrupted"""
+    from app.agent.agent import Agent
+
+    settings = get_settings()
+    if settings.JOBS_BACKEND != "sqlite":
+        raise SystemExit("Separate worker processes need JOBS_BACKEND=sqlite")
+    Agent.get_workflow()
+    runner = get_job_runner()
+    runner.workers = runner.workers or 1
+    runner.start()
+    logger.info(f"Job worker process started with {runner.workers} workers")
+    try:
+        await asyncio.gather(*runner._tasks)
+    finally:
+        await runner.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_workers())
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core import logger
+from app.core.config import get_settings
+
+
+def cache_key(
+    model: str,
+    messages: List[Dict[str, Any]],
+    json_mode: bool,
+    workspace_version: int
+) -> str:
+    """
+    Hash of the normalized request plus the workspace version it was built against.
+
+    Whitespace inside messages is collapsed, so formatting-only prompt changes
+    share an entry. A different workspace version always produces a different key.
+    """
+    normalized = {
+        "model": model,
+        "json_mode": json_mode,
+        "workspace_version": workspace_version,
+        "messages": [
+            {"role": m.get("role"), "content": " ".join(str(m.get("content", "")).split())}
+            for m in messages
+        ],
+    }
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskTier:
+    """
+    Completions stored as one file per key, evicted least recently used by total size.
+
+    Called from worker threads, so the index is guarded by a lock.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self.size = 0
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Rebuild the LRU order from file modification times
+        files = sorted(self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        for path in files:
+            self._sizes[path.stem] = path.stat().st_size
+            self.size += self._sizes[path.stem]
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._sizes:
+                return None
+            path = self._path(key)
+            try:
+                value = json.loads(path.read_text(encoding="utf-8"))["value"]
+                os.utime(path)
+            except (OSError, ValueError, KeyError):
+                self.size -= self._sizes.pop(key)
+                return None
+            self._sizes.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        data = json.dumps({"value": value}, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._path(key).write_bytes(data)
+            self.size += len(data) - self._sizes.get(key, 0)
+            self._sizes[key] = len(data)
+            self._sizes.move_to_end(key)
+            while self.size > self.max_bytes:
+                old_key, old_size = self._sizes.popitem(last=False)
+                self._path(old_key).unlink(missing_ok=True)
+                self.size -= old_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._sizes):
+                self._path(key).unlink(missing_ok=True)
+            self._sizes.clear()
+            self.size = 0
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of completion contents: an in-memory LRU in front of an optional disk tier.
+
+    Disk hits are promoted to memory. Disk reads and writes run in a worker thread.
+    """
+
+    def __init__(self, max_entries: int = 512, disk: Optional[DiskTier] = None):
+        self.max_entries = max_entries
+        self.disk = disk
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return value
+        if self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                self._stats["disk_hits"] += 1
+                self._remember(key, value)
+                return value
+        self._stats["misses"] += 1
+        return None
+
+    async def put(self, key: str, value: str) -> None:
+        self._stats["stores"] += 1
+        self._remember(key, value)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.put, key, value)
+            except OSError as e:
+                logger.warning(f"Could not write LLM cache entry to disk: {e}")
+
+    def _remember(self, key: str, value: str) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+        lookups = hits + self._stats["misses"]
+        stats: Dict[str, Any] = {
+            **self._stats,
+            "entries": len(self._entries),
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+        if self.disk is not None:
+            stats["disk_entries"] = len(self.disk)
+            stats["disk_bytes"] = self.disk.size
+            stats["disk_evictions"] = self.disk.evictions
+        return stats
+
+
+@lru_cache()
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Process-wide response cache, or None when LLM_CACHE_ENABLED is off"""
+    settings = get_settings()
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    disk = None
+    if settings.LLM_CACHE_DIR:
+        disk = DiskTier(settings.LLM_CACHE_DIR, settings.LLM_CACHE_DISK_MAX_BYTES)
+    return LLMResponseCache(settings.LLM_CACHE_SIZE, disk)
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core import logger, metrics
+from app.core.config import get_settings
+
+MAX_INPUT_CHARS = 200
+MAX_CONTENT_CHARS = 80
+MAX_ACTIONS_PER_TURN = 10
+
+
+def _clip(text: Any, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+@dataclass
+class ConversationMemory:
+    """
+    What a conversation needs for follow-ups, in a compact form.
+
+    turns keeps the latest user inputs with one line per tool call, tasks maps the task
+    IDs resolved so far to their titles (most recent last), and last_results holds the
+    outcome lines of the previous turn. Every part is bounded.
+    """
+    key: str
+    max_turns: int = 5
+    max_tasks: int = 20
+    turns: Deque[Dict[str, Any]] = field(default_factory=deque)
+    tasks: "OrderedDict[str, str]" = field(default_factory=OrderedDict)
+    last_results: List[str] = field(default_factory=list)
+
+    def _remember_task(self, task_id: Any, content: Any = None) -> None:
+        if not task_id:
+            return
+        task_id = str(task_id)
+        previous = self.tasks.pop(task_id, None)
+        self.tasks[task_id] = _clip(content, MAX_CONTENT_CHARS) if content else (previous or "")
+        while len(self.tasks) > self.max_tasks:
+            self.tasks.popitem(last=False)
+
+    def record(self, user_input: str, tool_calls: List[Dict[str, Any]]) -> None:
+        """Add a finished turn: its input, one line per tool call and the tasks it touched"""
+        lines = []
+        for call in tool_calls:
+            step = call.get("step")
+            if "error" in call or not isinstance(step, dict):
+                lines.append(f"error: {_clip(call.get('error'), MAX_CONTENT_CHARS)}")
+                continue
+            arguments, result = step.get("arguments", {}), call.get("result")
+            self._remember_task(arguments.get("task_id"), arguments.get("title"))
+            if isinstance(result, list):
+                for task in result[:self.max_tasks]:
+                    if isinstance(task, dict):
+                        self._remember_task(task.get("id"), task.get("content"))
+                lines.append(f"{step.get('tool_name')}: {len(result)} tasks")
+                continue
+            if isinstance(result, dict):
+                self._remember_task(result.get("task_id"), result.get("content") or arguments.get("title"))
+                for item in result.get("results") or []:
+                    self._remember_task(item.get("task_id"))
+            is_success = isinstance(result, dict) and result.get("success") is True
+            target = arguments.get("task_id") or arguments.get("title") or ""
+            lines.append(f"{step.get('tool_name')}({target}): {'ok' if is_success else 'failed'}")
+        if len(lines) > MAX_ACTIONS_PER_TURN:
+            lines = lines[:MAX_ACTIONS_PER_TURN] + [f"... {len(lines) - MAX_ACTIONS_PER_TURN} more"]
+        self.turns.append({"input": _clip(user_input, MAX_INPUT_CHARS), "actions": lines})
+        while len(self.turns) > self.max_turns:
+            self.turns.popleft()
+        self.last_results = lines
+
+    def render(self) -> str:
+        """Prompt block with the recent turns and resolved tasks; empty for a new conversation"""
+        if not self.turns:
+            return ""
+        parts = ["Recent turns (oldest first):"]
+        for turn in self.turns:
+            actions = "; ".join(turn["actions"]) or "no actions"
+            parts.append(f'- "{turn["input"]}" -> {actions}')
+        if self.tasks:
+            parts.append("Tasks referenced so far (most recent last):")
+            parts.extend(f'- {{"id": "{task_id}", "content": "{content}"}}' for task_id, content in self.tasks.items())
+        return "\n".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"turns": list(self.turns), "tasks": list(self.tasks.items()), "last_results": self.last_results}
+
+    @classmethod
+    def from_dict(cls, key: str, data: Dict[str, Any], max_turns: int, max_tasks: int) -> "ConversationMemory":
+        memory = cls(key=key, max_turns=max_turns, max_tasks=max_tasks)
+        memory.turns = deque(data.get("turns", [])[-max_turns:])
+        memory.tasks = OrderedDict(data.get("tasks", [])[-max_tasks:])
+        memory.last_results = data.get("last_results", [])
+        return memory
+
+
+class InMemoryBackend:
+    """Serialized conversations in a process-local LRU"""
+
+    def __init__(self, max_sessions: int):
+        self.max_sessions = max_sessions
+        self.evictions = 0
+        self._sessions: "OrderedDict[str, str]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def get(self, key: str) -> Optional[str]:
+        data = self._sessions.get(key)
+        if data is not None:
+            self._sessions.move_to_end(key)
+        return data
+
+    async def put(self, key: str, data: str) -> None:
+        self._sessions[key] = data
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+
+class SQLiteBackend:
+    """
+    Serialized conversations in a SQLite table, so they survive restarts and are
+    shared by workers on one host. Least recently used rows beyond max_sessions are deleted.
+    """
+
+    def __init__(self, path: str, max_sessions: int):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_sessions = max_sessions
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS conversations (key TEXT PRIMARY KEY, data TEXT NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS conversations_used_at ON conversations (used_at)")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._lock, self._db:
+            row = self._db.execute("SELECT data FROM conversations WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._db.execute("UPDATE conversations SET used_at = ? WHERE key = ?", (time.time(), key))
+        return row[0] if row else None
+
+    def _put(self, key: str, data: str) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO conversations (key, data, used_at) VALUES (?, ?, ?)", (key, data, time.time())
+            )
+            evicted = self._db.execute(
+                "DELETE FROM conversations WHERE key IN "
+                "(SELECT key FROM conversations ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            ).rowcount
+        self.evictions += evicted
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: str, data: str) -> None:
+        await asyncio.to_thread(self._put, key, data)
+
+
+class ConversationStore:
+    """Loads and saves ConversationMemory through a backend, with hit and size counters"""
+
+    def __init__(self, backend, max_turns: int = 5, max_tasks: int = 20):
+        self.backend = backend
+        self.max_turns = max_turns
+        self.max_tasks = max_tasks
+        self.counters = {"hits": 0, "misses": 0, "saves": 0, "errors": 0}
+
+    async def load(self, key: str) -> ConversationMemory:
+        """Memory of the conversation; a new, empty one when it is unknown or cannot be read"""
+        try:
+            data = await self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Error loading conversation memory: {str(e)}")
+            self.counters["errors"] += 1
+            data = None
+        self.counters["hits" if data is not None else "misses"] += 1
+        if data is None:
+            return ConversationMemory(key=key, max_turns=self.max_turns, max_tasks=self.max_tasks)
+        return ConversationMemory.from_dict(key, json.loads(data), self.max_turns, self.max_tasks)
+
+    async def save(self, memory: ConversationMemory) -> None:
+        try:
+            await self.backend.put(memory.key, json.dumps(memory.to_dict(), ensure_ascii=False))
+            self.counters["saves"] += 1
+        except Exception as e:
+            logger.error(f"Error saving conversation memory: {str(e)}")
+            self.counters["errors"] += 1
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "sessions": len(self.backend), "evictions": self.backend.evictions}
+
+
+@lru_cache()
+def get_memory_store() -> Optional[ConversationStore]:
+    """
+    Process-wide conversation store, or None when MEMORY_BACKEND is "none". The in-memory
+    store is refused under several server workers, where most follow-ups would be served
+    by a worker that never saw the conversation.
+    """
+    settings = get_settings()
+    if settings.MEMORY_BACKEND == "none":
+        return None
+    if settings.MEMORY_BACKEND == "memory" and metrics.multiprocess_dir is not None:
+        raise RuntimeError(
+            'In-memory conversation memory cannot be shared by server workers; set MEMORY_BACKEND to "sqlite" or "none"'
+        )
+    if settings.MEMORY_BACKEND == "sqlite":
+        backend = SQLiteBackend(settings.MEMORY_SQLITE_PATH, settings.MEMORY_MAX_SESSIONS)
+    else:
+        backend = InMemoryBackend(settings.MEMORY_MAX_SESSIONS)
+    return ConversationStore(backend, settings.MEMORY_MAX_TURNS, settings.MEMORY_MAX_TASKS)
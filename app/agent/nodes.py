@@ -1,12 +1,19 @@
-from typing import Dict, Tuple, List
+from typing import Any, Callable, Dict, Optional, Tuple, List
 import json
+import time
+from langgraph.config import get_stream_writer
 from loguru import logger
 
-from app.agent.schema.response import AgentResponse, ExecuteResponse
-from app.agent.prompts import understand_prompt, execute_prompt, finalizer_prompt
+from app.core.logging import clip
+
+from app.agent.schema.response import AgentResponse, PlanResponse
+from app.agent.prompts import understand_prompt, plan_prompt, finalizer_prompt
 from app.agent.openai_service import OpenAIService
-from app.agent.tools import get_tool_descriptions, get_tools
+from app.agent.executor import execute_plan, execute_steps
+from app.agent.finalizer import finalizer_stats, render_summary
+from app.agent.registry import registry
 from app.agent.schema import State
+from app.tools.todoist.tasks import TodoistTools
 
 
 class Nodes:
@@ -19,7 +26,7 @@ class Nodes:
         Node responsible for understanding user input and converting it to a structured format.
         """
         node = cls()
-        system_prompt = await understand_prompt()
+        system_prompt = await understand_prompt(state.input, state.memory)
         messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": state.input},
@@ -28,15 +35,16 @@ class Nodes:
             "messages": messages,
             "jsonMode": True,
             "name": "understand",
+            "workspace_version": TodoistTools.workspace_version(),
         }
 
         response = await node.llm.completion(config)
         try:
             response = json.loads(response)
-            logger.info(f"Agent response: {response}")
+            logger.info("Agent response: {}", clip(response))
             response = AgentResponse(**response)
             steps, go_tool = cls._prepare_steps(response)
-            logger.info(f"Steps: {steps}")
+            logger.info("Steps: {}", clip(steps))
         except Exception as e:
             logger.error(f"Error parsing response: {e}")
             raise e
@@ -46,6 +54,54 @@ class Nodes:
             "go_tool": go_tool
         }
 
+    @classmethod
+    async def plan_node(cls, state: State) -> Dict[str, Any]:
+        """
+        Single-shot mode: one LLM call produces the tool calls for every action in the input.
+        An invalid plan sends the request down the understand/execute path instead.
+        """
+        node = cls()
+        system_prompt = await plan_prompt(registry.descriptions, state.input, state.memory)
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": state.input},
+        ]
+        config = {
+            "messages": messages,
+            "jsonMode": True,
+            "name": "plan",
+            "workspace_version": TodoistTools.workspace_version(),
+        }
+
+        response = await node.llm.completion(config)
+        try:
+            plan = json.loads(response)
+            logger.info("Single-shot plan: {}", clip(plan))
+            if isinstance(plan, dict) and plan.get("error"):
+                error = {"step": state.input, "error": plan.get("info")}
+                return {"tool_calls": state.tool_calls + [error], "go_tool": False}
+            plan = PlanResponse(**plan)
+            for action in plan.actions:
+                registry.get(action.tool_name).validate(action.arguments)
+        except Exception as e:
+            logger.warning(f"Single-shot plan rejected, falling back to multi-node: {e}")
+            return {"plan_failed": True}
+
+        tool_calls = await execute_plan(plan.actions, state.input, cls._tool_result_writer(state, "plan"))
+        return {"tool_calls": state.tool_calls + tool_calls, "go_tool": False}
+
+    @classmethod
+    async def mode_router(cls, state: State) -> str:
+        if state.mode == "single_shot":
+            return "plan"
+        return "understand"
+
+    @classmethod
+    async def plan_router(cls, state: State) -> str:
+        if state.plan_failed:
+            return "understand"
+        return "finalize"
+
     @classmethod
     async def decision_router(cls, state: State) -> str:
         if state.go_tool:
@@ -55,70 +111,39 @@ class Nodes:
 
     @classmethod
     async def execute_tool_node(cls, state: State) -> State:
+        """
+        Plans and runs every remaining step; independent steps run concurrently.
+        """
         try:
             node = cls()
-            steps = state.steps
-            tool_calls = state.tool_calls
-            tool_descriptions = await get_tool_descriptions()
-            step = steps[0]
-            system_prompt = await execute_prompt(tool_descriptions)
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"User intent: {step}"}
-            ]
-            config = {
-                "messages": messages,
-                "jsonMode": True,
-                "name": "execute",
-            }
+            tool_calls = await execute_steps(
+                node.llm, state.steps, state.memory, cls._tool_result_writer(state, "execute")
+            )
         except Exception as e:
             logger.error(f"Error executing tool: {e}")
             raise e
+        return {
+            "steps": [],
+            "tool_calls": state.tool_calls + tool_calls,
+            "go_tool": False
+        }
 
-        try:
-            response = await node.llm.completion(config)
-            execution_plan = json.loads(response)
-            logger.info(f"Execution plan: {execution_plan}")
-            actions = []
-            if isinstance(execution_plan, list):
-                for plan in execution_plan:
-                    action_to_call = ExecuteResponse(**plan)
-                    actions.append(action_to_call)
-            elif isinstance(execution_plan, dict):
-                if execution_plan.get("error"):
-                    tool_response = {"step": step, "error": execution_plan.get("info")}
-                else:
-                    action_to_call = ExecuteResponse(**execution_plan)
-                    actions.append(action_to_call)
-            tools = await get_tools()
-            
-            for action in actions:
-                try:
-                    tool = tools[action.tool_name]
-                    result = await tool(**action.arguments)
-                    tool_response = {"step": action.model_dump(), "result": result}
-                    logger.info(f"Tool response: {tool_response}")
-                except Exception as e:
-                    tool_response = {"step": step, "error": f"Tool {action.tool_name} not found"}
-                    logger.error(f"Error executing tool: {e}")
-            steps.remove(step)   
-            tool_calls.append(tool_response)      
-            if len(steps) > 0:
-                go_tool = True
-            else:
-                go_tool = False
-
-            return {
-                "steps": steps, 
-                "tool_calls": tool_calls, 
-                "go_tool": go_tool
-            }
-        except Exception as e:
-            logger.error(f"Error executing tool: {e}")
-            raise e
-    
     @classmethod
     async def finalizer_node(cls, state: State) -> State:
+        """
+        Summarizes tool calls. Simple outcomes are rendered from templates,
+        the LLM is used for errors, mixed results or when explicitly requested.
+        In streaming runs the report is written to the stream token by token.
+        """
+        started = time.perf_counter()
+        if not state.llm_summary:
+            summary = render_summary(state.tool_calls)
+            if summary is not None:
+                finalizer_stats.record_fast_path(time.perf_counter() - started)
+                if state.stream:
+                    get_stream_writer()({"event": "token", "content": summary})
+                return {"final_response": summary}
+
         node = cls()
         user_query = state.input
         tool_calls = state.tool_calls
@@ -132,9 +157,26 @@ class Nodes:
             "jsonMode": False,
             "name": "finalizer",
         }
-        response = await node.llm.completion(config)
+        if state.stream:
+            write = get_stream_writer()
+            parts = []
+            async for token in node.llm.stream_completion(config):
+                parts.append(token)
+                write({"event": "token", "content": token})
+            response = "".join(parts)
+        else:
+            response = await node.llm.completion(config)
+        finalizer_stats.record_llm(time.perf_counter() - started)
         return {"final_response": response}
     
+    @staticmethod
+    def _tool_result_writer(state: State, node: str) -> Optional[Callable[[Dict[str, Any]], None]]:
+        """In streaming runs, writes each tool call to the stream as soon as it finishes"""
+        if not state.stream:
+            return None
+        write = get_stream_writer()
+        return lambda tool_call: write({"event": "tool_result", "node": node, "tool_call": tool_call})
+
     @staticmethod
     def _prepare_steps(response: AgentResponse) -> Tuple[List[str], bool]:
         steps = []
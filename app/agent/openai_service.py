@@ -1,14 +1,89 @@
+import asyncio
 import json
 import re
-from typing import Any, Dict
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from langfuse.openai import openai
+import httpx
+from openai import AsyncOpenAI
 
+from app.agent.llm_cache import LLMResponseCache, cache_key, get_llm_cache
 from app.core import logger
+from app.core.config import get_settings
+from app.core.metrics import add_span, llm_cache_hits, llm_seconds, llm_tokens
+from app.core.tracing import TraceExporter, get_trace_exporter
+
+_semaphore: Optional[asyncio.Semaphore] = None
+
+# Per-run list of LLM calls (latency and tokens); set by Agent.process
+llm_calls: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("llm_calls", default=None)
+
+# Process-wide totals per call name ("understand", "execute", "execute_native", ...)
+call_stats: Dict[str, Dict[str, float]] = {}
+
+
+def llm_call_stats() -> Dict[str, Dict[str, float]]:
+    """Calls and average tokens per call name"""
+    return {
+        name: {
+            "calls": stats["calls"],
+            "avg_prompt_tokens": stats["prompt_tokens"] / stats["calls"],
+            "avg_completion_tokens": stats["completion_tokens"] / stats["calls"],
+            "avg_latency_ms": stats["latency_seconds_total"] / stats["calls"] * 1000,
+        }
+        for name, stats in call_stats.items()
+    }
+
+
+@lru_cache()
+def get_async_client() -> AsyncOpenAI:
+    """Shared async OpenAI client with a pooled HTTP transport."""
+    settings = get_settings()
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS,
+        ),
+    )
+    return AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL,
+        timeout=httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT),
+        max_retries=settings.OPENAI_MAX_RETRIES,
+        http_client=http_client,
+    )
+
+
+async def close_async_client() -> None:
+    """Close the shared client, e.g. on application shutdown."""
+    global _semaphore
+    if get_async_client.cache_info().currsize:
+        await get_async_client().close()
+        get_async_client.cache_clear()
+    _semaphore = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(get_settings().OPENAI_MAX_CONCURRENCY)
+    return _semaphore
+
 
 class OpenAIService:
-    def __init__(self):
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        tracer: Optional[TraceExporter] = None,
+        cache: Optional[LLMResponseCache] = None
+    ):
         self.default_model = "gpt-4o"
+        self.client = client or get_async_client()
+        self.tracer = tracer or get_trace_exporter()
+        self.cache = cache or get_llm_cache()
 
     async def completion(
         self, config: Dict[str, Any], only_content: bool = True
@@ -16,8 +91,19 @@ class OpenAIService:
         """
         Calls OpenAI API to get a chat completion.
 
+        Uses the shared async client, so a slow completion does not block the event loop.
+        Timeouts and retries with exponential backoff are configured on the client,
+        in-flight requests are capped by OPENAI_MAX_CONCURRENCY.
+        The generation is handed to the background trace exporter, nothing is flushed inline.
+
+        Deterministic calls (temperature 0, no streaming) that carry a 'workspace_version' are
+        served from the response cache. The version is part of the key, so an answer - including
+        a plan of mutating tool calls - is only reused against the workspace it was made for.
+
         Parameters:
-        - config (Dict[str, Any]): Dictionary containing parameters such as 'messages', 'model', 'stream', and 'jsonMode'.
+        - config (Dict[str, Any]): Dictionary containing parameters such as 'messages', 'model', 'stream', 'jsonMode',
+          'tools' (function-calling schemas; the full response is needed to read the calls, so pass only_content=False)
+          and 'workspace_version' (version of the workspace snapshot the prompt was built from).
 
         Returns:
         - OpenAI response in JSON format.
@@ -29,27 +115,145 @@ class OpenAIService:
         name = config.get("name", "test")
         temperature = config.get("temperature", 0)
         metadata = config.get("metadata", None)
+        tools = config.get("tools")
 
         response_format = {"type": "json_object"} if json_mode else {"type": "text"}
+        extra = {"tools": tools, "tool_choice": "auto"} if tools else {}
+
+        trace = {"name": name, "model": model, "input": messages, "metadata": metadata}
+        trace["start_time"] = datetime.now(timezone.utc)
+        started = time.perf_counter()
+
+        key = None
+        workspace_version = config.get("workspace_version")
+        if self.cache is not None and workspace_version and only_content and not stream and temperature == 0:
+            key = cache_key(model, messages, json_mode, workspace_version)
+            cached = await self.cache.get(key)
+            if cached is not None:
+                llm_cache_hits.inc(1, name)
+                add_span("llm", name, time.perf_counter() - started, model=model, cache_hit=True)
+                self._trace({**trace, "output": cached, "metadata": {**(metadata or {}), "cache_hit": True}})
+                return cached
 
         try:
-            response = openai.chat.completions.create(
-                name=name,
-                model=model,
-                temperature=temperature,
-                messages=messages,
-                stream=stream,
-                response_format=response_format,
-                metadata=metadata,
-            )
-            openai.flush_langfuse()
+            async with _get_semaphore():
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    temperature=temperature,
+                    messages=messages,
+                    stream=stream,
+                    response_format=response_format,
+                    **extra,
+                )
+            if not stream:
+                trace["output"] = self._output(response.choices[0].message)
+                trace["usage"] = self._usage(response)
+            self._record(name, model, time.perf_counter() - started, trace.get("usage"))
+            self._trace(trace)
+            if key is not None and isinstance(trace["output"], str) and trace["output"]:
+                await self.cache.put(key, trace["output"])
             if only_content:
                 return response.choices[0].message.content
             return response
         except Exception as e:
             logger.error(f"LLM generation failed: {e}")
+            self._trace({**trace, "level": "ERROR", "error": str(e)})
             raise
 
+    async def stream_completion(self, config: Dict[str, Any]) -> AsyncIterator[str]:
+        """
+        Streams a text completion, yielding content deltas as they arrive.
+
+        The concurrency slot is held until the stream is exhausted. Latency, usage
+        and the joined output are recorded and traced once the stream ends.
+
+        Parameters:
+        - config (Dict[str, Any]): Same keys as for completion(); 'stream' and 'jsonMode' are ignored.
+        """
+        messages = config.get("messages", [])
+        model = config.get("model", self.default_model)
+        name = config.get("name", "test")
+        temperature = config.get("temperature", 0)
+        metadata = config.get("metadata", None)
+
+        trace = {"name": name, "model": model, "input": messages, "metadata": metadata}
+        trace["start_time"] = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        parts: List[str] = []
+        try:
+            async with _get_semaphore():
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    temperature=temperature,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                async for chunk in response:
+                    if getattr(chunk, "usage", None) is not None:
+                        trace["usage"] = self._usage(chunk)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        except Exception as e:
+            logger.error(f"LLM generation failed: {e}")
+            self._trace({**trace, "level": "ERROR", "error": str(e)})
+            raise
+        trace["output"] = "".join(parts)
+        self._record(name, model, time.perf_counter() - started, trace.get("usage"))
+        self._trace(trace)
+
+    @staticmethod
+    def _output(message: Any) -> Any:
+        tool_calls = getattr(message, "tool_calls", None)
+        if not tool_calls:
+            return message.content
+        return [{"name": call.function.name, "arguments": call.function.arguments} for call in tool_calls]
+
+    @staticmethod
+    def _record(name: str, model: str, latency: float, usage: Optional[Dict[str, int]]) -> None:
+        prompt_tokens = usage["input"] if usage else 0
+        completion_tokens = usage["output"] if usage else 0
+        llm_seconds.observe(latency, name, model)
+        llm_tokens.inc(prompt_tokens, name, model, "prompt")
+        llm_tokens.inc(completion_tokens, name, model, "completion")
+        add_span("llm", name, latency, model=model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        totals = call_stats.setdefault(name, {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_seconds_total": 0.0,
+        })
+        totals["calls"] += 1
+        totals["prompt_tokens"] += prompt_tokens
+        totals["completion_tokens"] += completion_tokens
+        totals["latency_seconds_total"] += latency
+        calls = llm_calls.get()
+        if calls is None:
+            return
+        calls.append({
+            "name": name,
+            "model": model,
+            "latency_ms": round(latency * 1000, 1),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        })
+
+    def _trace(self, trace: Dict[str, Any]) -> None:
+        trace["end_time"] = datetime.now(timezone.utc)
+        self.tracer.submit(trace)
+
+    @staticmethod
+    def _usage(response: Any) -> Optional[Dict[str, int]]:
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return None
+        return {
+            "input": usage.prompt_tokens,
+            "output": usage.completion_tokens,
+            "total": usage.total_tokens,
+        }
+
     @staticmethod
     def parse_json_response(response: str) -> Dict[str, Any]:
         try:
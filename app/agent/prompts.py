@@ -1,40 +1,89 @@
 from datetime import datetime
-from typing import Any, List, Dict
+from typing import Any, List, Dict, Optional, Tuple
 
 from zmq import MORE
 
+from app.agent.retrieval import select_tasks
+from app.core import logger
+from app.core.config import get_settings
+from app.core.metrics import prompt_seconds, timed
 from app.tools.todoist.tasks import TodoistTools
 
 def current_date_time():
-    return datetime.now().isoformat()
+    # Minute precision keeps prompts identical within a minute, so responses can be cached
+    return datetime.now().isoformat(timespec="minutes")
 
 
-async def understand_prompt() -> str:
+def _task_line(task: Dict[str, Any]) -> str:
+    return (
+        f'{{"id": "{task["id"]}", "content": "{task["content"]}", '
+        f'"project_id": "{task.get("project_id", "")}"}}'
+    )
+
+
+async def workspace_context(query: Optional[str] = None) -> Tuple[str, str]:
     """
-    Generate a prompt for the task query analyzer.
-    
-    Args:
-        projects (list): List of project dictionaries
-        tasks (list): List of task dictionaries
-    
+    Format projects and the active tasks relevant to the query from one cached workspace snapshot.
+
+    Workspaces larger than CONTEXT_MAX_TASKS / CONTEXT_MAX_TASK_TOKENS are cut down to the
+    best matching tasks, and the list says how many tasks were left out.
+
     Returns:
-        str: The formatted prompt string
+        Tuple[str, str]: Projects and tasks as JSON lines
     """
-    projects = await TodoistTools.get_projects()
-    tasks = await TodoistTools.get_active_tasks()
-    projects_str =  "\n".join(
+    try:
+        snapshot = await TodoistTools.get_workspace_snapshot()
+        projects, tasks, index = snapshot.projects, snapshot.tasks, snapshot.search_index()
+    except Exception as e:
+        logger.error(f"Error getting workspace snapshot: {str(e)}")
+        projects, tasks, index = [], [], None
+    settings = get_settings()
+    selected = select_tasks(
+        query, tasks, projects, settings.CONTEXT_MAX_TASKS, settings.CONTEXT_MAX_TASK_TOKENS, _task_line,
+        index=index
+    )
+    projects_str = "\n".join(
         f'{{"id": "{p["id"]}", "name": "{p["name"]}"}}'
         for p in projects
     )
+    tasks_str = "\n".join(_task_line(t) for t in selected)
+    if len(selected) < len(tasks):
+        tasks_str += (
+            f"\n(showing {len(selected)} of {len(tasks)} active tasks, the ones most relevant to the request; "
+            "use the listing tools to see the rest)"
+        )
+    return projects_str, tasks_str
+
+
+def memory_context(memory: str = "") -> str:
+    """Conversation memory section for the prompts; empty when the conversation has no history"""
+    if not memory:
+        return ""
+    return f"""
+<conversation_memory>
+Earlier turns of this conversation. They are already done: never repeat their actions. Use them only to resolve \
+references in the latest input ("it", "that task", "the second one") to the tasks and IDs listed here.
+{memory}
+</conversation_memory>
+"""
+
+
+@timed(prompt_seconds, "prompt")
+async def understand_prompt(query: Optional[str] = None, memory: str = "") -> str:
+    """
+    Generate a prompt for the task query analyzer.
     
-    tasks_str = "\n".join(
-        f'{{"id": "{t["id"]}", "content": "{t["content"]}", '
-        f'"project_id": "{t.get("project_id", "")}"}}'
-        for t in tasks
-    )
+    Args:
+        query (str): User input, used to pick the relevant tasks
+        memory (str): Rendered conversation memory, if any
+
+    Returns:
+        str: The formatted prompt string
+    """
+    projects_str, tasks_str = await workspace_context(query)
     current_date = current_date_time()
 
-    return f'''From now on, you will function as a Task Query Analyzer and Splitter, focusing exclusively on the user's most recent message. \
+    return f'''From now on, you will function as a Task Query Analyzer and Splitter, taking actions only from the user's most recent message. \
 Your primary role is to interpret the latest user request about tasks and divide it into comprehensive subqueries for different actions, \
 including splitting and merging tasks, as well as listing and retrieving task details.
 
@@ -46,8 +95,8 @@ Always respond with a valid JSON object without markdown blocks.
 </prompt_objective>
 
 <prompt_rules>
-- Focus exclusively on the user's most recent message
-- Ignore any previous context or commands that aren't part of the latest input
+- Take actions exclusively from the user's most recent message
+- Never re-execute commands from earlier turns; use the conversation memory, if any, only to resolve references in the latest input ("it", "that task") to concrete tasks
 - Analyze the entire latest user input to extract all task-related information
 - Split the input into separate queries for adding, updating, completing, deleting, listing, and retrieving tasks
 - Ensure each subquery contains ALL necessary details from the latest input to perform the action. For example:
@@ -160,29 +209,20 @@ Available projects:
 Active tasks:
 {tasks_str}
 </current_context>
-
+{memory_context(memory)}
 Remember, your sole function is to analyze the user's latest input and categorize task-related actions into the specified JSON structure. \
-Do not engage in task management advice or direct responses to queries. Focus only on the most recent message, disregarding any previous context or commands.'''
+Do not engage in task management advice or direct responses to queries. Extract actions only from the most recent message; earlier turns are never acted on again, \
+but may be used to resolve what its references point to.'''
 
-async def execute_prompt(tool_descriptions: str) -> str:
+@timed(prompt_seconds, "prompt")
+async def execute_prompt(tool_descriptions: str, query: Optional[str] = None, memory: str = "") -> str:
     """
     Generate a prompt for the tool execution assistant.
     
     Returns:
         str: The formatted prompt string
     """
-    todoist_tools = TodoistTools()
-    tasks = await todoist_tools.get_active_tasks()
-    tasks_str = "\n".join(
-        f'{{"id": "{t["id"]}", "content": "{t["content"]}", '
-        f'"project_id": "{t.get("project_id", "")}"}}'
-        for t in tasks
-    )
-    projects = await todoist_tools.get_projects()
-    projects_str = "\n".join(
-        f'{{"id": "{p["id"]}", "name": "{p["name"]}"}}'
-        for p in projects
-    )
+    projects_str, tasks_str = await workspace_context(query)
     current_date = current_date_time()
 
     return f"""You are a tool execution assistant. Your task is to:  
@@ -205,7 +245,7 @@ Available projects:
 Active tasks:
 {tasks_str}
 </current_context>
-
+{memory_context(memory)}
 ## Rules  
 - **Intent Analysis:** The user's intent will be provided in a structured format under a single category (`add`, `update`, `complete`, `delete`, `list`, `get`).  
 - **Tool Matching:** Select the most appropriate tool based on the available tool descriptions.  
@@ -359,8 +399,113 @@ list: Show all active tasks.
 ]```
 """
 
+@timed(prompt_seconds, "prompt")
+async def execute_tools_prompt(query: Optional[str] = None, memory: str = "") -> str:
+    """
+    Generate a prompt for the tool execution assistant when tools are passed as function-calling schemas.
+
+    Tool descriptions and the response format come from the schemas, so they are not repeated here.
+
+    Returns:
+        str: The formatted prompt string
+    """
+    projects_str, tasks_str = await workspace_context(query)
+    current_date = current_date_time()
+
+    return f"""You are a tool execution assistant. Analyze the user's intent and call the tools that carry it out.
+
+<current_context>
+Current date and time: {current_date}
+
+Available projects:
+{projects_str}
+
+Active tasks:
+{tasks_str}
+</current_context>
+{memory_context(memory)}
+## Rules
+- The intent is given under a single category (`add`, `update`, `complete`, `delete`, `list`, `get`).
+- Make one tool call per action and per task; never omit an action.
+- A `task_id` MUST come from the active task list above. Ignore IDs given by the user that are not on it.
+- A `project_id` MUST come from the project list above; leave it out if the project is not found.
+- If no task matches the intent, do not call any tool; reply with one sentence describing the problem."""
+
+
+@timed(prompt_seconds, "prompt")
+async def plan_prompt(tool_descriptions: str, query: Optional[str] = None, memory: str = "") -> str:
+    """
+    Generate a prompt that turns the user's message into the complete tool-call plan in one step.
+
+    Returns:
+        str: The formatted prompt string
+    """
+    projects_str, tasks_str = await workspace_context(query)
+    current_date = current_date_time()
+
+    return f"""You are a Todoist task planner. In a single answer you:
+1. Analyze the user's latest message and find every task action in it (add, update, complete, delete, list, get).
+2. Map each action to the available tools.
+3. Return the full list of tool executions with their arguments.
+
+<tool_descriptions>
+{tool_descriptions}
+</tool_descriptions>
+
+<current_context>
+Current date and time: {current_date}
+
+Available projects:
+{projects_str}
+
+Active tasks:
+{tasks_str}
+</current_context>
+{memory_context(memory)}
+## Rules
+- Every action mentioned by the user MUST become a separate tool execution; never omit one.
+- If several tasks are added, updated, completed or deleted, return one tool execution per task.
+- Put listing, detail and search tools (get_*, search_*) after the tools that change tasks.
+- A `task_id` MUST come from the active task list above; never invent one.
+- A `project_id` MUST come from the project list above; omit it when the project is not found.
+- Arguments must match the names and types from the tool descriptions.
+- If a task the user refers to does not exist, return `"error": true` with an `"info"` message instead of actions.
+- Always respond with a valid JSON object without markdown blocks.
+
+## JSON Response Structure
+{{
+  "_thinking": "Short reasoning about which actions the message contains and how they map to tools",
+  "actions": [
+    {{
+      "tool_name": "string",
+      "arguments": {{ "parameter_name": "parameter_value" }}
+    }}
+  ]
+}}
+
+Error response:
+{{
+  "error": true,
+  "info": "string"
+}}
+
+# Example
+User: "Add 'Buy groceries' for tomorrow and mark 'learn English' as done"
+{{
+  "_thinking": "Two actions: add a new task with a due date, complete an existing task found in the active task list.",
+  "actions": [
+    {{"tool_name": "create_todoist_task", "arguments": {{"title": "Buy groceries", "due_date": "tomorrow"}}}},
+    {{"tool_name": "complete_todoist_task", "arguments": {{"task_id": "8829612968"}}}}
+  ]
+}}
+"""
+
+@timed(prompt_seconds, "prompt")
 async def finalizer_prompt(user_query: str, tool_calls: List[Dict[str, Any]]) -> str:
-    actions = "\n".join(f'Step: {t["step"]}, Result: {t["result"]}' for t in tool_calls)
+    actions = "\n".join(
+        f'Step: {t["step"]}, Result: {t["result"]}' if "result" in t else f'Step: {t["step"]}, Error: {t["error"]}'
+        for t in tool_calls
+    )
     return f"""### AI: Podsumowanie wykonanych działań i analiza błędów  
 
     <prompt_objective>  
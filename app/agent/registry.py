@@ -0,0 +1,149 @@
+import re
+from dataclasses import dataclass
+from inspect import Parameter, getdoc, signature
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Type
+
+from pydantic import BaseModel, ConfigDict, create_model
+
+ToolFunction = Callable[..., Awaitable[Any]]
+
+ARG_LINE = re.compile(r"^\s+(\w+):\s*(.+)$")
+
+
+@dataclass(frozen=True)
+class RegisteredTool:
+    """A tool with everything the agent needs precomputed at registration"""
+    name: str
+    func: ToolFunction
+    description: str
+    arguments_model: Type[BaseModel]
+    json_schema: Dict[str, Any]
+
+    def validate(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Check and coerce arguments; raises pydantic.ValidationError on bad input"""
+        return self.arguments_model.model_validate(arguments).model_dump(exclude_unset=True)
+
+    async def __call__(self, **arguments: Any) -> Any:
+        return await self.func(**arguments)
+
+
+def _type_name(annotation: Any) -> str:
+    if annotation == Parameter.empty:
+        return "any"
+    if hasattr(annotation, "__name__"):
+        return annotation.__name__
+    return str(annotation)
+
+
+def _describe(name: str, func: ToolFunction) -> str:
+    """Prose description used in JSON-mode prompts"""
+    params = []
+    for param_name, param in signature(func).parameters.items():
+        default = f" (default: {param.default})" if param.default != Parameter.empty else ""
+        params.append(f"{param_name}: {_type_name(param.annotation)}{default}")
+    doc = getdoc(func) or "No description available"
+    return f"- {name}: {doc}\n  Parameters: {', '.join(params)}"
+
+
+def _split_doc(func: ToolFunction) -> tuple:
+    """Summary text and per-argument descriptions from a Google-style docstring"""
+    doc = getdoc(func) or ""
+    summary, _, args = doc.partition("Args:")
+    arguments = {}
+    for line in args.splitlines():
+        match = ARG_LINE.match(line)
+        if match:
+            arguments[match.group(1)] = match.group(2).strip()
+    return " ".join(summary.split()), arguments
+
+
+def _arguments_model(name: str, func: ToolFunction) -> Type[BaseModel]:
+    fields: Dict[str, Any] = {}
+    extra = "forbid"
+    for param_name, param in signature(func).parameters.items():
+        if param.kind == Parameter.VAR_KEYWORD:
+            extra = "allow"
+            continue
+        annotation = Any if param.annotation == Parameter.empty else param.annotation
+        default = ... if param.default == Parameter.empty else param.default
+        fields[param_name] = (annotation, default)
+    return create_model(f"{name}_arguments", __config__=ConfigDict(extra=extra), **fields)
+
+
+def _json_schema(name: str, func: ToolFunction, model: Type[BaseModel]) -> Dict[str, Any]:
+    """Function-calling schema in the OpenAI tools format"""
+    summary, arguments = _split_doc(func)
+    parameters = model.model_json_schema()
+    parameters.pop("title", None)
+    for param_name, schema in parameters.get("properties", {}).items():
+        schema.pop("title", None)
+        if param_name in arguments:
+            schema["description"] = arguments[param_name]
+    parameters.setdefault("required", [])
+    return {
+        "type": "function",
+        "function": {"name": name, "description": summary, "parameters": parameters},
+    }
+
+
+class ToolRegistry:
+    """
+    Agent tools, registered once at import time.
+
+    Descriptions, JSON schemas and argument models are built on registration,
+    so reading them on the request path costs nothing.
+    """
+
+    def __init__(self):
+        self._tools: Dict[str, RegisteredTool] = {}
+        self._descriptions = ""
+        self._schemas: List[Dict[str, Any]] = []
+
+    def register(self, func: Optional[ToolFunction] = None, *, name: Optional[str] = None):
+        """Decorator adding a tool; the function itself is returned unchanged"""
+        def decorator(func: ToolFunction) -> ToolFunction:
+            tool_name = name or func.__name__
+            model = _arguments_model(tool_name, func)
+            self._tools[tool_name] = RegisteredTool(
+                name=tool_name,
+                func=func,
+                description=_describe(tool_name, func),
+                arguments_model=model,
+                json_schema=_json_schema(tool_name, func, model),
+            )
+            self._descriptions = "\n".join(tool.description for tool in self._tools.values())
+            self._schemas = [tool.json_schema for tool in self._tools.values()]
+            return func
+
+        return decorator(func) if func is not None else decorator
+
+    def get(self, name: str) -> RegisteredTool:
+        """Registered tool by name; raises KeyError for unknown tools"""
+        return self._tools[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tools)
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    @property
+    def tools(self) -> Dict[str, RegisteredTool]:
+        return self._tools
+
+    @property
+    def descriptions(self) -> str:
+        """Prose descriptions of every tool, for JSON-mode prompts"""
+        return self._descriptions
+
+    @property
+    def schemas(self) -> List[Dict[str, Any]]:
+        """Function-calling schemas of every tool"""
+        return self._schemas
+
+
+registry = ToolRegistry()
+tool = registry.register
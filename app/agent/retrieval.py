@@ -0,0 +1,112 @@
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.tools.todoist.index import TaskIndex, tokenize
+
+# Phrases that ask for a due-date window, mapped to (days from, days to) relative to today
+DUE_WINDOWS: Dict[str, Tuple[Optional[int], int]] = {
+    "overdue": (None, -1),
+    "zaległe": (None, -1),
+    "today": (None, 0),
+    "dziś": (None, 0),
+    "dzisiaj": (None, 0),
+    "tomorrow": (1, 1),
+    "jutro": (1, 1),
+    "week": (None, 7),
+    "tydzień": (None, 7),
+    "tygodniu": (None, 7),
+}
+
+
+def _due_date(task: Dict[str, Any]) -> Optional[date]:
+    due = task.get("due")
+    if not due:
+        return None
+    try:
+        return date.fromisoformat(str(due)[:10])
+    except ValueError:
+        return None
+
+
+def due_window(words: Iterable[str]) -> Optional[Tuple[Optional[int], int]]:
+    """The widest due-date window the query asks for, if any"""
+    windows = [DUE_WINDOWS[word] for word in words if word in DUE_WINDOWS]
+    if not windows:
+        return None
+    return max(windows, key=lambda window: window[1])
+
+
+def score_tasks(
+    query: str,
+    tasks: List[Dict[str, Any]],
+    projects: List[Dict[str, Any]],
+    today: Optional[date] = None,
+    index: Optional[TaskIndex] = None,
+) -> List[float]:
+    """
+    Relevance of every task to the query. Pass the workspace's TaskIndex to skip indexing the tasks.
+
+    - words shared with the query, weighted by how rare they are (exact match 1.0, stem match 0.6)
+    - +1.5 when the task belongs to a project named in the query
+    - +2.0 when the due date falls in a window the query asks for ("today", "jutro", "this week", ...)
+    - a small bonus for due dates close to today, so near-term work wins ties
+    """
+    today = today or date.today()
+    words = tokenize(query)
+    index = index if index is not None else TaskIndex(tasks, projects)
+    lexical = index.match(words)
+    window = due_window(words)
+    projects_in_query = index.projects_in(words)
+
+    scores = []
+    for task in tasks:
+        score = lexical.get(task["id"], 0.0)
+        if task.get("project_id") in projects_in_query:
+            score += 1.5
+        due = _due_date(task)
+        if due is not None:
+            days = (due - today).days
+            if window is not None and (window[0] is None or days >= window[0]) and days <= window[1]:
+                score += 2.0
+            score += 0.5 / (1 + abs(days))
+        scores.append(score)
+    return scores
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+def select_tasks(
+    query: Optional[str],
+    tasks: List[Dict[str, Any]],
+    projects: List[Dict[str, Any]],
+    max_tasks: int,
+    max_tokens: int,
+    format_task: Callable[[Dict[str, Any]], str],
+    today: Optional[date] = None,
+    index: Optional[TaskIndex] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Top tasks for the query within the task and token budget.
+
+    Small workspaces that fit the budget are returned unchanged. Selected tasks keep
+    their original order, so the prompt stays stable between similar queries.
+    """
+    if len(tasks) <= max_tasks and sum(estimate_tokens(format_task(t)) for t in tasks) <= max_tokens:
+        return tasks
+
+    scores = score_tasks(query or "", tasks, projects, today, index)
+    ranked = sorted(range(len(tasks)), key=lambda i: -scores[i])
+    chosen: List[int] = []
+    used = 0
+    for i in ranked:
+        if len(chosen) >= max_tasks:
+            break
+        cost = estimate_tokens(format_task(tasks[i]))
+        if used + cost > max_tokens:
+            continue
+        chosen.append(i)
+        used += cost
+    return [tasks[i] for i in sorted(chosen)]
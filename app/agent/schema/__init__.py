@@ -1,6 +1,6 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, SecretStr
 
 class State(BaseModel):
     input: str
@@ -9,4 +9,11 @@ class State(BaseModel):
     steps: List[str] = []
     go_tool: bool = False
     tool_calls: List = []
-    final_response: str = ""
\ No newline at end of file
+    final_response: str = ""
+    mode: str = "multi_node"
+    plan_failed: bool = False
+    llm_summary: bool = False
+    stream: bool = False
+    todoist_token: Optional[SecretStr] = None
+    conversation_id: Optional[str] = None
+    memory: str = ""
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 
 class AgentResponse(BaseModel):
     _thinking: str
@@ -14,3 +14,5 @@ class ExecuteResponse(BaseModel):
     tool_name: str
     arguments: dict
 
+class PlanResponse(BaseModel):
+    actions: List[ExecuteResponse]
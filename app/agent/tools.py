@@ -1,11 +1,12 @@
 # from langchain_core.tools import tool
 from typing import Optional, Dict, Any, List
-from inspect import signature, Parameter, getdoc
 
+from app.agent.registry import RegisteredTool, registry, tool
 from app.tools.todoist.tasks import TodoistTools
 
 todoist = TodoistTools()
 
+@tool
 async def create_todoist_task(
     title: str,
     description: Optional[str] = None,
@@ -23,6 +24,7 @@ async def create_todoist_task(
     """
     return await todoist.create_task(title, description, due_date, project_id, priority)
 
+@tool
 async def complete_todoist_task(task_id: str) -> Dict[str, bool]:
     """Mark a Todoist task as completed. Other word task finished.
     Args:
@@ -31,6 +33,7 @@ async def complete_todoist_task(task_id: str) -> Dict[str, bool]:
     return await todoist.complete_task(task_id)
 
 
+@tool
 async def get_todoist_tasks(project_id: Optional[str] = None) -> List[Dict[str, Any]]:
     """Get all Todoist tasks, optionally filtered by project.
     Args:
@@ -39,6 +42,7 @@ async def get_todoist_tasks(project_id: Optional[str] = None) -> List[Dict[str,
     return await todoist.get_tasks(project_id)
 
 
+@tool
 async def update_todoist_task(
     task_id: str,
     title: Optional[str] = None,
@@ -57,6 +61,7 @@ async def update_todoist_task(
     return await todoist.update_task(task_id, title, description, priority, due_date)
 
 
+@tool
 async def reopen_todoist_task(task_id: str) -> Dict[str, bool]:
     """Reopen a completed Todoist task.
     Args:
@@ -65,6 +70,7 @@ async def reopen_todoist_task(task_id: str) -> Dict[str, bool]:
     return await todoist.reopen_task(task_id)
 
 
+@tool
 async def delete_todoist_task(task_id: str) -> Dict[str, bool]:
     """Delete a Todoist task. Not to be confused with the task of theisaccomplished.
     Args:
@@ -73,45 +79,62 @@ async def delete_todoist_task(task_id: str) -> Dict[str, bool]:
     return await todoist.delete_task(task_id)
 
 
+@tool
 async def get_todoist_projects() -> List[Dict[str, Any]]:
     """Get all Todoist projects."""
     return await todoist.get_projects()
 
 
+@tool
 async def get_active_todoist_tasks() -> List[Dict[str, Any]]:
     """Get all active (not completed) Todoist tasks."""
     return await todoist.get_active_tasks()
 
-async def get_tools():
-    return {
-        "create_todoist_task": create_todoist_task,
-        "complete_todoist_task": complete_todoist_task,
-        "get_todoist_tasks": get_todoist_tasks,
-        "update_todoist_task": update_todoist_task,
-        "reopen_todoist_task": reopen_todoist_task,
-        "delete_todoist_task": delete_todoist_task,
-        "get_todoist_projects": get_todoist_projects,
-        "get_active_todoist_tasks": get_active_todoist_tasks
-    }
-
-async def get_tool_descriptions():
-    tool_descriptions = []
-    tools = await get_tools()
-    for name, tool in tools.items():
-        sig = signature(tool)
-        params = []
-        for param_name, param in sig.parameters.items():
-            if param.annotation == Parameter.empty:
-                param_type = "any"
-            elif hasattr(param.annotation, "__name__"):
-                param_type = param.annotation.__name__
-            else:
-                param_type = str(param.annotation)
-            
-            default = f" (default: {param.default})" if param.default != Parameter.empty else ""
-            params.append(f"{param_name}: {param_type}{default}")
-        
-        params_str = ", ".join(params)
-        doc = getdoc(tool) or "No description available"
-        tool_descriptions.append(f"- {name}: {doc}\n  Parameters: {params_str}")
-    return "\n".join(tool_descriptions)
+@tool
+async def search_todoist_tasks(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Find active Todoist tasks by words from their title, labels or project name. Use it to look up task IDs.
+    Args:
+        query: Words describing the task, e.g. 'groceries' or 'dentist appointment'
+        limit: Maximum number of tasks to return
+    """
+    return await todoist.search_tasks(query, limit)
+
+@tool
+async def bulk_create_todoist_tasks(tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Create many Todoist tasks at once. Prefer it over repeated create_todoist_task calls.
+    Args:
+        tasks: Tasks to create, each with 'title' and optional 'description', 'due_date', 'project_id', 'priority'
+    """
+    return await todoist.bulk_create(tasks)
+
+@tool
+async def bulk_complete_todoist_tasks(task_ids: List[str]) -> Dict[str, Any]:
+    """Mark many Todoist tasks as completed at once.
+    Args:
+        task_ids: IDs of the tasks to complete
+    """
+    return await todoist.bulk_complete(task_ids)
+
+@tool
+async def bulk_update_todoist_tasks(updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Update many Todoist tasks at once.
+    Args:
+        updates: Changes to apply, each with 'task_id' and optional 'title', 'description', 'priority', 'due_date'
+    """
+    return await todoist.bulk_update(updates)
+
+@tool
+async def bulk_delete_todoist_tasks(task_ids: List[str]) -> Dict[str, Any]:
+    """Delete many Todoist tasks at once.
+    Args:
+        task_ids: IDs of the tasks to delete
+    """
+    return await todoist.bulk_delete(task_ids)
+
+async def get_tools() -> Dict[str, RegisteredTool]:
+    """Registered tools by name"""
+    return registry.tools
+
+async def get_tool_descriptions() -> str:
+    """Prose descriptions of the registered tools"""
+    return registry.descriptions
@@ -1,39 +1,104 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 from app.core import logger
+from app.core.logging import clip, sampling_stats
+from app.core.metrics import collect_spans, render_all, server_timing, summarize_spans
 from ..core.config import get_settings
-from .models import ChatRequest, ChatResponse
+from .models import ChatRequest, ChatResponse, JobResponse
 from app.agent.agent import Agent, State
+from app.agent.executor import execution_stats
+from app.agent.finalizer import finalizer_stats
+from app.agent.jobs import JobQueueFull, get_job_runner
+from app.agent.llm_cache import get_llm_cache
+from app.agent.memory import get_memory_store
+from app.tools.audio.transcription import (
+    CHUNK_SIZE,
+    AudioTooLarge,
+    TranscriptionQueueFull,
+    get_transcription_pool,
+    spool_upload,
+)
+from app.tools.todoist.client import account_key, resolve_token
+from app.tools.todoist.tasks import tenants, workspace_cache
 
 # Setup router and logging
 router = APIRouter()
+# Served at the root, where Prometheus scrapes by default
+metrics_router = APIRouter()
 settings = get_settings()
 
+def _require_token(token: Optional[str]) -> Optional[str]:
+    """
+    The user's Todoist token. Without one the request would act on the operator's
+    TODOIST_API_KEY account, so it is rejected unless TODOIST_REQUIRE_TOKEN is off.
+    """
+    if not token and get_settings().TODOIST_REQUIRE_TOKEN:
+        raise HTTPException(status_code=401, detail="A Todoist token is required to act on your account")
+    return token or None
+
+
+def _token(request: ChatRequest) -> Optional[str]:
+    return _require_token(request.todoist_token.get_secret_value() if request.todoist_token else None)
+
+
+def _spans(debug_metrics: Optional[str]):
+    """Collects the request's node, LLM, Todoist and prompt spans when the X-Debug-Metrics header is set"""
+    enabled = debug_metrics is not None and debug_metrics.lower() in ("1", "true", "yes")
+    return collect_spans() if enabled else nullcontext()
+
+
+def _with_metrics(details: Dict[str, Any], spans: Optional[List[Dict[str, Any]]], response: Response) -> Dict[str, Any]:
+    if spans is None:
+        return details
+    summary = summarize_spans(spans)
+    response.headers["Server-Timing"] = server_timing(summary)
+    return {**details, "metrics": summary}
+
+
 @router.post("/chat", response_model=ChatResponse)
-async def chat_with_agent(request: ChatRequest) -> ChatResponse:
+async def chat_with_agent(
+    request: ChatRequest, response: Response, x_debug_metrics: Optional[str] = Header(None)
+) -> ChatResponse:
     """
     Chat with the Todoist agent
+
+    With the X-Debug-Metrics: 1 header, details.metrics holds the time spent per node,
+    LLM call, Todoist call and prompt build, and Server-Timing the totals per kind.
     """
     try:
-        logger.info(f"Received {request.type} request with input: {request.input}")
+        logger.info("Received {} request with input: {}", request.type, clip(request.input))
         
         if request.type == "audio":
             logger.warning("Audio input type not implemented")
             raise HTTPException(
                 status_code=400,
-                detail="Audio input is not implemented yet"
+                detail="Audio input is not implemented for JSON requests; upload the recording to /chat/audio"
             )
+        token = _token(request)
             
         # Process the request through the agent
         logger.info("Starting agent processing")
-        result = await Agent.process(request.input)
+        with _spans(x_debug_metrics) as spans:
+            result = await Agent.process(
+                request.input,
+                mode=request.mode,
+                llm_summary=request.llm_summary,
+                todoist_token=token,
+                conversation_id=request.conversation_id,
+            )
             
         logger.info("Successfully processed request")
-        logger.debug(f"Agent response: {result['response']}")
+        logger.debug("Agent response: {}", clip(result["response"]))
         
         return ChatResponse(
             success=True,
-            details=result
+            details=_with_metrics(result, spans, response)
         )
         
     except HTTPException as e:
@@ -45,3 +110,202 @@ async def chat_with_agent(request: ChatRequest) -> ChatResponse:
             status_code=500,
             detail=str(e)
         )
+
+@router.post("/chat/jobs", response_model=JobResponse, status_code=202)
+async def submit_chat_job(request: ChatRequest) -> JobResponse:
+    """
+    Queue a chat request and return its job ID without waiting for the agent.
+
+    Poll GET /chat/jobs/{job_id} for the result. Answers 429 when the queue, or this
+    account's share of it, is full.
+    """
+    logger.info("Received {} job with input: {}", request.type, clip(request.input))
+    if request.type == "audio":
+        raise HTTPException(
+            status_code=400,
+            detail="Audio input is not implemented for JSON requests; upload the recording to /chat/audio"
+        )
+    token = _token(request)
+    payload = request.model_dump(include={"input", "mode", "llm_summary", "conversation_id"})
+    try:
+        job = await get_job_runner().submit(payload, tenant=account_key(resolve_token(token)), token=token)
+    except JobQueueFull as e:
+        logger.warning(f"Job queue is full: {str(e)}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    return JobResponse(**job.to_dict())
+
+
+@router.get("/chat/jobs/{job_id}", response_model=JobResponse)
+async def get_chat_job(job_id: str, wait: float = Query(0.0, ge=0.0, le=60.0)) -> JobResponse:
+    """
+    Status and, once finished, result of a chat job.
+
+    With wait, the request is held for up to that many seconds until the job is done,
+    so clients can long-poll instead of polling in a tight loop.
+    """
+    job = await get_job_runner().wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobResponse(**job.to_dict())
+
+
+async def _audio_chunks(request: Request) -> AsyncIterator[bytes]:
+    """Chunks of the recording: the "file" field of a multipart form, or the raw request body"""
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail='Multipart upload needs a "file" field')
+        while chunk := await upload.read(CHUNK_SIZE):
+            yield chunk
+        return
+    async for chunk in request.stream():
+        yield chunk
+
+
+@router.post("/chat/audio", response_model=ChatResponse)
+async def chat_with_agent_audio(
+    request: Request,
+    response: Response,
+    mode: Optional[Literal["multi_node", "single_shot"]] = None,
+    llm_summary: bool = False,
+    conversation_id: Optional[str] = Query(None, max_length=128),
+    x_todoist_token: Optional[str] = Header(None),
+    x_debug_metrics: Optional[str] = Header(None),
+) -> ChatResponse:
+    """
+    Chat with the Todoist agent by voice.
+
+    The recording is sent as the raw request body or as the "file" field of a multipart
+    form and spooled to disk, transcribed in the bounded transcription pool, and the
+    transcript is processed like a text request. details.transcription holds the
+    transcript, its duration and the real-time factor; X-Debug-Metrics works as for /chat.
+    """
+    settings = get_settings()
+    token = _require_token(x_todoist_token)
+    if int(request.headers.get("content-length") or 0) > settings.AUDIO_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Audio is larger than {settings.AUDIO_MAX_BYTES} bytes")
+    try:
+        path = await spool_upload(_audio_chunks(request), settings.AUDIO_MAX_BYTES, settings.AUDIO_SPOOL_DIR)
+    except AudioTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    # The pool removes the spooled file once it is done with it
+    try:
+        transcription = await get_transcription_pool().transcribe(path)
+    except TranscriptionQueueFull as e:
+        logger.warning(f"Transcription queue is full: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Could not read audio: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error transcribing audio: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=502, detail=f"Transcription failed: {str(e)}")
+    if not transcription.text:
+        raise HTTPException(status_code=422, detail="No speech recognized in the recording")
+
+    logger.info("Transcribed audio request: {}", clip(transcription.text))
+    try:
+        with _spans(x_debug_metrics) as spans:
+            result = await Agent.process(
+                transcription.text,
+                mode=mode,
+                llm_summary=llm_summary,
+                todoist_token=token,
+                conversation_id=conversation_id,
+            )
+    except Exception as e:
+        logger.error(f"Unexpected error processing request: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    details = _with_metrics({**result, "transcription": transcription.to_dict()}, spans, response)
+    return ChatResponse(success=True, details=details)
+
+def _ndjson(event: Dict[str, Any]) -> str:
+    return json.dumps(event, ensure_ascii=False, default=str) + "\n"
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_with_agent_stream(
+    request: ChatRequest, accept: Optional[str] = Header(None), x_debug_metrics: Optional[str] = Header(None)
+) -> StreamingResponse:
+    """
+    Chat with the Todoist agent, streaming progress events as the graph runs.
+
+    Responds with newline-delimited JSON, or with server-sent events when the
+    client accepts text/event-stream. Every stream ends with a "final" or an "error" event;
+    with X-Debug-Metrics the "final" event carries the metrics described for /chat.
+    """
+    logger.info("Received streaming {} request with input: {}", request.type, clip(request.input))
+    if request.type == "audio":
+        logger.warning("Audio input type not implemented")
+        raise HTTPException(
+            status_code=400,
+            detail="Audio input is not implemented for JSON requests; upload the recording to /chat/audio"
+        )
+
+    token = _token(request)
+    use_sse = accept is not None and "text/event-stream" in accept
+    encode = _sse if use_sse else _ndjson
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            with _spans(x_debug_metrics) as spans:
+                async for event in Agent.stream(
+                    request.input,
+                    mode=request.mode,
+                    llm_summary=request.llm_summary,
+                    todoist_token=token,
+                    conversation_id=request.conversation_id,
+                ):
+                    if event["event"] == "final" and spans is not None:
+                        event = {**event, "metrics": summarize_spans(spans)}
+                    yield encode(event)
+        except Exception as e:
+            logger.error(f"Unexpected error streaming request: {str(e)}", exc_info=True)
+            yield encode({"event": "error", "error": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/health")
+async def health() -> dict:
+    """
+    Liveness check for load balancers and container health checks
+    """
+    return {"status": "ok"}
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """
+    Per-node, LLM, Todoist and prompt-building latency histograms and token counters
+    in the Prometheus text format, summed over all workers under python -m app.server
+    """
+    return PlainTextResponse(await asyncio.to_thread(render_all), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.get("/agent/stats")
+async def agent_stats() -> dict:
+    """
+    Graph compile time, per-request graph overhead, workspace cache, LLM cache, execute step,
+    finalizer counters, Todoist tenants with their rate governors, conversation memory,
+    the transcription pool (queue depth and real-time factor), the chat job queue, and log sampling
+    """
+    llm_cache = get_llm_cache()
+    memory_store = get_memory_store()
+    return {
+        "agent": Agent.stats(),
+        "workspace_cache": workspace_cache.stats,
+        "llm_cache": llm_cache.stats if llm_cache else None,
+        "execute": execution_stats.stats(),
+        "finalizer": finalizer_stats.stats(),
+        "todoist_tenants": tenants.stats,
+        "memory": memory_store.stats if memory_store else None,
+        "transcription": get_transcription_pool().stats,
+        "jobs": await get_job_runner().stats(),
+        "log_sampling": sampling_stats()
+    }
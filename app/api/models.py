@@ -1,9 +1,28 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, SecretStr
 from typing import Optional, Dict, Any, Literal
 
 class ChatRequest(BaseModel):
     input: str
     type: Literal["text", "audio"] = "text"
+    mode: Optional[Literal["multi_node", "single_shot"]] = None
+    llm_summary: bool = Field(False, description="Always summarize the outcome with the LLM")
+    todoist_token: Optional[SecretStr] = Field(
+        None,
+        description="Todoist API token of the user; required unless TODOIST_REQUIRE_TOKEN is off, "
+        "in which case the configured account is used when omitted",
+    )
+    conversation_id: Optional[str] = Field(
+        None, max_length=128, description="Keeps a compact history across requests, so follow-ups can refer to earlier tasks"
+    )
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    result: Optional[Dict[str, Any]] = Field(None, description="The agent response once the job succeeded")
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
 
 class ChatResponse(BaseModel):
     success: bool
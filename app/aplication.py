@@ -1,15 +1,52 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from app.api.endpoints import router
+from app.api.endpoints import metrics_router, router
+from app.agent.agent import Agent
+from app.agent.jobs import get_job_runner
+from app.agent.memory import get_memory_store
+from app.agent.openai_service import close_async_client
+from app.core import logger, metrics
 from app.core.config import get_settings
+from app.core.tracing import shutdown_trace_exporter
+from app.tools.audio.transcription import shutdown_transcription_pool
+from app.tools.todoist.client import open_todoist_clients, close_todoist_clients
 
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compile the agent graph once, before the first request is served
+    Agent.get_workflow()
+    open_todoist_clients()
+    get_job_runner().start()
+    # Fails here rather than on the first follow-up when the store cannot serve several workers
+    get_memory_store()
+    snapshots = None
+    if metrics.multiprocess_dir is not None:
+        snapshots = asyncio.create_task(metrics.write_snapshots(settings.SERVER_METRICS_INTERVAL))
+    yield
+    # Uvicorn has already drained open requests; give running chat jobs the same grace period
+    await get_job_runner().drain(settings.SERVER_GRACEFUL_TIMEOUT)
+    if snapshots is not None:
+        snapshots.cancel()
+        await asyncio.gather(snapshots, return_exceptions=True)
+    await close_async_client()
+    await close_todoist_clients()
+    shutdown_trace_exporter()
+    shutdown_transcription_pool()
+    # Log sinks write from a background thread; flush it before the process exits
+    await logger.complete()
+
 # Create FastAPI app
 app = FastAPI(
     title="Todoist Task Management Agent",
     version="0.1.0",
-    description="Todoist Task Management Agent API"
+    description="Todoist Task Management Agent API",
+    lifespan=lifespan
 )
 
 # Add routes
-app.include_router(router, prefix=settings.API_V1_STR)
\ No newline at end of file
+app.include_router(router, prefix=settings.API_V1_STR)
+app.include_router(metrics_router)
@@ -1,11 +1,28 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from pydantic import Field
+from typing import Dict, Optional, Literal
 # from dotenv import load_dotenv, find_dotenv
 
 # load_dotenv(find_dotenv(), override=True)
 
-class Settings(BaseSettings):
+class LoggingSettings(BaseSettings):
+    """Logging options; kept apart because the logger is set up before the API keys are read"""
+    LOG_DIR: str = "logs"
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE_LEVEL: str = "INFO"
+    # Sinks write from a background thread instead of the request's thread
+    LOG_ENQUEUE: bool = True
+    # Longest logged message, and longest payload rendered with clip()
+    LOG_MAX_MESSAGE_CHARS: int = 4000
+    LOG_MAX_VALUE_CHARS: int = 500
+    # Fraction of DEBUG/INFO records kept per logger name prefix, e.g. {"app.agent.executor": 0.1}
+    LOG_SAMPLING: Dict[str, float] = {}
+
+    class Config:
+        case_sensitive = True
+
+class Settings(LoggingSettings):
     OPENAI_API_KEY: str = Field(..., env="OPENAI_API_KEY")
     ANTHROPIC_API_KEY: str = Field(..., env="ANTHROPIC_API_KEY")
     LANGFUSE_SECRET_KEY: str = Field(..., env="LANGFUSE_SECRET_KEY")
@@ -17,15 +34,120 @@ class Settings(BaseSettings):
     APP_NAME: str = "Todoist Agent"
     API_V1_STR: str = "/api/v1"
     
+    # Serving (python -m app.server)
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    # 0 uses one worker per CPU available to the process; more than one worker needs
+    # JOBS_BACKEND=sqlite and MEMORY_BACKEND sqlite or none (the Docker image sets them)
+    SERVER_WORKERS: int = 1
+    # "auto" picks uvloop and httptools when they are installed
+    SERVER_LOOP: Literal["auto", "asyncio", "uvloop"] = "auto"
+    SERVER_HTTP: Literal["auto", "h11", "httptools"] = "auto"
+    SERVER_LOG_LEVEL: str = "info"
+    SERVER_ACCESS_LOG: bool = False
+    # Seconds that open requests and running chat jobs get to finish on shutdown
+    SERVER_GRACEFUL_TIMEOUT: float = 30.0
+    # With several workers each writes its metrics here, and /metrics serves the sum
+    SERVER_METRICS_DIR: str = "data/metrics"
+    # Seconds between a worker's metric snapshots; the worker answering /metrics is always current
+    SERVER_METRICS_INTERVAL: float = 5.0
+
     # Agent Settings
     MODEL_NAME: str = "claude-3-5-sonnet-20241022"
     TEMPERATURE: float = 0.3
     MAX_TOKENS: int = 4096
+    AGENT_MODE: Literal["multi_node", "single_shot"] = "multi_node"
+    PLAN_MAX_CONCURRENCY: int = 4
+    EXECUTE_MAX_CONCURRENCY: int = 4
+    EXECUTE_TOOL_CALLING: Literal["json", "native"] = "json"
+    CONTEXT_MAX_TASKS: int = 50
+    CONTEXT_MAX_TASK_TOKENS: int = 2000
+    # Conversation memory for follow-up requests
+    MEMORY_BACKEND: Literal["memory", "sqlite", "none"] = "memory"
+    MEMORY_SQLITE_PATH: str = "data/memory.sqlite3"
+    MEMORY_MAX_SESSIONS: int = 10_000
+    MEMORY_MAX_TURNS: int = 5
+    MEMORY_MAX_TASKS: int = 20
+
+    # Async /chat/jobs mode: queue backend, in-process agent workers and limits
+    JOBS_BACKEND: Literal["memory", "sqlite"] = "memory"
+    JOBS_SQLITE_PATH: str = "data/jobs.sqlite3"
+    # 0 leaves running jobs to separate `python -m app.agent.jobs` processes
+    JOBS_WORKERS: int = 4
+    JOBS_MAX_PER_TENANT: int = 1
+    JOBS_MAX_QUEUED: int = 1000
+    JOBS_MAX_QUEUED_PER_TENANT: int = 20
+    JOBS_RESULT_TTL: float = 3600.0
+    JOBS_POLL_INTERVAL: float = 0.2
+    # A running SQLite job whose worker has not renewed its claim for this long is marked failed
+    JOBS_LEASE_SECONDS: float = 60.0
+
+    # Voice input: speech-to-text backend and its worker pool
+    TRANSCRIPTION_BACKEND: Literal["openai", "local"] = "openai"
+    TRANSCRIPTION_MODEL: str = "whisper-1"
+    TRANSCRIPTION_EXECUTOR: Literal["thread", "process"] = "thread"
+    TRANSCRIPTION_WORKERS: int = 2
+    TRANSCRIPTION_MAX_QUEUE: int = 16
+    # Seconds of work per second of audio for the local stand-in backend
+    TRANSCRIPTION_LOCAL_RTF: float = 0.0
+    # The OpenAI audio API accepts files up to 25 MB
+    AUDIO_MAX_BYTES: int = 25 * 1024 * 1024
+    AUDIO_SPOOL_DIR: Optional[str] = None
+
+    # LLM client settings
+    OPENAI_BASE_URL: Optional[str] = None
+    OPENAI_TIMEOUT: float = 60.0
+    OPENAI_CONNECT_TIMEOUT: float = 5.0
+    OPENAI_MAX_RETRIES: int = 3
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_MAX_CONCURRENCY: int = 32
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_SIZE: int = 512
+    LLM_CACHE_DIR: Optional[str] = None
+    LLM_CACHE_DISK_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Todoist settings
+    TODOIST_POOL_SIZE: int = 20
+    TODOIST_CONNECT_TIMEOUT: float = 5.0
+    TODOIST_READ_TIMEOUT: float = 30.0
+    WORKSPACE_CACHE_TTL: float = 30.0
+    # Accounts whose snapshots are kept, and the total cached tasks across them
+    WORKSPACE_CACHE_MAX_TENANTS: int = 1000
+    WORKSPACE_CACHE_MAX_TASKS: int = 500_000
+    # Accounts whose clients, replicas and rate governors are kept
+    TODOIST_MAX_TENANTS: int = 1000
+    # Reject chat requests without the user's token (401); turn off for a single-account
+    # deployment where every request acts on the TODOIST_API_KEY account
+    TODOIST_REQUIRE_TOKEN: bool = True
+    TODOIST_SYNC_ENABLED: bool = True
+    TODOIST_SYNC_URL: str = "https://api.todoist.com/sync/v9"
+    # Commands per Sync API request; Todoist accepts at most 100
+    TODOIST_SYNC_BATCH_SIZE: int = 100
+    # Request budget per Todoist token and server worker (Todoist allows roughly 1000 requests
+    # per 15 minutes per token, so divide by SERVER_WORKERS)
+    TODOIST_RATE_LIMIT: float = 1.0
+    TODOIST_RATE_BURST: int = 50
+    TODOIST_MAX_RETRIES: int = 3
+    TODOIST_RETRY_BASE_DELAY: float = 0.5
+    TODOIST_RETRY_MAX_DELAY: float = 30.0
+
+    # Tracing settings
+    TRACE_EXPORTER: Literal["langfuse", "file", "memory", "none"] = "langfuse"
+    TRACE_FILE_PATH: str = "logs/traces.jsonl"
+    TRACE_QUEUE_SIZE: int = 1000
+    TRACE_BATCH_SIZE: int = 50
+    TRACE_FLUSH_INTERVAL: float = 1.0
+    TRACE_DROP_POLICY: Literal["drop_new", "drop_oldest", "block"] = "drop_new"
+    TRACE_BLOCK_TIMEOUT: float = 0.05
     
     class Config:
         # env_file = ".env"
         case_sensitive = True
 
+@lru_cache()
+def get_logging_settings() -> LoggingSettings:
+    return LoggingSettings()
+
 @lru_cache()
 def get_settings() -> Settings:
     settings = Settings()
@@ -1,36 +1,140 @@
+import random
+import reprlib
 import sys
-from loguru import logger
 from pathlib import Path
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from app.core.config import get_logging_settings
+
+FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+
+# Containers are abbreviated while they are rendered, so a clipped task list costs the same as a short one
+_repr = reprlib.Repr()
+_repr.maxlevel = 3
+_repr.maxdict = _repr.maxlist = _repr.maxtuple = _repr.maxset = 10
+_repr.maxstring = _repr.maxother = 200
+
+_max_value_chars = 500
+
+
+class _Clipped:
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: int):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        text = self.value if isinstance(self.value, str) else _repr.repr(self.value)
+        return text if len(text) <= self.limit else f"{text[:self.limit]}… ({len(text)} chars)"
+
+    def __format__(self, spec: str) -> str:
+        return format(str(self), spec)
+
+
+def clip(value: Any, limit: Optional[int] = None) -> _Clipped:
+    """
+    Log argument rendered only if the record is emitted, abbreviated and cut to
+    LOG_MAX_VALUE_CHARS: logger.info("Plan: {}", clip(plan))
+    """
+    return _Clipped(value, limit or _max_value_chars)
+
+
+class LogSampler:
+    """
+    Keeps a fraction of DEBUG and INFO records per logger name prefix; the longest
+    matching prefix wins. Warnings and errors always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float], seed: Optional[int] = None):
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self.kept = 0
+        self.dropped = 0
+        self._random = random.Random(seed)
+        self._by_name: Dict[str, float] = {}
+
+    def rate(self, name: str) -> float:
+        rate = self._by_name.get(name)
+        if rate is None:
+            rate = next((r for prefix, r in self.rates if name == prefix or name.startswith(prefix + ".")), 1.0)
+            self._by_name[name] = rate
+        return rate
+
+    def keep(self, record: Dict[str, Any]) -> bool:
+        if record["level"].no >= 30 or not self.rates:
+            return True
+        rate = self.rate(record["name"] or "")
+        if rate >= 1.0 or self._random.random() < rate:
+            self.kept += 1
+            return True
+        self.dropped += 1
+        return False
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {"rates": dict(self.rates), "kept": self.kept, "dropped": self.dropped}
+
+
+sampler = LogSampler({})
+
+
+def sampling_stats() -> Dict[str, Any]:
+    """Records kept and dropped by LOG_SAMPLING since startup"""
+    return sampler.stats
+
+
+def _patch(record: Dict[str, Any], max_chars: int) -> None:
+    # Runs once per record, before any sink: truncate, then decide whether it is sampled
+    message = record["message"]
+    if len(message) > max_chars:
+        record["message"] = f"{message[:max_chars]}… ({len(message)} chars)"
+    record["extra"]["sampled"] = sampler.keep(record)
+
+
+def _sampled(record: Dict[str, Any]) -> bool:
+    return record["extra"].get("sampled", True)
+
 
 def setup_logging():
-    # Create logs directory if it doesn't exist
-    log_dir = Path("logs")
+    global sampler, _max_value_chars
+    settings = get_logging_settings()
+    log_dir = Path(settings.LOG_DIR)
     log_dir.mkdir(exist_ok=True)
-    
-    # Configure default logger format
+    sampler = LogSampler(settings.LOG_SAMPLING)
+    _max_value_chars = settings.LOG_MAX_VALUE_CHARS
+
+    # Records below every sink's level are dropped before their message is formatted
     logger.configure(
         handlers=[
             {
                 "sink": sys.stdout,
                 "colorize": True,
                 "format": "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-                "level": "INFO"
+                "level": settings.LOG_LEVEL,
+                "filter": _sampled,
+                "enqueue": settings.LOG_ENQUEUE,
             },
             {
-                "sink": "logs/app.log",
+                "sink": str(log_dir / "app.log"),
                 "rotation": "500 MB",
                 "retention": "10 days",
-                "format": "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-                "level": "DEBUG"
+                "format": FORMAT,
+                "level": settings.LOG_FILE_LEVEL,
+                "filter": _sampled,
+                "enqueue": settings.LOG_ENQUEUE,
             },
             {
-                "sink": "logs/error.log",
+                "sink": str(log_dir / "error.log"),
                 "rotation": "100 MB",
                 "retention": "10 days",
-                "format": "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-                "level": "ERROR"
+                "format": FORMAT,
+                "level": "ERROR",
+                "enqueue": settings.LOG_ENQUEUE,
             }
-        ]
+        ],
+        patcher=lambda record: _patch(record, settings.LOG_MAX_MESSAGE_CHARS),
     )
-    
+
     return logger
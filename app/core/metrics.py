@@ -0,0 +1,279 @@
+import asyncio
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; from a cached prompt build up to a slow LLM call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Spans (node, llm, todoist, prompt) of the current chat request; only set when the client asked for them
+request_spans: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("request_spans", default=None)
+
+# Directory where each worker of python -m app.server writes its metrics; None in a single process
+multiprocess_dir: Optional[str] = None
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic total per label combination; label values are passed positionally"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def dump(self) -> List[Any]:
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def load(self, entries: List[Any]) -> None:
+        for labels, value in entries:
+            self.inc(value, *labels)
+
+    def render(self) -> Iterator[str]:
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labels, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Bucketed observations per label combination, rendered cumulatively like Prometheus expects"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label combination: count per bucket (the last one is +Inf), sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, *labels: str) -> int:
+        values = self._values.get(labels)
+        return sum(values[0]) if values else 0
+
+    def dump(self) -> List[Any]:
+        with self._lock:
+            return [[list(labels), list(counts), total[0]] for labels, (counts, total) in self._values.items()]
+
+    def load(self, entries: List[Any]) -> None:
+        for labels, counts, total in entries:
+            # A worker started with other buckets (e.g. during a deploy) cannot be added up
+            if len(counts) != len(self.buckets) + 1:
+                continue
+            with self._lock:
+                mine, mine_total = self._values.setdefault(tuple(labels), ([0] * len(counts), [0.0]))
+                for index, count in enumerate(counts):
+                    mine[index] += count
+                mine_total[0] += total
+
+    def render(self) -> Iterator[str]:
+        for labels, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {_number(total[0])}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Metrics of this process in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+
+    def _register(self, metric):
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(
+        self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def dump(self) -> Dict[str, List[Any]]:
+        """Values of every metric, as JSON, to be added up with other workers' by combined"""
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+    def combined(self, dumps: List[Dict[str, List[Any]]]) -> "MetricsRegistry":
+        """A registry with the same metrics holding the sum of the dumps; unknown metrics are skipped"""
+        total = MetricsRegistry()
+        for name, metric in self._metrics.items():
+            if metric.kind == "histogram":
+                copy = total.histogram(name, metric.help, metric.labels, metric.buckets)
+            else:
+                copy = total.counter(name, metric.help, metric.labels)
+            for dump in dumps:
+                copy.load(dump.get(name, []))
+        return total
+
+
+registry = MetricsRegistry()
+
+request_seconds = registry.histogram(
+    "agent_request_duration_seconds", "Wall time of Agent.process and Agent.stream", ["mode"]
+)
+node_seconds = registry.histogram("agent_node_duration_seconds", "Wall time of each LangGraph node run", ["node"])
+prompt_seconds = registry.histogram(
+    "agent_prompt_build_duration_seconds", "Time to build a system prompt, including the workspace read", ["prompt"]
+)
+llm_seconds = registry.histogram(
+    "llm_request_duration_seconds", "Latency of OpenAI completions, cache hits excluded", ["name", "model"]
+)
+llm_tokens = registry.counter("llm_tokens_total", "Tokens used by OpenAI completions", ["name", "model", "type"])
+llm_cache_hits = registry.counter("llm_cache_hits_total", "Completions served from the response cache", ["name"])
+todoist_seconds = registry.histogram(
+    "todoist_request_duration_seconds", "Latency of each Todoist API attempt", ["endpoint", "outcome"]
+)
+
+
+def enable_multiprocess(directory: str) -> None:
+    """
+    Called by the supervisor before forking: every worker writes its metrics to the
+    directory and /metrics serves the sum over all of them. Files of a previous run are
+    removed; files of workers that exited during this run are kept, so totals never drop.
+    """
+    global multiprocess_dir
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        os.remove(path)
+    multiprocess_dir = directory
+
+
+def write_snapshot() -> None:
+    """Write this worker's metrics to the shared directory, replacing its previous snapshot"""
+    if multiprocess_dir is None:
+        return
+    path = os.path.join(multiprocess_dir, f"{os.getpid()}.json")
+    with open(f"{path}.tmp", "w") as file:
+        json.dump(registry.dump(), file)
+    os.replace(f"{path}.tmp", path)
+
+
+def render_all() -> str:
+    """This process's metrics, or the sum over all workers when running under the supervisor"""
+    if multiprocess_dir is None:
+        return registry.render()
+    write_snapshot()
+    dumps = []
+    for path in glob.glob(os.path.join(multiprocess_dir, "*.json")):
+        try:
+            with open(path) as file:
+                dumps.append(json.load(file))
+        except (OSError, ValueError):
+            continue
+    return registry.combined(dumps).render()
+
+
+async def write_snapshots(interval: float) -> None:
+    """Keep this worker's snapshot at most interval seconds old until cancelled, then write a last one"""
+    try:
+        while True:
+            await asyncio.to_thread(write_snapshot)
+            await asyncio.sleep(interval)
+    finally:
+        write_snapshot()
+
+
+def add_span(kind: str, name: str, seconds: float, **detail: Any) -> None:
+    """Add a span to the current request's breakdown, if one is being collected"""
+    spans = request_spans.get()
+    if spans is not None:
+        spans.append({"kind": kind, "name": name, "ms": round(seconds * 1000, 2), **detail})
+
+
+def timed(histogram: Histogram, kind: str, name: Optional[str] = None) -> Callable:
+    """Decorator for coroutine functions: observe their wall time and add it as a span"""
+
+    def decorator(func: Callable) -> Callable:
+        label = name or func.__name__
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                histogram.observe(elapsed, label)
+                add_span(kind, label, elapsed)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def collect_spans() -> Iterator[List[Dict[str, Any]]]:
+    """Collect the spans of everything run inside the block, e.g. one chat request"""
+    spans: List[Dict[str, Any]] = []
+    token = request_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        request_spans.reset(token)
+
+
+def summarize_spans(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Total milliseconds per kind plus the spans in completion order"""
+    totals: Dict[str, float] = {}
+    for span in spans:
+        totals[span["kind"]] = round(totals.get(span["kind"], 0.0) + span["ms"], 2)
+    return {"total_ms": totals, "spans": spans}
+
+
+def server_timing(summary: Dict[str, Any]) -> str:
+    """Server-Timing header value with the total per kind"""
+    return ", ".join(f"{kind};dur={ms}" for kind, ms in summary["total_ms"].items())
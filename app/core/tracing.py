@@ -0,0 +1,240 @@
+import json
+import queue
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Protocol
+
+from app.core import logger
+from app.core.config import get_settings
+
+
+class TraceSink(Protocol):
+    def export(self, batch: List[Dict[str, Any]]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class InMemorySink:
+    """Keeps exported events in a list, for tests and offline measurements"""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.batches = 0
+
+    def export(self, batch: List[Dict[str, Any]]) -> None:
+        self.events.extend(batch)
+        self.batches += 1
+
+    def close(self) -> None:
+        pass
+
+
+class FileSink:
+    """Appends events as JSON lines to a local file"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, batch: List[Dict[str, Any]]) -> None:
+        with self.path.open("a", encoding="utf-8") as file:
+            for event in batch:
+                file.write(json.dumps(event, default=str, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        pass
+
+
+class LangfuseSink:
+    """Sends generation events to Langfuse, one flush per batch"""
+
+    def __init__(self):
+        from langfuse import Langfuse
+
+        settings = get_settings()
+        self.client = Langfuse(
+            secret_key=settings.LANGFUSE_SECRET_KEY,
+            public_key=settings.LANGFUSE_PUBLIC_KEY,
+            host=settings.LANGFUSE_HOST,
+        )
+
+    def export(self, batch: List[Dict[str, Any]]) -> None:
+        for event in batch:
+            self.client.generation(
+                name=event.get("name"),
+                model=event.get("model"),
+                input=event.get("input"),
+                output=event.get("output"),
+                usage=event.get("usage"),
+                start_time=event.get("start_time"),
+                end_time=event.get("end_time"),
+                metadata=event.get("metadata"),
+                level=event.get("level", "DEFAULT"),
+                status_message=event.get("error"),
+            )
+        self.client.flush()
+
+    def close(self) -> None:
+        self.client.shutdown()
+
+
+class NullSink:
+    def export(self, batch: List[Dict[str, Any]]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class TraceExporter:
+    """
+    Batches trace events on a background thread so exporting never sits on the request path.
+
+    The queue is bounded; when it is full the drop policy decides what happens:
+    - drop_new: the new event is discarded
+    - drop_oldest: the oldest queued event is discarded to make room
+    - block: the caller waits up to block_timeout, then the new event is discarded
+    """
+
+    def __init__(
+        self,
+        sink: TraceSink,
+        queue_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        drop_policy: str = "drop_new",
+        block_timeout: float = 0.05,
+    ):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self.block_timeout = block_timeout
+        self.stats = {"submitted": 0, "exported": 0, "dropped": 0, "failed": 0, "batches": 0}
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._pending = 0
+        self._pending_lock = threading.Condition()
+        self._stopped = threading.Event()
+        self._flush_requested = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._worker.start()
+
+    def submit(self, event: Dict[str, Any]) -> bool:
+        """Queue an event for export. Returns False when the event was dropped."""
+        if self._stopped.is_set():
+            self.stats["dropped"] += 1
+            return False
+        self.stats["submitted"] += 1
+        with self._pending_lock:
+            self._pending += 1
+        if self._put(event):
+            return True
+        self._done(1)
+        self.stats["dropped"] += 1
+        return False
+
+    def _put(self, event: Dict[str, Any]) -> bool:
+        try:
+            if self.drop_policy == "block":
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            pass
+        if self.drop_policy != "drop_oldest":
+            return False
+        try:
+            self._queue.get_nowait()
+            self._done(1)
+            self.stats["dropped"] += 1
+            self._queue.put_nowait(event)
+            return True
+        except (queue.Empty, queue.Full):
+            return False
+
+    def _done(self, count: int) -> None:
+        with self._pending_lock:
+            self._pending -= count
+            self._pending_lock.notify_all()
+
+    def _run(self) -> None:
+        while not (self._stopped.is_set() and self._queue.empty()):
+            batch = self._collect_batch()
+            if batch:
+                self._export(batch)
+
+    def _collect_batch(self) -> List[Dict[str, Any]]:
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(timeout, 0.1)))
+            except queue.Empty:
+                if self._stopped.is_set() or self._flush_requested.is_set():
+                    break
+        return batch
+
+    def _export(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self.sink.export(batch)
+            self.stats["exported"] += len(batch)
+            self.stats["batches"] += 1
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            logger.error(f"Trace export failed: {e}")
+        finally:
+            self._done(len(batch))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Export queued events now and wait until the sink has received them."""
+        self._flush_requested.set()
+        try:
+            with self._pending_lock:
+                return self._pending_lock.wait_for(lambda: self._pending <= 0, timeout=timeout)
+        finally:
+            self._flush_requested.clear()
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Flush pending events, stop the worker and close the sink."""
+        self.flush(timeout)
+        self._stopped.set()
+        self._worker.join(timeout)
+        try:
+            self.sink.close()
+        except Exception as e:
+            logger.error(f"Closing trace sink failed: {e}")
+
+
+def create_sink(kind: str) -> TraceSink:
+    if kind == "langfuse":
+        return LangfuseSink()
+    if kind == "file":
+        return FileSink(get_settings().TRACE_FILE_PATH)
+    if kind == "memory":
+        return InMemorySink()
+    return NullSink()
+
+
+@lru_cache()
+def get_trace_exporter() -> TraceExporter:
+    settings = get_settings()
+    return TraceExporter(
+        sink=create_sink(settings.TRACE_EXPORTER),
+        queue_size=settings.TRACE_QUEUE_SIZE,
+        batch_size=settings.TRACE_BATCH_SIZE,
+        flush_interval=settings.TRACE_FLUSH_INTERVAL,
+        drop_policy=settings.TRACE_DROP_POLICY,
+        block_timeout=settings.TRACE_BLOCK_TIMEOUT,
+    )
+
+
+def shutdown_trace_exporter() -> None:
+    if get_trace_exporter.cache_info().currsize:
+        get_trace_exporter().shutdown()
+        get_trace_exporter.cache_clear()
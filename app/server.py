@@ -0,0 +1,194 @@
+"""
+Production entry point:
+
+    python -m app.server [--workers N] [--port PORT]
+
+The app, the compiled agent graph and the tool registry are built once in the parent
+process, which then binds the socket and forks the uvicorn workers. Workers share the
+preloaded modules copy-on-write and accept from the same socket. The parent restarts
+workers that die and, on SIGTERM or SIGINT, lets every worker drain its in-flight
+requests and chat jobs for up to SERVER_GRACEFUL_TIMEOUT seconds. Workers write their
+metrics to SERVER_METRICS_DIR, so /metrics reports the totals whichever worker answers.
+
+Chat jobs and conversation memory must live in SQLite (JOBS_BACKEND, MEMORY_BACKEND)
+when there is more than one worker, or a job polled on another worker is not found and
+follow-ups lose their history; the server refuses to start otherwise. Todoist rate
+limits (TODOIST_RATE_LIMIT, TODOIST_RATE_BURST) and the workspace cache are per worker.
+
+Use --reload for development; it runs a single auto-reloading process.
+"""
+import argparse
+import importlib.util
+import os
+import signal
+import socket
+import time
+from typing import List, Optional, Set
+
+import uvicorn
+
+from app.core import logger, metrics
+from app.core.config import get_settings
+
+
+def default_workers() -> int:
+    """One worker per CPU the process may run on (cgroup and affinity aware where possible)"""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def shared_state_problems(settings) -> List[str]:
+    """Settings that keep state inside one worker, which the other workers cannot see"""
+    problems = []
+    if settings.JOBS_BACKEND != "sqlite":
+        problems.append('JOBS_BACKEND must be "sqlite"; other workers answer 404 for a job they did not receive')
+    if settings.MEMORY_BACKEND == "memory":
+        problems.append(
+            'MEMORY_BACKEND must be "sqlite" or "none"; follow-ups served by another worker lose their history'
+        )
+    return problems
+
+
+def preload():
+    """Import the app and build what every worker shares; returns the ASGI app"""
+    started = time.perf_counter()
+    from app.aplication import app
+    from app.agent.agent import Agent
+    from app.agent.tools import registry
+
+    Agent.get_workflow()
+    logger.info(
+        f"Preloaded the app, the agent graph and {len(registry)} tools "
+        f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+    )
+    return app
+
+
+def server_config(app, host: str, port: int, loop: str, http: str, log_level: str) -> uvicorn.Config:
+    settings = get_settings()
+    return uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        loop=loop,
+        http=http,
+        log_level=log_level,
+        access_log=settings.SERVER_ACCESS_LOG,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        lifespan="on",
+    )
+
+
+def describe_runtime(loop: str, http: str) -> str:
+    if loop == "auto":
+        loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    if http == "auto":
+        http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return f"{loop} event loop, {http} HTTP parser"
+
+
+class Supervisor:
+    """Forks the workers, restarts the ones that exit and stops them all on SIGTERM or SIGINT"""
+
+    def __init__(self, config: uvicorn.Config, sockets: List[socket.socket], workers: int):
+        self.config = config
+        self.sockets = sockets
+        self.workers = workers
+        self.children: Set[int] = set()
+        self.stopping = False
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                uvicorn.Server(self.config).run(sockets=self.sockets)
+            except BaseException as e:
+                logger.error(f"Worker {os.getpid()} crashed: {str(e)}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children.add(pid)
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def _reap(self) -> List[int]:
+        exited = []
+        while self.children:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            self.children.discard(pid)
+            exited.append(pid)
+        return exited
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for _ in range(self.workers):
+            self._spawn()
+        logger.info(f"Started {self.workers} workers: {sorted(self.children)}")
+        while not self.stopping:
+            for pid in self._reap():
+                if not self.stopping:
+                    logger.warning(f"Worker {pid} exited, starting a new one")
+                    self._spawn()
+            time.sleep(0.2)
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        logger.info(f"Stopping {len(self.children)} workers")
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+        # Workers drain requests, then chat jobs, each for up to the graceful timeout
+        deadline = time.monotonic() + 2 * self.config.timeout_graceful_shutdown + 5
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in self.children:
+            logger.warning(f"Worker {pid} did not stop in time, killing it")
+            os.kill(pid, signal.SIGKILL)
+        for sock in self.sockets:
+            sock.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Serve the Todoist agent API")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="0 uses one per CPU")
+    parser.add_argument("--loop", default=settings.SERVER_LOOP, choices=["auto", "asyncio", "uvloop"])
+    parser.add_argument("--http", default=settings.SERVER_HTTP, choices=["auto", "h11", "httptools"])
+    parser.add_argument("--log-level", default=settings.SERVER_LOG_LEVEL)
+    parser.add_argument("--reload", action="store_true", help="Development mode: one auto-reloading process")
+    args = parser.parse_args(argv)
+
+    if args.reload:
+        uvicorn.run("app:app", host=args.host, port=args.port, reload=True, log_level="debug")
+        return
+
+    workers = args.workers or default_workers()
+    forking = workers > 1 and hasattr(os, "fork")
+    problems = shared_state_problems(settings) if forking else []
+    if problems:
+        for problem in problems:
+            logger.error(problem)
+        raise SystemExit(f"Cannot serve with {workers} workers; set SERVER_WORKERS=1 or fix the settings above")
+    app = preload()
+    config = server_config(app, args.host, args.port, args.loop, args.http, args.log_level)
+    logger.info(f"Serving on {args.host}:{args.port} with {workers} workers, {describe_runtime(args.loop, args.http)}")
+    if not forking:
+        uvicorn.Server(config).run()
+        return
+    metrics.enable_multiprocess(settings.SERVER_METRICS_DIR)
+    Supervisor(config, [config.bind_socket()], workers).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+import asyncio
+import os
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from app.core import logger
+from app.core.config import get_settings
+
+CHUNK_SIZE = 64 * 1024
+
+
+class AudioTooLarge(Exception):
+    """The upload is larger than AUDIO_MAX_BYTES"""
+
+
+class TranscriptionQueueFull(Exception):
+    """Every worker is busy and TRANSCRIPTION_MAX_QUEUE recordings are already waiting"""
+
+
+@dataclass
+class Transcription:
+    text: str
+    # Length of the recording and the time the backend needed for it, in seconds
+    audio_seconds: float
+    elapsed_seconds: float
+
+    @property
+    def real_time_factor(self) -> float:
+        """Processing time per second of audio; below 1.0 is faster than real time"""
+        return self.elapsed_seconds / self.audio_seconds if self.audio_seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "real_time_factor": round(self.real_time_factor, 4)}
+
+
+def read_wav(path: str) -> Tuple[float, str]:
+    """
+    Duration of a PCM WAV file and the comment from its LIST/INFO ICMT chunk, if any.
+
+    Chunks are read by their headers, so the samples are never loaded into memory.
+    """
+    try:
+        return _read_wav(path)
+    except struct.error as e:
+        raise ValueError(f"Malformed WAV file: {e}") from e
+
+
+def _read_wav(path: str) -> Tuple[float, str]:
+    duration, comment, byte_rate = 0.0, "", 0
+    with open(path, "rb") as f:
+        riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise ValueError("Not a WAV file")
+        while header := f.read(8):
+            if len(header) < 8:
+                break
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = f.read(size)
+                byte_rate = struct.unpack("<I", fmt[8:12])[0]
+            elif chunk_id == b"data":
+                duration = size / byte_rate if byte_rate else 0.0
+                f.seek(size, os.SEEK_CUR)
+            elif chunk_id == b"LIST":
+                body = f.read(size)
+                offset = 4 if body[:4] == b"INFO" else len(body)
+                while offset + 8 <= len(body):
+                    sub_id, sub_size = struct.unpack("<4sI", body[offset:offset + 8])
+                    if sub_id == b"ICMT":
+                        comment = body[offset + 8:offset + 8 + sub_size].rstrip(b"\0").decode("utf-8", "replace")
+                    offset += 8 + sub_size + (sub_size & 1)
+            else:
+                f.seek(size, os.SEEK_CUR)
+            if size & 1:
+                f.seek(1, os.SEEK_CUR)
+    return duration, comment
+
+
+def silent_wav(seconds: float, comment: str = "", rate: int = 8000) -> bytes:
+    """16-bit mono PCM silence with the comment as ICMT chunk: a recording for LocalBackend"""
+    data = b"\0\0" * int(seconds * rate)
+    fmt = struct.pack("<HHIIHH", 1, 1, rate, rate * 2, 2, 16)
+    chunks = b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data
+    if comment:
+        text = comment.encode() + b"\0"
+        info = b"INFO" + b"ICMT" + struct.pack("<I", len(text)) + text + b"\0" * (len(text) & 1)
+        chunks += b"LIST" + struct.pack("<I", len(info)) + info
+    return b"RIFF" + struct.pack("<I", 4 + len(chunks)) + b"WAVE" + chunks
+
+
+class LocalBackend:
+    """
+    Offline stand-in for a speech model, used in tests and benchmarks.
+
+    The transcript is the WAV comment (ICMT chunk). The backend works for
+    rtf * duration seconds, so the pool sees a realistic, length-proportional load.
+    """
+
+    def __init__(self, rtf: float = 0.0):
+        self.rtf = rtf
+
+    def transcribe(self, path: str) -> Tuple[str, float]:
+        duration, text = read_wav(path)
+        if self.rtf:
+            time.sleep(duration * self.rtf)
+        return text, duration
+
+
+class OpenAIBackend:
+    """Transcription with the OpenAI audio API (Whisper)"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self._client = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The HTTP client cannot be sent to a worker process; each process creates its own
+        return {**self.__dict__, "_client": None}
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+            settings = get_settings()
+            self._client = OpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL,
+                timeout=settings.OPENAI_TIMEOUT,
+                max_retries=settings.OPENAI_MAX_RETRIES,
+            )
+        return self._client
+
+    def transcribe(self, path: str) -> Tuple[str, float]:
+        with open(path, "rb") as f:
+            response = self.client.audio.transcriptions.create(model=self.model, file=f, response_format="verbose_json")
+        return response.text, float(getattr(response, "duration", 0.0) or 0.0)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _run(backend, path: str) -> Tuple[str, float, float]:
+    """Worker entry point; module-level so a process pool can pickle it"""
+    started = time.perf_counter()
+    text, duration = backend.transcribe(path)
+    return text, duration, time.perf_counter() - started
+
+
+class TranscriptionPool:
+    """
+    Runs a backend in a bounded thread or process pool.
+
+    At most max_workers recordings are transcribed at once and at most max_queue wait
+    for a worker; further submissions fail fast with TranscriptionQueueFull instead of
+    piling up behind a slow model.
+    """
+
+    def __init__(self, backend, max_workers: int = 2, max_queue: int = 16, executor: str = "thread"):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Executor = (
+            ProcessPoolExecutor(max_workers) if executor == "process" else ThreadPoolExecutor(max_workers, "transcribe")
+        )
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.counters = {
+            "completed": 0, "failed": 0, "rejected": 0, "max_queue_depth": 0,
+            "audio_seconds_total": 0.0, "elapsed_seconds_total": 0.0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        """Recordings waiting for a worker"""
+        return max(0, self._in_flight - self.max_workers)
+
+    async def transcribe(self, path: str) -> Transcription:
+        """
+        Transcribe the recording at path. The pool owns the file from here on and removes
+        it once a worker is done with it, or at once when the recording is rejected.
+        """
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self.counters["rejected"] += 1
+                _remove(path)
+                raise TranscriptionQueueFull(f"{self.queue_depth} recordings are waiting for transcription")
+            self._in_flight += 1
+            self.counters["max_queue_depth"] = max(self.counters["max_queue_depth"], self.queue_depth)
+        try:
+            future = self._executor.submit(_run, self.backend, path)
+        except RuntimeError:
+            # The pool is shutting down
+            with self._lock:
+                self._in_flight -= 1
+            _remove(path)
+            raise
+        # The slot and the file are kept until the worker is done, even if the client disconnects meanwhile
+        future.add_done_callback(partial(self._release, path))
+        text, duration, elapsed = await asyncio.shield(asyncio.wrap_future(future))
+        result = Transcription(text=text.strip(), audio_seconds=duration, elapsed_seconds=elapsed)
+        logger.info(f"Transcribed {duration:.1f} s of audio in {elapsed:.2f} s (RTF {result.real_time_factor:.3f})")
+        return result
+
+    def _release(self, path: str, future: Future) -> None:
+        _remove(path)
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.counters["failed"] += 1
+                return
+            _, duration, elapsed = future.result()
+            self.counters["completed"] += 1
+            self.counters["audio_seconds_total"] += duration
+            self.counters["elapsed_seconds_total"] += elapsed
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        audio = self.counters["audio_seconds_total"]
+        return {
+            "backend": type(self.backend).__name__,
+            "workers": self.max_workers,
+            "running": min(self._in_flight, self.max_workers),
+            "queue_depth": self.queue_depth,
+            **self.counters,
+            "real_time_factor": self.counters["elapsed_seconds_total"] / audio if audio else 0.0,
+        }
+
+
+async def spool_upload(chunks: AsyncIterator[bytes], max_bytes: int, directory: Optional[str] = None) -> str:
+    """
+    Write an upload to a temporary file chunk by chunk and return its path.
+
+    Only one chunk is held in memory. The file is removed and AudioTooLarge raised as
+    soon as the upload exceeds max_bytes; otherwise the caller removes it.
+    """
+    fd, path = tempfile.mkstemp(prefix="audio-", suffix=".upload", dir=directory)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise AudioTooLarge(f"Audio is larger than {max_bytes} bytes")
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def create_backend():
+    settings = get_settings()
+    if settings.TRANSCRIPTION_BACKEND == "local":
+        return LocalBackend(settings.TRANSCRIPTION_LOCAL_RTF)
+    return OpenAIBackend(settings.TRANSCRIPTION_MODEL)
+
+
+@lru_cache()
+def get_transcription_pool() -> TranscriptionPool:
+    settings = get_settings()
+    return TranscriptionPool(
+        create_backend(),
+        max_workers=settings.TRANSCRIPTION_WORKERS,
+        max_queue=settings.TRANSCRIPTION_MAX_QUEUE,
+        executor=settings.TRANSCRIPTION_EXECUTOR,
+    )
+
+
+def shutdown_transcription_pool() -> None:
+    """Stop the workers on application shutdown, if the pool was ever used"""
+    if get_transcription_pool.cache_info().currsize:
+        get_transcription_pool().shutdown()
+        get_transcription_pool.cache_clear()
@@ -0,0 +1,179 @@
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.tools.todoist.index import TaskIndex
+
+Loader = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+
+@dataclass
+class WorkspaceSnapshot:
+    """Projects and active tasks of one Todoist account at a point in time"""
+    projects: List[Dict[str, Any]] = field(default_factory=list)
+    tasks: List[Dict[str, Any]] = field(default_factory=list)
+    projects_fetched_at: float = 0.0
+    tasks_fetched_at: float = 0.0
+    version: int = 0
+    index: Optional[TaskIndex] = field(default=None, repr=False)
+
+    def search_index(self) -> TaskIndex:
+        """Search index over the tasks, built on first use and patched by mutations"""
+        if self.index is None:
+            self.index = TaskIndex(self.tasks, self.projects)
+        return self.index
+
+
+class WorkspaceCache:
+    """
+    Per-user cache of workspace snapshots with a TTL.
+
+    Projects and tasks expire independently, so a mutation that cannot be applied
+    locally only forces the task list to be reloaded. Concurrent misses for the same
+    user share a single reload.
+
+    Memory is capped by max_users snapshots and max_tasks cached tasks in total; after
+    a reload the least recently used users are evicted until both caps hold.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_users: int = 1000, max_tasks: int = 500_000):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.max_tasks = max_tasks
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+        self._snapshots: "OrderedDict[str, WorkspaceSnapshot]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Versions are unique across users and reloads, so they can be used in cache keys
+        self._versions = itertools.count(1)
+
+    def _is_fresh(self, fetched_at: float) -> bool:
+        return fetched_at > 0 and time.monotonic() - fetched_at < self.ttl
+
+    async def get(self, user: str, load_projects: Loader, load_tasks: Loader) -> WorkspaceSnapshot:
+        snapshot = self._snapshots.get(user)
+        if snapshot and self._is_fresh(snapshot.projects_fetched_at) and self._is_fresh(snapshot.tasks_fetched_at):
+            self.stats["hits"] += 1
+            self._snapshots.move_to_end(user)
+            return snapshot
+
+        lock = self._locks.setdefault(user, asyncio.Lock())
+        async with lock:
+            snapshot = self._snapshots.setdefault(user, WorkspaceSnapshot())
+            is_projects_fresh = self._is_fresh(snapshot.projects_fetched_at)
+            is_tasks_fresh = self._is_fresh(snapshot.tasks_fetched_at)
+            if is_projects_fresh and is_tasks_fresh:
+                self.stats["hits"] += 1
+                return snapshot
+
+            self.stats["misses"] += 1
+            projects, tasks = await asyncio.gather(
+                self._keep(snapshot.projects) if is_projects_fresh else load_projects(),
+                self._keep(snapshot.tasks) if is_tasks_fresh else load_tasks(),
+            )
+            now = time.monotonic()
+            # A reload that brings nothing new keeps the version, so keys built on it stay valid
+            is_changed = snapshot.version == 0 or projects != snapshot.projects or tasks != snapshot.tasks
+            if not is_projects_fresh:
+                snapshot.projects, snapshot.projects_fetched_at = projects, now
+            if not is_tasks_fresh:
+                snapshot.tasks, snapshot.tasks_fetched_at = tasks, now
+            if is_changed:
+                snapshot.version = next(self._versions)
+                snapshot.index = None
+            self._snapshots[user] = snapshot
+            self._snapshots.move_to_end(user)
+            self._evict(keep=user)
+            return snapshot
+
+    def _evict(self, keep: str) -> None:
+        """Drop least recently used snapshots, never the one just loaded, until the caps hold"""
+        total_tasks = sum(len(snapshot.tasks) for snapshot in self._snapshots.values())
+        while len(self._snapshots) > 1 and (len(self._snapshots) > self.max_users or total_tasks > self.max_tasks):
+            user = next(iter(self._snapshots))
+            if user == keep:
+                break
+            total_tasks -= len(self._snapshots.pop(user).tasks)
+            self._drop_lock(user)
+            self.stats["evictions"] += 1
+
+    def _drop_lock(self, user: str) -> None:
+        # A held lock still guards a reload in progress
+        lock = self._locks.get(user)
+        if lock is not None and not lock.locked():
+            del self._locks[user]
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    @staticmethod
+    async def _keep(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return items
+
+    def version(self, user: str) -> int:
+        snapshot = self._snapshots.get(user)
+        return snapshot.version if snapshot else 0
+
+    def task_title(self, user: str, task_id: str) -> Optional[str]:
+        """Content of a cached task, fresh or not; None when it is not cached"""
+        snapshot = self._snapshots.get(user)
+        if snapshot is None:
+            return None
+        return next((t["content"] for t in snapshot.tasks if t["id"] == task_id), None)
+
+    def _touch(self, user: str) -> Optional[WorkspaceSnapshot]:
+        snapshot = self._snapshots.get(user)
+        if snapshot is None:
+            return None
+        snapshot.version = next(self._versions)
+        self.stats["invalidations"] += 1
+        return snapshot
+
+    def add_task(self, user: str, task: Dict[str, Any]) -> None:
+        """Put a newly created task into the cached task list"""
+        snapshot = self._touch(user)
+        if snapshot is None:
+            return
+        snapshot.tasks = [t for t in snapshot.tasks if t["id"] != task["id"]] + [task]
+        if snapshot.index is not None:
+            snapshot.index.add(task)
+
+    def update_task(self, user: str, task_id: str, changes: Dict[str, Any]) -> None:
+        """Patch fields of a cached task; reload the task list if the task is unknown"""
+        snapshot = self._touch(user)
+        if snapshot is None:
+            return
+        task = next((t for t in snapshot.tasks if t["id"] == task_id), None)
+        if task is None:
+            snapshot.tasks_fetched_at = 0.0
+            return
+        snapshot.tasks = [{**t, **changes} if t["id"] == task_id else t for t in snapshot.tasks]
+        if snapshot.index is not None:
+            snapshot.index.add({**task, **changes})
+
+    def remove_task(self, user: str, task_id: str) -> None:
+        """Drop a completed or deleted task from the cached task list"""
+        snapshot = self._touch(user)
+        if snapshot is None:
+            return
+        snapshot.tasks = [t for t in snapshot.tasks if t["id"] != task_id]
+        if snapshot.index is not None:
+            snapshot.index.remove(task_id)
+
+    def invalidate_tasks(self, user: str) -> None:
+        """Force the task list to be reloaded; cached projects stay valid"""
+        snapshot = self._touch(user)
+        if snapshot is None:
+            return
+        snapshot.tasks_fetched_at = 0.0
+
+    def invalidate(self, user: Optional[str] = None) -> None:
+        """Drop the whole snapshot of one user, or of every user"""
+        if user is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.pop(user, None)
+            self._drop_lock(user)
+        self.stats["invalidations"] += 1
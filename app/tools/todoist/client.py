@@ -0,0 +1,123 @@
+import hashlib
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import List, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from todoist_api_python.api_async import TodoistAPIAsync
+
+from app.core import logger
+from app.core.config import get_settings
+
+_session: Optional[requests.Session] = None
+# REST clients of recently active accounts by account key, least recently used first
+_apis: "OrderedDict[str, TodoistAPIAsync]" = OrderedDict()
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Todoist token of the account the current chat request acts for; None means the configured account
+current_token: ContextVar[Optional[str]] = ContextVar("todoist_token", default=None)
+
+# Todoist API calls of the current chat request, collected while Agent.process runs
+api_calls: ContextVar[Optional[List[str]]] = ContextVar("todoist_api_calls", default=None)
+
+
+def account_key(token: str) -> str:
+    """Key of a Todoist account, derived from the token so the token itself is never stored"""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+def record_api_call(endpoint: str) -> None:
+    """Count a REST or Sync API request against the current chat request, if any"""
+    calls = api_calls.get()
+    if calls is not None:
+        calls.append(endpoint)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """Connection-pooling adapter that applies a default timeout to every request"""
+
+    def __init__(self, timeout: tuple, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def _create_session() -> requests.Session:
+    settings = get_settings()
+    adapter = TimeoutHTTPAdapter(
+        timeout=(settings.TODOIST_CONNECT_TIMEOUT, settings.TODOIST_READ_TIMEOUT),
+        pool_connections=settings.TODOIST_POOL_SIZE,
+        pool_maxsize=settings.TODOIST_POOL_SIZE,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def resolve_token(token: Optional[str] = None) -> str:
+    """
+    The given token, else the one of the current chat request, else the configured one.
+    The endpoints only let requests through without a token in single-account mode
+    (TODOIST_REQUIRE_TOKEN off).
+    """
+    return token or current_token.get() or get_settings().TODOIST_API_KEY
+
+
+def get_todoist_api(token: Optional[str] = None) -> TodoistAPIAsync:
+    """
+    REST client of one account (see resolve_token); clients of every account share one
+    keep-alive session. Clients of the TODOIST_MAX_TENANTS most recent accounts are kept.
+    """
+    global _session
+    token = resolve_token(token)
+    key = account_key(token)
+    api = _apis.get(key)
+    if api is not None:
+        _apis.move_to_end(key)
+        return api
+    if _session is None:
+        _session = _create_session()
+    api = _apis[key] = TodoistAPIAsync(token, session=_session)
+    while len(_apis) > get_settings().TODOIST_MAX_TENANTS:
+        _apis.popitem(last=False)
+    return api
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide async HTTP client for the Sync API"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        settings = get_settings()
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.TODOIST_POOL_SIZE,
+                max_keepalive_connections=settings.TODOIST_POOL_SIZE,
+            ),
+            timeout=httpx.Timeout(settings.TODOIST_READ_TIMEOUT, connect=settings.TODOIST_CONNECT_TIMEOUT),
+        )
+    return _http_client
+
+
+def open_todoist_clients() -> None:
+    """Create the shared clients, e.g. on application startup"""
+    get_todoist_api()
+    get_http_client()
+    logger.info(f"Todoist clients ready (pool size {get_settings().TODOIST_POOL_SIZE})")
+
+
+async def close_todoist_clients() -> None:
+    """Close the shared clients, e.g. on application shutdown"""
+    global _session, _http_client
+    if _session is not None:
+        _session.close()
+    if _http_client is not None:
+        await _http_client.aclose()
+    _apis.clear()
+    _session, _http_client = None, None
@@ -0,0 +1,198 @@
+"""
+Local stand-in for the Todoist Sync API, used by tests and benchmarks.
+
+Every token gets its own in-memory account. Run it standalone with:
+    uvicorn app.tools.todoist.fake_server:app --port 8765
+and point TODOIST_SYNC_URL at http://localhost:8765/sync/v9
+"""
+import itertools
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Form, Header, HTTPException
+
+
+class FakeAccount:
+    """Projects and tasks of one account; every change gets a sequence number"""
+
+    def __init__(self):
+        self.projects: Dict[str, Dict[str, Any]] = {}
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.seq = 0
+        self._ids = itertools.count(1)
+
+    def _touch(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        self.seq += 1
+        obj["_seq"] = self.seq
+        return obj
+
+    def _new_id(self) -> str:
+        return str(next(self._ids))
+
+    def add_project(self, name: str) -> Dict[str, Any]:
+        project_id = self._new_id()
+        self.projects[project_id] = self._touch({
+            "id": project_id,
+            "name": name,
+            "color": "charcoal",
+            "is_favorite": False,
+            "parent_id": None,
+            "child_order": len(self.projects) + 1,
+            "is_deleted": False,
+            "is_archived": False,
+        })
+        return self.projects[project_id]
+
+    def add_task(
+        self,
+        content: str,
+        project_id: Optional[str] = None,
+        due: Optional[str] = None,
+        priority: int = 1,
+        labels: Optional[List[str]] = None,
+        description: str = "",
+    ) -> Dict[str, Any]:
+        task_id = self._new_id()
+        self.items[task_id] = self._touch({
+            "id": task_id,
+            "content": content,
+            "description": description,
+            "project_id": project_id,
+            "priority": priority,
+            "due": {"date": due} if due else None,
+            "labels": labels or [],
+            "checked": False,
+            "is_deleted": False,
+        })
+        return self.items[task_id]
+
+    def update_task(self, task_id: str, **fields: Any) -> Dict[str, Any]:
+        item = self.items[task_id]
+        item.update(fields)
+        return self._touch(item)
+
+    def complete_task(self, task_id: str) -> Dict[str, Any]:
+        return self.update_task(task_id, checked=True)
+
+    def reopen_task(self, task_id: str) -> Dict[str, Any]:
+        return self.update_task(task_id, checked=False)
+
+    def delete_task(self, task_id: str) -> Dict[str, Any]:
+        return self.update_task(task_id, is_deleted=True)
+
+    def execute(self, command: Dict[str, Any], temp_ids: Dict[str, str]) -> None:
+        """Apply one Sync API command; raises KeyError for unknown tasks and ValueError for bad commands"""
+        args = command.get("args", {})
+        kind = command.get("type")
+        if kind == "item_add":
+            if not args.get("content"):
+                raise ValueError("Content is required")
+            due = args.get("due") or {}
+            item = self.add_task(
+                args["content"],
+                project_id=args.get("project_id"),
+                due=due.get("date") or due.get("string"),
+                priority=args.get("priority") or 1,
+                labels=args.get("labels"),
+                description=args.get("description") or "",
+            )
+            if command.get("temp_id"):
+                temp_ids[command["temp_id"]] = item["id"]
+            return
+        task_id = args.get("id")
+        item = self.items.get(task_id)
+        if item is None or item["is_deleted"]:
+            raise KeyError(task_id)
+        if kind == "item_close":
+            self.complete_task(task_id)
+        elif kind == "item_uncomplete":
+            self.reopen_task(task_id)
+        elif kind == "item_delete":
+            self.delete_task(task_id)
+        elif kind == "item_update":
+            fields = {k: v for k, v in args.items() if k in ("content", "description", "priority", "labels")}
+            if "due" in args:
+                fields["due"] = {"date": args["due"].get("date") or args["due"].get("string")}
+            self.update_task(task_id, **fields)
+        else:
+            raise ValueError(f"Unknown command type {kind}")
+
+    def run_commands(self, commands: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply commands in order; a failing command does not stop the others"""
+        sync_status: Dict[str, Any] = {}
+        temp_ids: Dict[str, str] = {}
+        for command in commands:
+            try:
+                self.execute(command, temp_ids)
+                sync_status[command["uuid"]] = "ok"
+            except KeyError:
+                sync_status[command["uuid"]] = {"error_code": 22, "error": "Item not found"}
+            except ValueError as e:
+                sync_status[command["uuid"]] = {"error_code": 20, "error": str(e)}
+        return {"sync_status": sync_status, "temp_id_mapping": temp_ids}
+
+    def sync(self, sync_token: str, resource_types: List[str]) -> Dict[str, Any]:
+        is_full_sync = sync_token == "*"
+        since = 0 if is_full_sync else int(sync_token)
+
+        def changed(objects: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+            result = []
+            for obj in objects.values():
+                if obj["_seq"] <= since:
+                    continue
+                if is_full_sync and (obj.get("is_deleted") or obj.get("checked") or obj.get("is_archived")):
+                    continue
+                result.append({k: v for k, v in obj.items() if k != "_seq"})
+            return result
+
+        response: Dict[str, Any] = {"full_sync": is_full_sync, "sync_token": str(self.seq)}
+        if "all" in resource_types or "projects" in resource_types:
+            response["projects"] = changed(self.projects)
+        if "all" in resource_types or "items" in resource_types:
+            response["items"] = changed(self.items)
+        return response
+
+
+class FakeTodoist:
+    """All accounts served by the stand-in, plus request counters"""
+
+    def __init__(self):
+        self.accounts: Dict[str, FakeAccount] = {}
+        self.requests = 0
+        self.commands = 0
+
+    def account(self, token: str) -> FakeAccount:
+        return self.accounts.setdefault(token, FakeAccount())
+
+
+def create_app(fake: Optional[FakeTodoist] = None) -> FastAPI:
+    fake = fake or FakeTodoist()
+    app = FastAPI(title="Fake Todoist")
+    app.state.fake = fake
+
+    def get_account(authorization: Optional[str]) -> FakeAccount:
+        if not authorization or not authorization.startswith("Bearer "):
+            raise HTTPException(status_code=401, detail="Missing token")
+        fake.requests += 1
+        return fake.account(authorization.removeprefix("Bearer "))
+
+    @app.post("/sync/v9/sync")
+    async def sync(
+        sync_token: str = Form("*"),
+        resource_types: str = Form('["all"]'),
+        commands: Optional[str] = Form(None),
+        authorization: Optional[str] = Header(None),
+    ) -> Dict[str, Any]:
+        account = get_account(authorization)
+        response: Dict[str, Any] = {}
+        if commands is not None:
+            batch = json.loads(commands)
+            fake.commands += len(batch)
+            response.update(account.run_commands(batch))
+        response.update(account.sync(sync_token, json.loads(resource_types)))
+        return response
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,214 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import httpx
+import requests
+
+from app.core import logger
+from app.core.config import get_settings
+from app.core.metrics import add_span, todoist_seconds
+from app.tools.todoist.client import record_api_call
+
+T = TypeVar("T")
+
+# Lower values are served first: user-facing changes go ahead of prompt-context reads
+MUTATION = 0
+READ = 1
+PRIORITY_NAMES = {MUTATION: "mutation", READ: "read"}
+
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, httpx.TransportError)
+
+
+class TodoistRateLimited(Exception):
+    """Todoist kept answering 429 after every retry"""
+
+
+def _status(error: Exception) -> Optional[int]:
+    # requests.HTTPError and httpx.HTTPStatusError both carry the response
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_transient(error: Exception) -> bool:
+    status = _status(error)
+    if status is not None:
+        return status >= 500
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+class RateGovernor:
+    """
+    Token bucket shared by every Todoist call of one account in this process; each
+    server worker has its own, so the account's limit applies per worker.
+
+    Callers wait in a priority queue; within a priority they are served in arrival order.
+    A 429 pauses the whole bucket for Retry-After, since the quota is per token, and the
+    call is retried with jitter. Reads are also retried on 5xx and connection errors;
+    mutations only on 429, when Todoist has not applied them.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        window: int = 1000,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._queue: List[Tuple[int, int]] = []
+        self._tickets = itertools.count()
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waits: Dict[int, Deque[float]] = {priority: deque(maxlen=window) for priority in PRIORITY_NAMES}
+        self.counters = {"requests": 0, "throttled": 0, "retries": 0, "failures": 0}
+
+    def _get_condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition, self._loop, self._queue = asyncio.Condition(), loop, []
+        return self._condition
+
+    def _delay(self) -> float:
+        """Seconds until a token is available, refilling the bucket first"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if now < self._paused_until:
+            return self._paused_until - now
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for a while, e.g. after a 429"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self, priority: int = MUTATION) -> float:
+        """Wait for a token; returns the time spent queued in seconds"""
+        started = time.monotonic()
+        condition = self._get_condition()
+        ticket = (priority, next(self._tickets))
+        heapq.heappush(self._queue, ticket)
+        async with condition:
+            try:
+                while True:
+                    delay = self._delay()
+                    is_first = self._queue[0] == ticket
+                    if is_first and delay <= 0:
+                        heapq.heappop(self._queue)
+                        self._tokens -= 1
+                        break
+                    try:
+                        await asyncio.wait_for(condition.wait(), delay if is_first else None)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                raise
+            finally:
+                condition.notify_all()
+        waited = time.monotonic() - started
+        self._waits[priority].append(waited)
+        return waited
+
+    @staticmethod
+    def _observe(endpoint: str, started: float, outcome: str) -> None:
+        elapsed = time.perf_counter() - started
+        todoist_seconds.observe(elapsed, endpoint, outcome)
+        add_span("todoist", endpoint, elapsed, outcome=outcome)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def call(self, endpoint: str, request: Callable[[], Awaitable[T]], priority: int = MUTATION) -> T:
+        """
+        Run a Todoist request under the governor.
+
+        request creates a fresh awaitable per attempt. Raises TodoistRateLimited when the
+        limit persists through every retry, and re-raises any other final error.
+        """
+        attempt = 0
+        while True:
+            await self.acquire(priority)
+            record_api_call(endpoint)
+            self.counters["requests"] += 1
+            started = time.perf_counter()
+            try:
+                result = await request()
+                self._observe(endpoint, started, "ok")
+                return result
+            except Exception as e:
+                self._observe(endpoint, started, "throttled" if _status(e) == 429 else "error")
+                is_last = attempt == self.max_retries
+                if _status(e) == 429:
+                    self.counters["throttled"] += 1
+                    retry_after = _retry_after(e)
+                    delay = self._backoff(attempt) if retry_after is None else retry_after + self._backoff(0)
+                    self.pause(delay)
+                    if is_last:
+                        self.counters["failures"] += 1
+                        raise TodoistRateLimited(f"Todoist rate limit reached, retry in {delay:.0f} s") from e
+                    logger.warning(f"Todoist {endpoint} throttled, retrying in {delay:.2f} s")
+                elif priority == READ and _is_transient(e) and not is_last:
+                    delay = self._backoff(attempt)
+                    logger.warning(f"Todoist {endpoint} failed ({e}), retrying in {delay:.2f} s")
+                    await asyncio.sleep(delay)
+                else:
+                    self.counters["failures"] += 1
+                    raise
+            self.counters["retries"] += 1
+            attempt += 1
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return governor_stats([self])
+
+
+def create_governor() -> RateGovernor:
+    """Governor with the configured rate limit and retry policy"""
+    settings = get_settings()
+    return RateGovernor(
+        rate=settings.TODOIST_RATE_LIMIT,
+        burst=settings.TODOIST_RATE_BURST,
+        max_retries=settings.TODOIST_MAX_RETRIES,
+        base_delay=settings.TODOIST_RETRY_BASE_DELAY,
+        max_delay=settings.TODOIST_RETRY_MAX_DELAY,
+    )
+
+
+def governor_stats(governors: Iterable[RateGovernor]) -> Dict[str, Any]:
+    """Counters summed over governors, with queue wait percentiles over all of their samples"""
+    governors = list(governors)
+    counters = {name: sum(g.counters[name] for g in governors) for name in ("requests", "throttled", "retries", "failures")}
+    waits = {}
+    for priority, name in PRIORITY_NAMES.items():
+        samples = sorted(wait for g in governors for wait in g._waits[priority])
+        waits[name] = {
+            "count": len(samples),
+            "avg_ms": sum(samples) / len(samples) * 1000 if samples else 0.0,
+            "p95_ms": samples[int(0.95 * (len(samples) - 1))] * 1000 if samples else 0.0,
+            "max_ms": samples[-1] * 1000 if samples else 0.0,
+        }
+    return {**counters, "queue_depth": sum(len(g._queue) for g in governors), "queue_wait": waits}
@@ -0,0 +1,142 @@
+import heapq
+import math
+import re
+from typing import Any, Dict, Iterable, List, Set
+
+WORD = re.compile(r"\w+", re.UNICODE)
+STEM_LENGTH = 5
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words of at least three characters"""
+    return [word for word in WORD.findall(text.lower()) if len(word) >= 3]
+
+
+def stem(word: str) -> str:
+    """Crude prefix stem; enough to match inflected forms such as "zakupy" and "zakupów" """
+    return word[:STEM_LENGTH]
+
+
+def task_words(task: Dict[str, Any]) -> Set[str]:
+    return set(tokenize(" ".join([task.get("content") or "", *(task.get("labels") or [])])))
+
+
+class TaskIndex:
+    """
+    Inverted index over task content and labels, with project names matched per query.
+
+    Words and their stems map to task IDs, so a lookup only touches the tasks that share
+    a word with the query. Tasks are added, replaced and removed one at a time.
+    """
+
+    COMMON_RATIO = 0.05
+    MIN_COMMON = 50
+
+    def __init__(self, tasks: Iterable[Dict[str, Any]] = (), projects: Iterable[Dict[str, Any]] = ()):
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self._words: Dict[str, Set[str]] = {}
+        self._stems: Dict[str, Set[str]] = {}
+        self._terms: Dict[str, Set[str]] = {}
+        self._by_project: Dict[str, Set[str]] = {}
+        self._project_names: Dict[str, List[str]] = {}
+        self.set_projects(projects)
+        for task in tasks:
+            self.add(task)
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def set_projects(self, projects: Iterable[Dict[str, Any]]) -> None:
+        self._project_names = {
+            project["id"]: [stem(word) for word in tokenize(project.get("name") or "")]
+            for project in projects
+        }
+
+    def add(self, task: Dict[str, Any]) -> None:
+        """Index a task, replacing an earlier version with the same ID"""
+        task_id = task["id"]
+        if task_id in self.tasks:
+            self.remove(task_id)
+        words = task_words(task)
+        self.tasks[task_id] = task
+        self._terms[task_id] = words
+        self._by_project.setdefault(task.get("project_id"), set()).add(task_id)
+        for word in words:
+            self._words.setdefault(word, set()).add(task_id)
+            self._stems.setdefault(stem(word), set()).add(task_id)
+
+    def remove(self, task_id: str) -> None:
+        task = self.tasks.pop(task_id, None)
+        if task is None:
+            return
+        for word in self._terms.pop(task_id):
+            self._discard(self._words, word, task_id)
+            self._discard(self._stems, stem(word), task_id)
+        self._discard(self._by_project, task.get("project_id"), task_id)
+
+    @staticmethod
+    def _discard(postings: Dict[Any, Set[str]], key: Any, task_id: str) -> None:
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(task_id)
+            if not ids:
+                del postings[key]
+
+    def _weight(self, frequency: int) -> float:
+        return math.log(1 + (len(self.tasks) or 1) / frequency)
+
+    def match(self, words: Iterable[str]) -> Dict[str, float]:
+        """
+        Lexical score of every task sharing a word with the query.
+
+        Exact words count fully, words with the same stem count 0.6; both are weighted
+        by how rare the word is. Words found in more than COMMON_RATIO of the tasks are
+        skipped when the query has rarer words, which keeps lookups bounded on large lists.
+        """
+        postings = []
+        for word in set(words):
+            exact = self._words.get(word, set())
+            similar = self._stems.get(stem(word), set())
+            postings.append((exact, similar))
+        common = max(self.MIN_COMMON, int(len(self.tasks) * self.COMMON_RATIO))
+        if any(len(similar) <= common for _, similar in postings):
+            postings = [(exact, similar) for exact, similar in postings if len(similar) <= common]
+
+        scores: Dict[str, float] = {}
+        for exact, similar in postings:
+            if exact:
+                weight = self._weight(len(exact))
+                for task_id in exact:
+                    scores[task_id] = scores.get(task_id, 0.0) + weight
+            if len(similar) > len(exact):
+                weight = 0.6 * self._weight(len(similar))
+                for task_id in similar:
+                    if task_id not in exact:
+                        scores[task_id] = scores.get(task_id, 0.0) + weight
+        return scores
+
+    def projects_in(self, words: Iterable[str]) -> Set[str]:
+        """IDs of projects whose whole name is mentioned in the query"""
+        stems = {stem(word) for word in words}
+        return {
+            project_id for project_id, name in self._project_names.items()
+            if name and all(part in stems for part in name)
+        }
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Best matching tasks for the query. Tasks in a project named in the query rank higher;
+        a query naming only a project returns tasks from that project.
+        """
+        words = tokenize(query)
+        scores = self.match(words)
+        projects = self.projects_in(words)
+        if projects:
+            for task_id in scores:
+                if self.tasks[task_id].get("project_id") in projects:
+                    scores[task_id] += 1.5
+        if not scores:
+            members = (task_id for project_id in projects for task_id in self._by_project.get(project_id, ()))
+            return [self.tasks[task_id] for _, task_id in zip(range(limit), members)]
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [self.tasks[task_id] for task_id, _ in best]
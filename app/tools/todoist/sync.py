@@ -0,0 +1,144 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+import httpx
+from todoist_api_python.utils import get_url_for_task
+
+from app.core import logger
+from app.tools.todoist.client import get_http_client
+from app.tools.todoist.governor import MUTATION, READ, RateGovernor, create_governor
+
+
+class TodoistSyncClient:
+    """Minimal async client for the Todoist Sync API"""
+
+    def __init__(
+        self,
+        token: str,
+        base_url: str,
+        client: Optional[httpx.AsyncClient] = None,
+        governor: Optional[RateGovernor] = None,
+    ):
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self._client = client
+        self.governor = governor or create_governor()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_http_client()
+
+    async def sync(
+        self,
+        sync_token: str = "*",
+        resource_types: Optional[List[str]] = None,
+        commands: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        data = {"sync_token": sync_token}
+        if resource_types is not None:
+            data["resource_types"] = json.dumps(resource_types)
+        if commands is not None:
+            data["commands"] = json.dumps(commands)
+
+        async def post() -> Dict[str, Any]:
+            response = await self.client.post(
+                f"{self.base_url}/sync",
+                data=data,
+                headers={"Authorization": f"Bearer {self.token}"},
+            )
+            response.raise_for_status()
+            return response.json()
+
+        return await self.governor.call("sync", post, priority=READ if commands is None else MUTATION)
+
+
+def item_to_task(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a Sync API item to the task dict used across the agent"""
+    due = item.get("due")
+    return {
+        "id": item["id"],
+        "content": item["content"],
+        "due": due["date"] if due else None,
+        "priority": item.get("priority", 1),
+        "project_id": item.get("project_id"),
+        "labels": item.get("labels", []),
+        "url": get_url_for_task(item["id"], item.get("sync_id")),
+    }
+
+
+def item_to_project(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a Sync API project to the project dict used across the agent"""
+    return {
+        "id": item["id"],
+        "name": item["name"],
+        "color": item.get("color"),
+        "is_favorite": item.get("is_favorite", False),
+        "parent_id": item.get("parent_id"),
+        "order": item.get("child_order"),
+    }
+
+
+class WorkspaceReplica:
+    """
+    Local copy of one account's projects and active tasks, kept current with Sync API deltas.
+
+    The first refresh is a full sync; later refreshes send the stored sync token and only
+    apply what changed since. Concurrent refreshes share one request.
+    """
+
+    RESOURCE_TYPES = ["projects", "items"]
+
+    def __init__(self, client: TodoistSyncClient):
+        self.client = client
+        self.sync_token = "*"
+        self.projects: Dict[str, Dict[str, Any]] = {}
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"full_syncs": 0, "incremental_syncs": 0, "changes_applied": 0}
+        self._inflight: Optional[asyncio.Future] = None
+
+    async def refresh(self) -> None:
+        if self._inflight is not None:
+            await asyncio.shield(self._inflight)
+            return
+        self._inflight = asyncio.ensure_future(self._sync())
+        try:
+            await asyncio.shield(self._inflight)
+        finally:
+            self._inflight = None
+
+    async def _sync(self) -> None:
+        response = await self.client.sync(self.sync_token, self.RESOURCE_TYPES)
+        if response.get("full_sync"):
+            self.projects, self.tasks = {}, {}
+            self.stats["full_syncs"] += 1
+        else:
+            self.stats["incremental_syncs"] += 1
+        self._apply_projects(response.get("projects", []))
+        self._apply_items(response.get("items", []))
+        self.sync_token = response["sync_token"]
+        logger.debug(f"Workspace replica synced: {len(self.tasks)} tasks, {len(self.projects)} projects")
+
+    def _apply_projects(self, projects: List[Dict[str, Any]]) -> None:
+        for project in projects:
+            self.stats["changes_applied"] += 1
+            if project.get("is_deleted") or project.get("is_archived"):
+                self.projects.pop(project["id"], None)
+            else:
+                self.projects[project["id"]] = item_to_project(project)
+
+    def _apply_items(self, items: List[Dict[str, Any]]) -> None:
+        for item in items:
+            self.stats["changes_applied"] += 1
+            if item.get("is_deleted") or item.get("checked"):
+                self.tasks.pop(item["id"], None)
+            else:
+                self.tasks[item["id"]] = item_to_task(item)
+
+    async def get_projects(self) -> List[Dict[str, Any]]:
+        await self.refresh()
+        return list(self.projects.values())
+
+    async def get_active_tasks(self) -> List[Dict[str, Any]]:
+        await self.refresh()
+        return list(self.tasks.values())
@@ -1,15 +1,94 @@
-from typing import Optional, Dict, Any, List
-from todoist_api_python.api_async import TodoistAPIAsync
+import uuid
+from typing import Optional, Dict, Any, List, Union
 
 
 from app.core.config import get_settings
 from app.core import logger
+from app.tools.todoist.cache import WorkspaceCache, WorkspaceSnapshot
+from app.tools.todoist.client import get_todoist_api, resolve_token
+from app.tools.todoist.governor import READ, RateGovernor
+from app.tools.todoist.sync import TodoistSyncClient, WorkspaceReplica, item_to_task
+from app.tools.todoist.tenants import Tenant, TenantPool
 
 settings = get_settings()
 
+workspace_cache = WorkspaceCache(
+    ttl=settings.WORKSPACE_CACHE_TTL,
+    max_users=settings.WORKSPACE_CACHE_MAX_TENANTS,
+    max_tasks=settings.WORKSPACE_CACHE_MAX_TASKS,
+)
+# An evicted tenant takes its cached workspace with it
+tenants = TenantPool(settings.TODOIST_MAX_TENANTS, on_evict=lambda key: workspace_cache.invalidate(key))
+
 class TodoistTools:
-    def __init__(self):
-        self.api = TodoistAPIAsync(settings.TODOIST_API_KEY)
+    """
+    Todoist operations for one account.
+
+    Without an explicit token the account is resolved on every call (see resolve_token),
+    so a single instance serves whichever tenant the current chat request belongs to.
+    """
+
+    def __init__(self, token: Optional[str] = None):
+        self._token = token
+
+    @property
+    def tenant(self) -> Tenant:
+        return tenants.get(resolve_token(self._token))
+
+    @property
+    def api(self):
+        return get_todoist_api(resolve_token(self._token))
+
+    @property
+    def user_key(self) -> str:
+        """Cache key of the account, derived from the token so the token itself is never stored"""
+        return self.tenant.key
+
+    @property
+    def replica(self) -> Optional[WorkspaceReplica]:
+        """Sync API replica of this account, if incremental sync is enabled"""
+        if not settings.TODOIST_SYNC_ENABLED:
+            return None
+        tenant = self.tenant
+        if tenant.replica is None:
+            tenant.replica = WorkspaceReplica(self.sync_client)
+        return tenant.replica
+
+    @property
+    def governor(self) -> RateGovernor:
+        """Rate governor shared by every request of this account"""
+        return self.tenant.governor
+
+    @property
+    def sync_client(self) -> TodoistSyncClient:
+        """Sync API client of this account, shared with its replica when there is one"""
+        tenant = self.tenant
+        if tenant.replica is not None:
+            return tenant.replica.client
+        return TodoistSyncClient(tenant.token, settings.TODOIST_SYNC_URL, governor=tenant.governor)
+
+    @staticmethod
+    def _task_to_dict(task) -> Dict[str, Any]:
+        return {
+            "id": task.id,
+            "content": task.content,
+            "due": task.due.date if task.due else None,
+            "priority": task.priority,
+            "project_id": task.project_id,
+            "labels": task.labels,
+            "url": task.url
+        }
+
+    @staticmethod
+    def _project_to_dict(project) -> Dict[str, Any]:
+        return {
+            "id": project.id,
+            "name": project.name,
+            "color": project.color,
+            "is_favorite": project.is_favorite,
+            "parent_id": project.parent_id,
+            "order": project.order
+        }
         
     async def create_task(self, 
                          title: str,
@@ -19,52 +98,59 @@ class TodoistTools:
                          priority: Optional[int] = None) -> Dict[str, Any]:
         """Create a new task in Todoist"""
         try:
-            task = await self.api.add_task(
+            task = await self.governor.call("add_task", lambda: self.api.add_task(
                 content=title,
                 description=description,
                 due_string=due_date,
                 project_id=project_id,
                 priority=priority
-            )
+            ))
             logger.info(f"Created task: {task.id}")
+            workspace_cache.add_task(self.user_key, self._task_to_dict(task))
             return {"success": True, "task_id": task.id, "content": task.content}
         except Exception as e:
             logger.error(f"Error creating task: {str(e)}")
             return {"success": False, "error": str(e)}
             
+    def _with_title(self, result: Dict[str, Any], title: Optional[str]) -> Dict[str, Any]:
+        # The title lets the summary name the task; it is only known when the task was cached
+        return {**result, "content": title} if title is not None else result
+
     async def complete_task(self, task_id: str) -> Dict[str, bool]:
         """Mark a task as completed"""
         try:
-            await self.api.close_task(task_id=task_id)
+            title = workspace_cache.task_title(self.user_key, task_id)
+            await self.governor.call("close_task", lambda: self.api.close_task(task_id=task_id))
             logger.info(f"Completed task: {task_id}")
-            return {"success": True}
+            workspace_cache.remove_task(self.user_key, task_id)
+            return self._with_title({"success": True}, title)
         except Exception as e:
             logger.error(f"Error completing task: {str(e)}")
             return {"success": False, "error": str(e)}
             
-    async def get_tasks(self, project_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get all tasks, optionally filtered by project"""
+    async def get_tasks(self, project_id: Optional[str] = None) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """Get all tasks, optionally filtered by project; an error result when Todoist cannot be read"""
         try:
-            tasks = await self.api.get_tasks(project_id=project_id)
+            snapshot = await self.get_workspace_snapshot()
             return [
                 {
-                    "id": task.id,
-                    "content": task.content,
-                    "due": task.due.date if task.due else None,
-                    "priority": task.priority
+                    "id": task["id"],
+                    "content": task["content"],
+                    "due": task["due"],
+                    "priority": task["priority"]
                 }
-                for task in tasks
+                for task in snapshot.tasks
+                if project_id is None or task["project_id"] == project_id
             ]
         except Exception as e:
             logger.error(f"Error getting tasks: {str(e)}")
-            return []
+            return {"success": False, "error": str(e)}
 
     async def update_task(self, task_id: str, title: str = None, description: str = None, priority: int = None, due_date: str = None) -> dict:
         """Update a task in Todoist"""
         try:
-            # Get the task first to ensure it exists
-            task = await self.api.get_task(task_id=task_id)
-            
+            # No pre-read: the cached task list may be stale, so Todoist rejects unknown tasks itself
+
             # Prepare update data
             update_data = {}
             if title is not None:
@@ -77,20 +163,35 @@ class TodoistTools:
                 update_data["due_string"] = due_date
             
             # Update the task
-            await self.api.update_task(task_id=task_id, **update_data)
+            cached_title = workspace_cache.task_title(self.user_key, task_id)
+            await self.governor.call("update_task", lambda: self.api.update_task(task_id=task_id, **update_data))
             logger.info(f"Updated task: {task_id}")
+            self._update_cached_task(task_id, title, priority, due_date)
             
-            return {"success": True, "task_id": task_id}
+            return self._with_title({"success": True, "task_id": task_id}, title or cached_title)
             
         except Exception as e:
             logger.error(f"Error updating task: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    def _update_cached_task(self, task_id: str, title: str, priority: int, due_date: str) -> None:
+        # The resolved due date is only known to Todoist, so a new due string reloads the task list
+        if due_date is not None:
+            workspace_cache.invalidate_tasks(self.user_key)
+            return
+        changes = {}
+        if title is not None:
+            changes["content"] = title
+        if priority is not None:
+            changes["priority"] = priority
+        workspace_cache.update_task(self.user_key, task_id, changes)
+
     async def reopen_task(self, task_id: str) -> Dict[str, bool]:
         """Reopen a completed task"""
         try:
-            await self.api.reopen_task(task_id=task_id)
+            await self.governor.call("reopen_task", lambda: self.api.reopen_task(task_id=task_id))
             logger.info(f"Reopened task: {task_id}")
+            workspace_cache.invalidate_tasks(self.user_key)
             return {"success": True}
         except Exception as e:
             logger.error(f"Error reopening task: {str(e)}")
@@ -99,52 +200,184 @@ class TodoistTools:
     async def delete_task(self, task_id: str) -> Dict[str, bool]:
         """Delete a task from Todoist"""
         try:
-            await self.api.delete_task(task_id=task_id)
+            title = workspace_cache.task_title(self.user_key, task_id)
+            await self.governor.call("delete_task", lambda: self.api.delete_task(task_id=task_id))
             logger.info(f"Deleted task: {task_id}")
-            return {"success": True}
+            workspace_cache.remove_task(self.user_key, task_id)
+            return self._with_title({"success": True}, title)
         except Exception as e:
             logger.error(f"Error deleting task: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    @staticmethod
+    def _command(kind: str, args: Dict[str, Any], temp_id: Optional[str] = None) -> Dict[str, Any]:
+        command = {"type": kind, "uuid": str(uuid.uuid4()), "args": args}
+        if temp_id is not None:
+            command["temp_id"] = temp_id
+        return command
+
+    async def _run_commands(self, commands: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Send Sync API commands in batches of TODOIST_SYNC_BATCH_SIZE, one request per batch.
+
+        Returns one result per command, in order. A rejected command does not affect the
+        others; a failed request fails every command of its batch.
+        """
+        client = self.sync_client
+        size = settings.TODOIST_SYNC_BATCH_SIZE
+        results = []
+        for start in range(0, len(commands), size):
+            batch = commands[start:start + size]
+            try:
+                response = await client.sync(resource_types=[], commands=batch)
+            except Exception as e:
+                logger.error(f"Error sending {len(batch)} Sync API commands: {str(e)}")
+                results.extend({"success": False, "error": str(e)} for _ in batch)
+                continue
+            status = response.get("sync_status", {})
+            temp_ids = response.get("temp_id_mapping", {})
+            for command in batch:
+                task_id = temp_ids.get(command["temp_id"]) if "temp_id" in command else command["args"].get("id")
+                outcome = status.get(command["uuid"], {"error": "No status returned"})
+                if outcome == "ok":
+                    results.append({"success": True, "task_id": task_id})
+                else:
+                    results.append({"success": False, "task_id": task_id, "error": outcome.get("error", str(outcome))})
+        return results
+
+    @staticmethod
+    def _bulk_result(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        failed = sum(1 for result in results if not result["success"])
+        return {"success": failed == 0, "failed": failed, "results": results}
+
+    async def bulk_create(self, tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Create many tasks; each dict takes the create_task arguments"""
+        commands = []
+        for task in tasks:
+            args = {"content": task.get("title")}
+            if task.get("description") is not None:
+                args["description"] = task["description"]
+            if task.get("due_date") is not None:
+                args["due"] = {"string": task["due_date"]}
+            if task.get("project_id") is not None:
+                args["project_id"] = task["project_id"]
+            if task.get("priority") is not None:
+                args["priority"] = task["priority"]
+            commands.append(self._command("item_add", args, temp_id=str(uuid.uuid4())))
+        results = await self._run_commands(commands)
+
+        created = [(task, result) for task, result in zip(tasks, results) if result["success"]]
+        logger.info(f"Bulk created {len(created)} of {len(tasks)} tasks")
+        if any(task.get("due_date") is not None for task, _ in created):
+            workspace_cache.invalidate_tasks(self.user_key)
+        else:
+            for task, result in created:
+                workspace_cache.add_task(self.user_key, item_to_task({
+                    "id": result["task_id"],
+                    "content": task["title"],
+                    "priority": task.get("priority") or 1,
+                    "project_id": task.get("project_id"),
+                }))
+        return self._bulk_result(results)
+
+    async def bulk_complete(self, task_ids: List[str]) -> Dict[str, Any]:
+        """Mark many tasks as completed"""
+        results = await self._run_commands([self._command("item_close", {"id": task_id}) for task_id in task_ids])
+        for result in results:
+            if result["success"]:
+                workspace_cache.remove_task(self.user_key, result["task_id"])
+        logger.info(f"Bulk completed {sum(r['success'] for r in results)} of {len(task_ids)} tasks")
+        return self._bulk_result(results)
+
+    async def bulk_update(self, updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Update many tasks; each dict takes task_id plus the update_task fields to change"""
+        commands = []
+        for update in updates:
+            args = {"id": update.get("task_id")}
+            if update.get("title") is not None:
+                args["content"] = update["title"]
+            if update.get("description") is not None:
+                args["description"] = update["description"]
+            if update.get("priority") is not None:
+                args["priority"] = update["priority"]
+            if update.get("due_date") is not None:
+                args["due"] = {"string": update["due_date"]}
+            commands.append(self._command("item_update", args))
+        results = await self._run_commands(commands)
+        for update, result in zip(updates, results):
+            if result["success"]:
+                self._update_cached_task(result["task_id"], update.get("title"), update.get("priority"), update.get("due_date"))
+        logger.info(f"Bulk updated {sum(r['success'] for r in results)} of {len(updates)} tasks")
+        return self._bulk_result(results)
+
+    async def bulk_delete(self, task_ids: List[str]) -> Dict[str, Any]:
+        """Delete many tasks"""
+        results = await self._run_commands([self._command("item_delete", {"id": task_id}) for task_id in task_ids])
+        for result in results:
+            if result["success"]:
+                workspace_cache.remove_task(self.user_key, result["task_id"])
+        logger.info(f"Bulk deleted {sum(r['success'] for r in results)} of {len(task_ids)} tasks")
+        return self._bulk_result(results)
+
+    async def _fetch_projects(self) -> List[Dict[str, Any]]:
+        if self.replica is not None:
+            try:
+                return await self.replica.get_projects()
+            except Exception as e:
+                logger.warning(f"Sync failed, listing projects instead: {str(e)}")
+        projects = await self.governor.call("get_projects", self.api.get_projects, priority=READ)
+        return [self._project_to_dict(project) for project in projects]
+
+    async def _fetch_active_tasks(self) -> List[Dict[str, Any]]:
+        if self.replica is not None:
+            try:
+                return await self.replica.get_active_tasks()
+            except Exception as e:
+                logger.warning(f"Sync failed, listing tasks instead: {str(e)}")
+        tasks = await self.governor.call("get_tasks", self.api.get_tasks, priority=READ)
+        return [self._task_to_dict(task) for task in tasks]
+
+    @classmethod
+    async def get_workspace_snapshot(cls) -> WorkspaceSnapshot:
+        """Get projects and active tasks, served from the workspace cache while fresh"""
+        todoist_client = cls()
+        return await workspace_cache.get(
+            todoist_client.user_key,
+            todoist_client._fetch_projects,
+            todoist_client._fetch_active_tasks
+        )
+
+    @classmethod
+    def workspace_version(cls) -> int:
+        """Version of the cached workspace snapshot, 0 when nothing is cached yet"""
+        return workspace_cache.version(cls().user_key)
+
     @classmethod
-    async def get_projects(cls) -> List[Dict[str, Any]]:
-        """Get all projects from Todoist"""
+    async def get_projects(cls) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """Get all projects from Todoist; an error result when Todoist cannot be read"""
         try:
-            todoist_client = cls()
-            projects = await todoist_client.api.get_projects()
-            return [
-                {
-                    "id": project.id,
-                    "name": project.name,
-                    "color": project.color,
-                    "is_favorite": project.is_favorite,
-                    "parent_id": project.parent_id,
-                    "order": project.order
-                }
-                for project in projects
-            ]
+            snapshot = await cls.get_workspace_snapshot()
+            return snapshot.projects
         except Exception as e:
             logger.error(f"Error getting projects: {str(e)}")
-            return []
+            return {"success": False, "error": str(e)}
 
     @classmethod
-    async def get_active_tasks(cls) -> List[Dict[str, Any]]:
-        """Get all active (not completed) tasks"""
+    async def get_active_tasks(cls) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """Get all active (not completed) tasks; an error result when Todoist cannot be read"""
         try:
-            todoist_client = cls()
-            tasks = await todoist_client.api.get_tasks()
-            return [
-                {
-                    "id": task.id,
-                    "content": task.content,
-                    "due": task.due.date if task.due else None,
-                    "priority": task.priority,
-                    "project_id": task.project_id,
-                    "labels": task.labels,
-                    "url": task.url
-                }
-                for task in tasks
-            ]
+            snapshot = await cls.get_workspace_snapshot()
+            return snapshot.tasks
         except Exception as e:
             logger.error(f"Error getting active tasks: {str(e)}")
-            return []
+            return {"success": False, "error": str(e)}
+
+    @classmethod
+    async def search_tasks(cls, query: str, limit: int = 10) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """Find active tasks by words from their content, labels or project name; an error result on failure"""
+        try:
+            snapshot = await cls.get_workspace_snapshot()
+            return snapshot.search_index().search(query, limit)
+        except Exception as e:
+            logger.error(f"Error searching tasks: {str(e)}")
+            return {"success": False, "error": str(e)}
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from app.tools.todoist.client import account_key
+from app.tools.todoist.governor import RateGovernor, create_governor, governor_stats
+from app.tools.todoist.sync import WorkspaceReplica
+
+
+@dataclass
+class Tenant:
+    """Per-account state: the rate governor and, once synced, the workspace replica"""
+    key: str
+    token: str = field(repr=False)
+    governor: RateGovernor = field(default_factory=create_governor)
+    replica: Optional[WorkspaceReplica] = None
+
+
+class TenantPool:
+    """
+    Tenants of the most recently active accounts, least recently used first.
+
+    The pool holds at most max_tenants accounts; the least recently used one is evicted
+    when a new account arrives, and on_evict is called with its key so caches built
+    for it can be dropped too.
+    """
+
+    def __init__(self, max_tenants: int, on_evict: Optional[Callable[[str], None]] = None):
+        self.max_tenants = max_tenants
+        self.on_evict = on_evict
+        self.stats_counters = {"created": 0, "evictions": 0}
+        self._tenants: "OrderedDict[str, Tenant]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tenants)
+
+    def get(self, token: str) -> Tenant:
+        key = account_key(token)
+        tenant = self._tenants.get(key)
+        if tenant is not None:
+            self._tenants.move_to_end(key)
+            return tenant
+        tenant = self._tenants[key] = Tenant(key=key, token=token)
+        self.stats_counters["created"] += 1
+        while len(self._tenants) > self.max_tenants:
+            evicted, _ = self._tenants.popitem(last=False)
+            self.stats_counters["evictions"] += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+        return tenant
+
+    def clear(self) -> None:
+        self._tenants.clear()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tenants": len(self._tenants),
+            "max_tenants": self.max_tenants,
+            **self.stats_counters,
+            "governor": governor_stats(tenant.governor for tenant in self._tenants.values()),
+        }
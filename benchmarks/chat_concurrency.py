@@ -0,0 +1,58 @@
+"""Concurrent chat throughput with the blocking and the async LLM client.
+
+Each simulated chat makes three sequential completions (understand, execute,
+finalize) against a local OpenAI-compatible stand-in.
+
+Usage:
+    python -m benchmarks.chat_concurrency [concurrent_chats] [llm_delay_seconds]
+"""
+import asyncio
+import os
+import sys
+import time
+
+from benchmarks.fake_openai import serve_in_thread
+
+
+async def run_chats(completion, chats: int) -> float:
+    async def chat() -> None:
+        for name in ("understand", "execute", "finalize"):
+            await completion(name)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(chat() for _ in range(chats)))
+    return time.perf_counter() - started
+
+
+async def main(chats: int, delay: float) -> None:
+    os.environ["OPENAI_BASE_URL"] = serve_in_thread(delay)
+
+    from openai import OpenAI
+    from app.agent.openai_service import OpenAIService, close_async_client
+
+    messages = [{"role": "user", "content": "Add a task"}]
+
+    # Before: synchronous client called from inside the coroutine
+    sync_client = OpenAI(base_url=os.environ["OPENAI_BASE_URL"])
+
+    async def blocking_completion(name: str) -> None:
+        sync_client.chat.completions.create(model="gpt-4o", messages=messages)
+
+    service = OpenAIService()
+
+    async def async_completion(name: str) -> None:
+        await service.completion({"messages": messages, "name": name})
+
+    before = await run_chats(blocking_completion, chats)
+    after = await run_chats(async_completion, chats)
+    await close_async_client()
+
+    print(f"{chats} concurrent chats, {delay * 1000:.0f} ms per completion")
+    print(f"blocking client: {before:6.2f} s  {chats / before:7.1f} chats/s")
+    print(f"async client:    {after:6.2f} s  {chats / after:7.1f} chats/s")
+
+
+if __name__ == "__main__":
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    asyncio.run(main(chats, delay))
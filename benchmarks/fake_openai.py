@@ -0,0 +1,51 @@
+"""Local OpenAI-compatible stand-in that answers chat completions after a fixed delay.
+
+An optional per-prompt-token delay models prefill cost, so longer prompts answer slower.
+"""
+import asyncio
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+
+app = FastAPI()
+app.state.delay = 0.2
+app.state.seconds_per_1k_prompt_tokens = 0.0
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request) -> dict:
+    body = await request.json()
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+    await asyncio.sleep(app.state.delay + prompt_tokens / 1000 * app.state.seconds_per_1k_prompt_tokens)
+    content = '{"add": null}' if body.get("response_format", {}).get("type") == "json_object" else "ok"
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 2, "total_tokens": prompt_tokens + 2},
+    }
+
+
+def serve_in_thread(delay: float = 0.2, seconds_per_1k_prompt_tokens: float = 0.0) -> str:
+    """Start the stand-in on a free local port and return its base URL."""
+    app.state.delay = delay
+    app.state.seconds_per_1k_prompt_tokens = seconds_per_1k_prompt_tokens
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/v1"
@@ -0,0 +1,35 @@
+"""Compare building the agent graph per request with reusing the shared one.
+
+Usage:
+    python -m benchmarks.graph_compile [requests]
+"""
+import sys
+import time
+
+from app.agent.agent import Agent
+
+
+def main(requests: int = 200) -> None:
+    started = time.perf_counter()
+    Agent.get_workflow()
+    startup_ms = (time.perf_counter() - started) * 1000
+
+    # Old behaviour: Agent() compiled once in __init__ and process() compiled again
+    started = time.perf_counter()
+    for _ in range(requests):
+        Agent._create_workflow()
+        Agent._create_workflow()
+    per_request_before = (time.perf_counter() - started) * 1000 / requests
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        Agent.get_workflow()
+    per_request_after = (time.perf_counter() - started) * 1000 / requests
+
+    print(f"startup compile:            {startup_ms:8.3f} ms")
+    print(f"graph overhead per request: {per_request_before:8.3f} ms (before)")
+    print(f"graph overhead per request: {per_request_after:8.3f} ms (after)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
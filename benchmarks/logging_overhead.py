@@ -0,0 +1,116 @@
+"""Per-request logging cost on the request's thread: the former configuration versus the current one.
+
+Each simulated request logs what a chat run logs: the state, the understand response,
+the steps, the execution plan, a task listing result and the final response. "before"
+uses f-strings and synchronous sinks with the file at DEBUG; "after" uses the current
+setup (enqueued sinks, lazy clip() arguments, message truncation), without enqueueing
+and with sampling. "caller" is the time spent in the logging calls, "total" includes
+waiting for the writer threads to empty their queues. Console output goes to /dev/null.
+
+Usage:
+    python -m benchmarks.logging_overhead [requests] [tasks_in_listing]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from app.core import logging as app_logging
+from app.core.config import get_logging_settings
+from app.core.logging import clip
+
+OLD_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+
+
+def payload(tasks: int) -> dict:
+    listing = [
+        {"id": str(8800000000 + i), "content": f"Task number {i} with a longer title", "priority": 1,
+         "project_id": "2200000000", "due": {"date": "2025-01-01", "string": "tomorrow"}}
+        for i in range(tasks)
+    ]
+    return {
+        "state": {"input": "Add milk and list my tasks", "mode": "multi_node", "tool_calls": [], "steps": []},
+        "understanding": {"add": "Add 'milk'", "list": "List all active tasks"},
+        "steps": ["add: Add 'milk'", "list: List all active tasks"],
+        "plan": [{"tool_name": "get_active_todoist_tasks", "arguments": {}}],
+        "tool_response": {"step": {"tool_name": "get_active_todoist_tasks", "arguments": {}}, "result": listing},
+        "response": "**Podsumowanie**: " + "dodano zadanie; " * 20,
+    }
+
+
+def request_before(p: dict) -> None:
+    logger.info(f"State: {p['state']}")
+    logger.info(f"Agent response: {p['understanding']}")
+    logger.info(f"Steps: {p['steps']}")
+    logger.info(f"Execution plan: {p['plan']}")
+    logger.info(f"Tool response: {p['tool_response']}")
+    logger.debug(f"Agent response: {p['response']}")
+
+
+def request_after(p: dict) -> None:
+    logger.info("State: {}", clip(p["state"]))
+    logger.info("Agent response: {}", clip(p["understanding"]))
+    logger.info("Steps: {}", clip(p["steps"]))
+    logger.info("Execution plan: {}", clip(p["plan"]))
+    logger.info("Tool response: {}", clip(p["tool_response"]))
+    logger.debug("Agent response: {}", clip(p["response"]))
+
+
+def configure_before(log_dir: Path) -> None:
+    logger.configure(
+        handlers=[
+            {"sink": sys.stdout, "colorize": True, "format": OLD_FORMAT, "level": "INFO"},
+            {"sink": str(log_dir / "app.log"), "format": OLD_FORMAT, "level": "DEBUG"},
+            {"sink": str(log_dir / "error.log"), "format": OLD_FORMAT, "level": "ERROR"},
+        ],
+        patcher=lambda record: None,
+    )
+
+
+def configure_after(log_dir: Path, sampling: str = "{}", enqueue: bool = True) -> None:
+    os.environ["LOG_DIR"] = str(log_dir)
+    os.environ["LOG_SAMPLING"] = sampling
+    os.environ["LOG_ENQUEUE"] = str(enqueue).lower()
+    get_logging_settings.cache_clear()
+    app_logging.setup_logging()
+
+
+def measure(name: str, configure, request, p: dict, requests: int) -> None:
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, "w") as devnull:
+        # The console sink keeps the stream it was configured with
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            configure(Path(directory))
+        finally:
+            sys.stdout = stdout
+        started = time.perf_counter()
+        for _ in range(requests):
+            request(p)
+        caller = time.perf_counter() - started
+        logger.complete()
+        total = time.perf_counter() - started
+        written = sum(f.stat().st_size for f in Path(directory).glob("*.log"))
+        logger.remove()
+    print(
+        f"{name:<24} {caller / requests * 1e6:>12.0f} {total / requests * 1e6:>12.0f} "
+        f"{written / requests / 1024:>12.1f}"
+    )
+
+
+def main(requests: int, tasks: int) -> None:
+    p = payload(tasks)
+    print(f"{requests} requests, {tasks} tasks in the listing")
+    print(f"{'configuration':<24} {'caller us/req':>12} {'total us/req':>12} {'KiB/req':>12}")
+    measure("before", configure_before, request_before, p, requests)
+    measure("after, not enqueued", lambda d: configure_after(d, enqueue=False), request_after, p, requests)
+    measure("after", configure_after, request_after, p, requests)
+    measure("after, 10% sampled", lambda d: configure_after(d, '{"__main__": 0.1}'), request_after, p, requests)
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    tasks = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    main(requests, tasks)
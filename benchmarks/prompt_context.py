@@ -0,0 +1,95 @@
+"""Prompt tokens and end-to-end latency against task-list size, with and without context filtering.
+
+Each chat runs the understand step against a local OpenAI-compatible stand-in whose
+latency grows with the prompt length (prefill), over a synthetic workspace.
+
+Usage:
+    python -m benchmarks.prompt_context [runs] [seconds_per_1k_prompt_tokens]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from benchmarks.fake_openai import serve_in_thread
+
+SIZES = (100, 1000, 3000, 10000)
+QUERY = "What is due tomorrow in the Garden project?"
+WORDS = ["report", "call", "buy", "fix", "email", "review", "book", "plan", "pay", "clean", "order", "send"]
+OBJECTS = ["invoice", "dentist", "groceries", "bike", "slides", "tickets", "roof", "budget", "car", "flat"]
+
+
+def synthetic_workspace(size: int):
+    rng = random.Random(size)
+    projects = [{"id": f"p{i}", "name": name} for i, name in enumerate(["Inbox", "Work", "Home", "Garden"])]
+    tasks = []
+    for i in range(size):
+        due = date.today() + timedelta(days=rng.randint(-10, 60)) if rng.random() < 0.4 else None
+        tasks.append({
+            "id": str(1000 + i),
+            "content": f"{rng.choice(WORDS).title()} {rng.choice(OBJECTS)} #{i}",
+            "project_id": rng.choice(projects)["id"],
+            "due": due.isoformat() if due else None,
+            "labels": [],
+        })
+    return projects, tasks
+
+
+async def run(size: int, runs: int, filtered: bool):
+    from app.agent.agent import Agent
+    from app.core.config import get_settings
+    from app.tools.todoist import tasks as tasks_module
+    from app.tools.todoist.cache import WorkspaceCache
+    from app.tools.todoist.tasks import TodoistTools
+
+    projects, tasks = synthetic_workspace(size)
+
+    async def fetch_projects(self):
+        return projects
+
+    async def fetch_tasks(self):
+        return tasks
+
+    TodoistTools._fetch_projects = fetch_projects
+    TodoistTools._fetch_active_tasks = fetch_tasks
+    tasks_module.workspace_cache = WorkspaceCache(ttl=60)
+
+    settings = get_settings()
+    defaults = settings.CONTEXT_MAX_TASKS, settings.CONTEXT_MAX_TASK_TOKENS
+    if not filtered:
+        settings.CONTEXT_MAX_TASKS, settings.CONTEXT_MAX_TASK_TOKENS = 10 ** 9, 10 ** 12
+    try:
+        tokens, latencies = [], []
+        for _ in range(runs):
+            started = time.perf_counter()
+            result = await Agent.process(QUERY)
+            latencies.append(time.perf_counter() - started)
+            tokens.append(result["usage"]["prompt_tokens"])
+    finally:
+        settings.CONTEXT_MAX_TASKS, settings.CONTEXT_MAX_TASK_TOKENS = defaults
+    return sum(tokens) / runs, sum(latencies) / runs * 1000
+
+
+async def main(runs: int, per_1k: float) -> None:
+    os.environ["OPENAI_BASE_URL"] = serve_in_thread(0.05, per_1k)
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["TRACE_EXPORTER"] = "none"
+
+    from app.core import logger
+    logger.remove()
+
+    await run(10, 1, filtered=True)  # warm-up: graph compile and client pool
+    print(f"understand step, {runs} runs per size, {per_1k * 1000:.0f} ms per 1k prompt tokens")
+    print(f"{'tasks':>6}  {'full tokens':>11}  {'full ms':>8}  {'filtered tokens':>15}  {'filtered ms':>11}")
+    for size in SIZES:
+        full_tokens, full_ms = await run(size, runs, filtered=False)
+        filtered_tokens, filtered_ms = await run(size, runs, filtered=True)
+        print(f"{size:>6}  {full_tokens:>11.0f}  {full_ms:>8.1f}  {filtered_tokens:>15.0f}  {filtered_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    per_1k = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    asyncio.run(main(runs, per_1k))
@@ -0,0 +1,128 @@
+"""Startup time, chat throughput and shutdown time of the server entry point.
+
+Each configuration is started as `python -m app.server ...` against local stand-ins for
+the OpenAI API and the Todoist Sync API. Startup is measured until /health answers,
+then concurrent /chat requests run for a fixed time, then SIGTERM is sent and the
+drain is timed. "dev" is the former `python -m app` behaviour: the auto-reloader with
+debug logging.
+
+Usage:
+    python -m benchmarks.server [concurrency] [seconds] [llm_delay_seconds]
+"""
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from app.server import default_workers
+from app.tools.todoist.fake_server import FakeTodoist, create_app
+from benchmarks.fake_openai import serve_in_thread
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_todoist_in_thread(token: str) -> str:
+    """Serve a FakeTodoist account with a few tasks and return its Sync API URL"""
+    fake = FakeTodoist()
+    for i in range(20):
+        fake.account(token).add_task(f"Task {i}")
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(fake), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/sync/v9"
+
+
+def percentile(samples, percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))] if ordered else 0.0
+
+
+async def load(url: str, concurrency: int, seconds: float):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+
+    async def user(client: httpx.AsyncClient, i: int) -> None:
+        nonlocal errors
+        n = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.post(url, json={"input": f"What is due today? ({i}-{n})"})
+            n += 1
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    async with httpx.AsyncClient(timeout=60, limits=httpx.Limits(max_connections=concurrency)) as client:
+        await asyncio.gather(*(user(client, i) for i in range(concurrency)))
+    return latencies, errors
+
+
+def run(name: str, args, env, concurrency: int, seconds: float) -> None:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--port", str(port), "--host", "127.0.0.1", *args],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    while True:
+        try:
+            if httpx.get(f"{base}/api/v1/health", timeout=1).status_code == 200:
+                break
+        except httpx.HTTPError:
+            time.sleep(0.02)
+    startup = time.perf_counter() - started
+
+    latencies, errors = asyncio.run(load(f"{base}/api/v1/chat", concurrency, seconds))
+
+    stopping = time.perf_counter()
+    process.send_signal(signal.SIGTERM)
+    process.wait(timeout=120)
+    shutdown = time.perf_counter() - stopping
+    print(
+        f"{name:<26} {startup:>9.2f} {len(latencies) / seconds:>8.1f} {percentile(latencies, 50) * 1000:>8.0f} "
+        f"{percentile(latencies, 99) * 1000:>8.0f} {errors:>7} {shutdown:>11.2f}"
+    )
+
+
+def main(concurrency: int, seconds: float, delay: float) -> None:
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": serve_in_thread(delay),
+        "TODOIST_SYNC_URL": serve_todoist_in_thread(os.environ["TODOIST_API_KEY"]),
+        "TRACE_EXPORTER": "none",
+        "LLM_CACHE_ENABLED": "false",
+        "SERVER_LOG_LEVEL": "warning",
+    }
+    cpus = default_workers()
+    configs = [
+        ("dev (reload, debug)", ["--reload"]),
+        ("1 worker, asyncio/h11", ["--workers", "1", "--loop", "asyncio", "--http", "h11"]),
+        ("1 worker, auto", ["--workers", "1"]),
+        (f"{max(2, cpus)} workers, auto", ["--workers", str(max(2, cpus))]),
+    ]
+    print(f"{concurrency} concurrent chats for {seconds:.0f} s, {delay * 1000:.0f} ms per LLM call, {cpus} CPUs")
+    print(f"{'configuration':<26} {'startup s':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'shutdown s':>11}")
+    for name, args in configs:
+        run(name, args, env, concurrency, seconds)
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    main(concurrency, seconds, delay)
@@ -0,0 +1,83 @@
+"""Task search latency with the inverted index versus scanning every task.
+
+Usage:
+    python -m benchmarks.task_index [tasks] [queries]
+"""
+import random
+import statistics
+import sys
+import time
+
+from app.tools.todoist.index import TaskIndex, task_words, tokenize
+
+VERBS = ["buy", "call", "fix", "email", "review", "book", "plan", "pay", "clean", "order", "send", "write"]
+QUERIES = [
+    "the groceries task",
+    "call the dentist",
+    "invoice for march",
+    "kupić mleko",
+    "review slides home",
+    "bike repair",
+]
+
+
+def synthetic_tasks(count: int, rng: random.Random):
+    vocabulary = [f"{word}{i}" for i in range(2000) for word in ("item", "topic")] + [
+        "groceries", "dentist", "invoice", "march", "mleko", "slides", "bike", "repair",
+    ]
+    projects = [{"id": f"p{i}", "name": name} for i, name in enumerate(["Inbox", "Work", "Home", "Garden"])]
+    tasks = [
+        {
+            "id": str(i),
+            "content": f"{rng.choice(VERBS).title()} {rng.choice(vocabulary)} {rng.choice(vocabulary)}",
+            "project_id": rng.choice(projects)["id"],
+            "labels": [rng.choice(vocabulary)] if rng.random() < 0.2 else [],
+        }
+        for i in range(count)
+    ]
+    return projects, tasks
+
+
+def scan(tasks, query: str, limit: int = 10):
+    words = set(tokenize(query))
+    scored = [(len(words & task_words(task)), task) for task in tasks]
+    return [task for score, task in sorted(scored, key=lambda item: -item[0])[:limit] if score]
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), sorted(samples)[int(len(samples) * 0.99) - 1]
+
+
+def main(count: int = 50_000, queries: int = 1000) -> None:
+    rng = random.Random(0)
+    projects, tasks = synthetic_tasks(count, rng)
+
+    started = time.perf_counter()
+    index = TaskIndex(tasks, projects)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    lookups = [rng.choice(QUERIES) for _ in range(queries)]
+    position = iter(range(10 ** 9))
+    index_p50, index_p99 = timed(lambda: index.search(lookups[next(position) % queries]), queries)
+    scan_p50, scan_p99 = timed(lambda: scan(tasks, rng.choice(QUERIES)), 20)
+
+    started = time.perf_counter()
+    for i in range(1000):
+        index.add({"id": str(i), "content": f"Updated task {i}", "project_id": "p0", "labels": []})
+    update_us = (time.perf_counter() - started) * 1000
+
+    print(f"{count} tasks, index built in {build_ms:.0f} ms")
+    print(f"index lookup: p50 {index_p50:7.3f} ms  p99 {index_p99:7.3f} ms")
+    print(f"full scan:    p50 {scan_p50:7.3f} ms  p99 {scan_p99:7.3f} ms")
+    print(f"task update:  {update_us:7.3f} us per task")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    main(count, queries)
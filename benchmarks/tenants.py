@@ -0,0 +1,94 @@
+"""Many tenants served by one process: memory growth and latency with bounded per-tenant state.
+
+Every simulated chat belongs to one of many synthetic tenants, sets its token for the
+request, reads the workspace and completes a few tasks through the Sync API. The local
+fake Todoist API runs in-process, so only the agent-side cost is measured.
+
+Usage:
+    python -m benchmarks.tenants [tenants] [requests] [max_tenants]
+"""
+import asyncio
+import random
+import sys
+import time
+import tracemalloc
+
+import httpx
+
+TASKS_PER_TENANT = 50
+CONCURRENCY = 50
+PHASES = 5
+
+
+def percentile(samples, percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+async def main(tenant_count: int, requests: int, max_tenants: int) -> None:
+    from app.core.config import get_settings
+    from app.tools.todoist import client as client_module
+    from app.tools.todoist import tasks as tasks_module
+    from app.tools.todoist.cache import WorkspaceCache
+    from app.tools.todoist.client import current_token
+    from app.tools.todoist.fake_server import FakeTodoist, create_app
+    from app.tools.todoist.tasks import TodoistTools
+    from app.tools.todoist.tenants import TenantPool
+
+    settings = get_settings()
+    settings.TODOIST_SYNC_URL = "http://fake/sync/v9"
+    settings.TODOIST_RATE_LIMIT = 1000.0
+    fake = FakeTodoist()
+    tokens = [f"tenant-{i}" for i in range(tenant_count)]
+    for token in tokens:
+        account = fake.account(token)
+        for i in range(TASKS_PER_TENANT):
+            account.add_task(f"Task {i} of {token}")
+    client_module._http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(fake)))
+    tasks_module.workspace_cache = WorkspaceCache(ttl=30, max_users=max_tenants, max_tasks=max_tenants * TASKS_PER_TENANT)
+    tasks_module.tenants = TenantPool(max_tenants, on_evict=tasks_module.workspace_cache.invalidate)
+
+    rng = random.Random(0)
+    latencies = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def chat(token: str) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            reset = current_token.set(token)
+            try:
+                tasks = await TodoistTools.get_active_tasks()
+                await TodoistTools.search_tasks("task")
+                await TodoistTools().bulk_complete([task["id"] for task in tasks[:2]])
+            finally:
+                current_token.reset(reset)
+            latencies.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    print(f"{tenant_count} tenants, {requests} requests, at most {max_tenants} tenants kept")
+    print(f"{'requests':>9} {'tenants':>8} {'cached':>7} {'memory MB':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    per_phase = requests // PHASES
+    for phase in range(1, PHASES + 1):
+        latencies.clear()
+        # Zipf-like traffic: a few busy tenants and a long tail
+        picks = [tokens[min(tenant_count - 1, int(rng.paretovariate(1.2)) - 1)] if rng.random() < 0.5
+                 else rng.choice(tokens) for _ in range(per_phase)]
+        await asyncio.gather(*(chat(token) for token in picks))
+        memory = (tracemalloc.get_traced_memory()[0] - baseline) / 1e6
+        print(
+            f"{phase * per_phase:>9} {len(tasks_module.tenants):>8} {len(tasks_module.workspace_cache):>7} "
+            f"{memory:>10.1f} {percentile(latencies, 50) * 1000:>8.2f} {percentile(latencies, 99) * 1000:>8.2f}"
+        )
+    stats = tasks_module.tenants.stats
+    print(f"tenants created {stats['created']}, evicted {stats['evictions']}, "
+          f"cache evictions {tasks_module.workspace_cache.stats['evictions']}, "
+          f"avg mutation queue wait {stats['governor']['queue_wait']['mutation']['avg_ms']:.2f} ms")
+    await client_module._http_client.aclose()
+
+
+if __name__ == "__main__":
+    tenant_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    max_tenants = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+    asyncio.run(main(tenant_count, requests, max_tenants))
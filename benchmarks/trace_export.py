@@ -0,0 +1,69 @@
+"""Per-completion latency with an inline trace flush versus the background exporter.
+
+The sink simulates a network flush with a fixed delay, so the comparison runs offline.
+
+Usage:
+    python -m benchmarks.trace_export [completions] [flush_delay_seconds]
+"""
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+from app.agent.openai_service import OpenAIService
+from app.core.tracing import InMemorySink, TraceExporter
+
+
+class SlowSink(InMemorySink):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def export(self, batch):
+        time.sleep(self.delay)
+        super().export(batch)
+
+
+class InlineFlushTracer:
+    """The old behaviour: every completion waits for its own flush"""
+
+    def __init__(self, sink):
+        self.sink = sink
+
+    def submit(self, event):
+        self.sink.export([event])
+
+
+async def create(**kwargs):
+    message = SimpleNamespace(content="ok")
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=2, total_tokens=12)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+async def measure(tracer, completions: int) -> float:
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    service = OpenAIService(client=client, tracer=tracer)
+    config = {"messages": [{"role": "user", "content": "hi"}], "name": "bench"}
+    started = time.perf_counter()
+    for _ in range(completions):
+        await service.completion(config)
+    return (time.perf_counter() - started) * 1000 / completions
+
+
+async def main(completions: int, delay: float) -> None:
+    inline = await measure(InlineFlushTracer(SlowSink(delay)), completions)
+
+    sink = SlowSink(delay)
+    exporter = TraceExporter(sink, batch_size=50, flush_interval=0.5)
+    background = await measure(exporter, completions)
+    exporter.shutdown()
+
+    print(f"{completions} completions, {delay * 1000:.0f} ms per flush")
+    print(f"inline flush:        {inline:8.3f} ms per completion")
+    print(f"background exporter: {background:8.3f} ms per completion ({sink.batches} batches)")
+
+
+if __name__ == "__main__":
+    completions = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    asyncio.run(main(completions, delay))
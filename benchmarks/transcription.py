@@ -0,0 +1,64 @@
+"""Voice requests through the bounded transcription pool: throughput, real-time factor and queue depth.
+
+The local stand-in backend works for rtf * duration seconds per clip, so the numbers show
+how the pool size and queue bound shape latency and rejections under a burst of uploads.
+
+Usage:
+    python -m benchmarks.transcription [clips] [clip_seconds] [backend_rtf]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.tools.audio.transcription import LocalBackend, TranscriptionPool, TranscriptionQueueFull, silent_wav
+
+QUEUE = 16
+
+
+def percentile(samples, percent: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))] if ordered else 0.0
+
+
+async def run(path: str, clips: int, workers: int, rtf: float) -> None:
+    pool = TranscriptionPool(LocalBackend(rtf), max_workers=workers, max_queue=QUEUE)
+    latencies = []
+
+    async def upload() -> None:
+        started = time.perf_counter()
+        try:
+            await pool.transcribe(path)
+        except TranscriptionQueueFull:
+            return
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(upload() for _ in range(clips)))
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+    stats = pool.stats
+    print(
+        f"{workers:>8} {stats['completed']:>5} {stats['rejected']:>8} {stats['max_queue_depth']:>10} "
+        f"{stats['real_time_factor']:>8.3f} {stats['audio_seconds_total'] / elapsed:>12.1f} "
+        f"{percentile(latencies, 50):>7.2f} {percentile(latencies, 99):>7.2f}"
+    )
+
+
+async def main(clips: int, seconds: float, rtf: float) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "clip.wav"
+        path.write_bytes(silent_wav(seconds, "Add buy milk for tomorrow"))
+        print(f"{clips} clips of {seconds} s at once, backend RTF {rtf}, queue bound {QUEUE}")
+        print(f"{'workers':>8} {'done':>5} {'rejected':>8} {'max queue':>10} {'RTF':>8} "
+              f"{'audio s / s':>12} {'p50 s':>7} {'p99 s':>7}")
+        for workers in (1, 2, 4, 8):
+            await run(str(path), clips, workers, rtf)
+
+
+if __name__ == "__main__":
+    clips = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    rtf = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    asyncio.run(main(clips, seconds, rtf))
@@ -8,16 +8,20 @@ setup(
         "fastapi>=0.104.1",
         "uvicorn>=0.24.0",
         "python-dotenv>=1.0.0",
-        "langgraph>=0.0.15",
+        "langgraph>=0.3",
         "anthropic>=0.7.7",
         "langchain-anthropic>=0.0.4",
-        "todoist-api-python>=2.1.3",
+        "todoist-api-python>=2.1.3,<3",
         "pydantic>=2.5.2",
         "python-multipart>=0.0.6",
         "loguru>=0.7.2",
         "pydantic_settings"
     ],
     extras_require={
+        "server": [
+            "uvloop>=0.19",
+            "httptools>=0.6"
+        ],
         "test": [
             "pytest>=7.4.3",
             "pytest-asyncio>=0.23.2",
@@ -6,23 +6,30 @@ from fastapi.testclient import TestClient
 from dotenv import load_dotenv
 import os
 import asyncio
-from httpx import AsyncClient
+import json
+from types import SimpleNamespace
+from httpx import ASGITransport, AsyncClient
 from fastapi import FastAPI
 
 # Add project root to Python path
 project_root = str(Path(__file__).parent.parent)
 sys.path.insert(0, project_root)
 
+# Load test environment variables before the app reads its settings
+load_dotenv(Path(project_root) / ".env.test")
+
 from app.__main__ import app
+from app.agent import openai_service
+from app.agent.llm_cache import LLMResponseCache
+from app.agent import tools as agent_tools
+from app.tools.todoist import tasks as tasks_module
+from app.tools.todoist.cache import WorkspaceCache
 from app.tools.todoist.tasks import TodoistTools
 
-# Load test environment variables
-load_dotenv(".env.test")
-
 @pytest_asyncio.fixture
 async def client():
     """Async client fixture"""
-    async with AsyncClient(transport=TestClient(app).transport, base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         yield client
 
 @pytest.fixture
@@ -43,4 +50,105 @@ def test_task_data():
 async def todoist_tools():
     """Todoist tools fixture"""
     tools = TodoistTools()
-    yield tools 
\ No newline at end of file
+    yield tools 
+
+class FakeChatCompletions:
+    """Stand-in for chat.completions that answers according to the prompt type"""
+
+    PROMPTS = {
+        "understand": "Task Query Analyzer",
+        "execute": "tool execution assistant",
+        "plan": "Todoist task planner",
+        "finalizer": "Podsumowanie",
+    }
+
+    def __init__(self):
+        self.responses = {"finalizer": "**Podsumowanie**: OK"}
+        self.calls = []
+
+    async def create(self, **kwargs):
+        system_prompt = kwargs["messages"][0]["content"]
+        kind = next(kind for kind, marker in self.PROMPTS.items() if marker in system_prompt)
+        self.calls.append(kind)
+        content = self.responses[kind]
+        if callable(content):
+            content = content(kwargs["messages"])
+        if not isinstance(content, str):
+            content = json.dumps(content)
+        message = SimpleNamespace(content=content, tool_calls=None)
+        if kwargs.get("tools"):
+            message = self._tool_message(json.loads(content))
+        usage = SimpleNamespace(
+            prompt_tokens=len(system_prompt) // 4,
+            completion_tokens=len(content) // 4,
+            total_tokens=(len(system_prompt) + len(content)) // 4
+        )
+        if kwargs.get("stream"):
+            return self._stream(content, usage)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    @staticmethod
+    def _tool_message(plan):
+        """Turn a JSON-mode plan into native tool calls; an error plan becomes a plain reply"""
+        if isinstance(plan, dict) and plan.get("error"):
+            return SimpleNamespace(content=plan.get("info"), tool_calls=None)
+        calls = [
+            SimpleNamespace(function=SimpleNamespace(name=action["tool_name"], arguments=json.dumps(action["arguments"])))
+            for action in (plan if isinstance(plan, list) else [plan])
+        ]
+        return SimpleNamespace(content=None, tool_calls=calls)
+
+    @staticmethod
+    async def _stream(content, usage):
+        """Yield the content in small pieces, then a usage-only chunk"""
+        for i in range(0, len(content), 8):
+            delta = SimpleNamespace(content=content[i:i + 8])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+class FakeTodoist:
+    """Records tool calls instead of talking to Todoist"""
+
+    def __init__(self):
+        self.projects = [{"id": "p1", "name": "Inbox"}]
+        self.tasks = [
+            {"id": "t1", "content": "Buy milk", "priority": 1, "project_id": "p1", "due": None},
+            {"id": "t2", "content": "Pay rent", "priority": 1, "project_id": "p1", "due": None},
+        ]
+        self.calls = []
+
+    def __getattr__(self, name):
+        async def method(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            # Like TodoistTools, name a known task in the result
+            task_id = kwargs.get("task_id", args[0] if args else None)
+            title = next((t["content"] for t in self.tasks if t["id"] == task_id), None)
+            return {"success": True, "content": title} if title else {"success": True}
+        return method
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """Route every OpenAIService completion to FakeChatCompletions"""
+    completions = FakeChatCompletions()
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(openai_service, "get_async_client", lambda: client)
+    cache = LLMResponseCache()
+    monkeypatch.setattr(openai_service, "get_llm_cache", lambda: cache)
+    return completions
+
+@pytest.fixture
+def fake_todoist(monkeypatch):
+    """Serve the workspace and agent tools from FakeTodoist"""
+    fake = FakeTodoist()
+
+    async def fetch_projects(self):
+        return list(fake.projects)
+
+    async def fetch_active_tasks(self):
+        return list(fake.tasks)
+
+    monkeypatch.setattr(tasks_module, "workspace_cache", WorkspaceCache(ttl=60))
+    monkeypatch.setattr(TodoistTools, "_fetch_projects", fetch_projects)
+    monkeypatch.setattr(TodoistTools, "_fetch_active_tasks", fetch_active_tasks)
+    monkeypatch.setattr(agent_tools, "todoist", fake)
+    return fake
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from app.agent.agent import Agent
+
+def test_workflow_compiled_once():
+    """Test that the compiled graph is shared across agent instances"""
+    workflow = Agent.get_workflow()
+    compiles = Agent.stats()["compiles"]
+
+    assert Agent().workflow is workflow
+    assert Agent.get_workflow() is workflow
+    assert Agent.stats()["compiles"] == compiles
+
+def test_workflow_reload_swaps_graph():
+    """Test that reloading replaces the shared graph"""
+    old_workflow = Agent.get_workflow()
+    compiles = Agent.stats()["compiles"]
+
+    new_workflow = Agent.reload()
+
+    assert new_workflow is not old_workflow
+    assert Agent.get_workflow() is new_workflow
+    assert Agent.stats()["compiles"] == compiles + 1
+
+@pytest.mark.asyncio
+async def test_single_shot_mode_plans_in_one_call(fake_llm, fake_todoist):
+    """Test that single-shot mode replaces understand and execute with one plan call"""
+    fake_llm.responses["plan"] = {
+        "_thinking": "Two actions",
+        "actions": [
+            {"tool_name": "create_todoist_task", "arguments": {"title": "Call mom"}},
+            {"tool_name": "complete_todoist_task", "arguments": {"task_id": "t1"}},
+        ]
+    }
+
+    result = await Agent.process("Add 'Call mom' and complete 'Buy milk'", mode="single_shot")
+
+    assert fake_llm.calls == ["plan"]
+    assert [call[0] for call in fake_todoist.calls] == ["create_task", "complete_task"]
+    assert result["usage"]["mode"] == "single_shot"
+    assert result["usage"]["fallback"] is False
+    assert result["usage"]["llm_calls"] == 1
+    assert result["usage"]["prompt_tokens"] > 0
+
+@pytest.mark.asyncio
+async def test_single_shot_falls_back_on_invalid_plan(fake_llm, fake_todoist):
+    """Test that a plan failing validation falls back to the multi-node path"""
+    fake_llm.responses["plan"] = {"actions": [{"tool_name": "create_todoist_task", "arguments": {"name": "x"}}]}
+    fake_llm.responses["understand"] = {"_thinking": "", "add": "Add 'Call mom'"}
+    fake_llm.responses["execute"] = [{"tool_name": "create_todoist_task", "arguments": {"title": "Call mom"}}]
+
+    result = await Agent.process("Add 'Call mom'", mode="single_shot")
+
+    assert fake_llm.calls == ["plan", "understand", "execute"]
+    assert [call[0] for call in fake_todoist.calls] == ["create_task"]
+    assert result["usage"]["fallback"] is True
+    assert Agent.stats()["modes"]["single_shot"]["fallbacks"] >= 1
+
+@pytest.mark.asyncio
+async def test_multi_node_mode_is_default(fake_llm, fake_todoist):
+    """Test that the default mode runs understand, execute and finalize"""
+    fake_llm.responses["understand"] = {"_thinking": "", "complete": "Complete 'Pay rent'"}
+    fake_llm.responses["execute"] = [{"tool_name": "complete_todoist_task", "arguments": {"task_id": "t2"}}]
+
+    result = await Agent.process("Complete 'Pay rent'", llm_summary=True)
+
+    assert fake_llm.calls == ["understand", "execute", "finalizer"]
+    assert result["usage"]["mode"] == "multi_node"
+    assert [call["name"] for call in result["usage"]["calls"]] == ["understand", "execute", "finalizer"]
+
+@pytest.mark.asyncio
+async def test_simple_outcome_skips_llm_finalizer(fake_llm, fake_todoist):
+    """Test that a successful single-tool outcome is summarized from a template"""
+    fake_llm.responses["understand"] = {"_thinking": "", "complete": "Complete 'Pay rent'"}
+    fake_llm.responses["execute"] = [{"tool_name": "complete_todoist_task", "arguments": {"task_id": "t2"}}]
+
+    result = await Agent.process("Complete 'Pay rent'")
+
+    assert fake_llm.calls == ["understand", "execute"]
+    assert 'Oznaczono zadanie "Pay rent" jako wykonane.' in result["final_response"]
+
+@pytest.mark.asyncio
+async def test_stream_emits_each_tool_result_when_it_finishes(fake_llm, fake_todoist, monkeypatch):
+    """Test that a tool result is streamed while later calls of the same node are still running, and only once"""
+    first_result = asyncio.Event()
+
+    async def get_active_tasks():
+        # Only finishes once the client has received the result of the create call
+        await asyncio.wait_for(first_result.wait(), 1)
+        return fake_todoist.tasks
+
+    monkeypatch.setattr(fake_todoist, "get_active_tasks", get_active_tasks, raising=False)
+    fake_llm.responses["plan"] = {
+        "_thinking": "Add, then list",
+        "actions": [
+            {"tool_name": "get_active_todoist_tasks", "arguments": {}},
+            {"tool_name": "create_todoist_task", "arguments": {"title": "Call mom"}},
+        ]
+    }
+
+    results = []
+    async for event in Agent.stream("Add 'Call mom' and list my tasks", mode="single_shot"):
+        if event["event"] == "tool_result":
+            results.append(event)
+            first_result.set()
+
+    assert [r["tool_call"]["step"]["tool_name"] for r in results] == ["create_todoist_task", "get_active_todoist_tasks"]
+    assert all("result" in r["tool_call"] and r["node"] == "plan" for r in results)
@@ -1,4 +1,5 @@
 import pytest
+import json
 from httpx import AsyncClient
 from app.__main__ import app
 
@@ -32,6 +33,13 @@ async def test_chat_endpoint_task_query(client):
     assert data["success"] is True
     assert "details" in data
 
+@pytest.mark.asyncio
+async def test_health(client):
+    """Test the liveness check"""
+    response = await client.get("/api/v1/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
 @pytest.mark.asyncio
 async def test_chat_endpoint_audio_not_implemented(client):
     """Test chat endpoint with audio input (not implemented)"""
@@ -55,4 +63,46 @@ async def test_chat_endpoint_invalid_request(client):
             "type": "invalid_type"
         }
     )
-    assert response.status_code == 422  # Validation error 
\ No newline at end of file
+    assert response.status_code == 422  # Validation error 
+@pytest.mark.asyncio
+async def test_chat_stream_emits_progress_events(client, fake_llm, fake_todoist):
+    """Test that the streaming endpoint emits understanding, tool results, tokens and the final report"""
+    fake_llm.responses["understand"] = {"_thinking": "", "add": "Add 'Call mom'"}
+    fake_llm.responses["execute"] = [{"tool_name": "create_todoist_task", "arguments": {"title": "Call mom"}}]
+    fake_llm.responses["finalizer"] = "**Podsumowanie**:\n- Utworzono zadanie \"Call mom\"."
+
+    response = await client.post(
+        "/api/v1/chat/stream",
+        json={"input": "Add 'Call mom'", "llm_summary": True}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    kinds = [event["event"] for event in events]
+    assert kinds[0] == "understanding"
+    assert kinds[1] == "tool_result"
+    assert kinds[-1] == "final"
+    assert set(kinds[2:-1]) == {"token"}
+    assert len(kinds[2:-1]) > 1
+    tokens = "".join(event["content"] for event in events if event["event"] == "token")
+    assert tokens == fake_llm.responses["finalizer"]
+    assert events[-1]["final_response"] == tokens
+    assert events[-1]["usage"]["llm_calls"] == 3
+
+@pytest.mark.asyncio
+async def test_chat_stream_server_sent_events(client, fake_llm, fake_todoist):
+    """Test that the streaming endpoint speaks SSE when asked to"""
+    fake_llm.responses["understand"] = {"_thinking": ""}
+
+    response = await client.post(
+        "/api/v1/chat/stream",
+        json={"input": "Hello"},
+        headers={"Accept": "text/event-stream"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    blocks = [block for block in response.text.split("\n\n") if block]
+    assert blocks[-1].startswith("event: final\ndata: ")
+    assert any(block.startswith("event: token\n") for block in blocks)
@@ -0,0 +1,80 @@
+import httpx
+import pytest
+from app.tools.todoist import tasks as tasks_module
+from app.tools.todoist.cache import WorkspaceCache
+from app.tools.todoist.fake_server import FakeTodoist, create_app
+from app.tools.todoist.sync import TodoistSyncClient, WorkspaceReplica
+from app.tools.todoist.tasks import TodoistTools
+
+TOKEN = "test-token"
+
+@pytest.fixture
+def fake():
+    return FakeTodoist()
+
+@pytest.fixture
+def todoist(monkeypatch, fake):
+    transport = httpx.ASGITransport(app=create_app(fake))
+    client = TodoistSyncClient(TOKEN, "http://fake/sync/v9", httpx.AsyncClient(transport=transport))
+    todoist = TodoistTools()
+    monkeypatch.setattr(tasks_module, "workspace_cache", WorkspaceCache(ttl=60))
+    monkeypatch.setattr(todoist.tenant, "replica", WorkspaceReplica(client))
+    return todoist
+
+@pytest.mark.asyncio
+async def test_bulk_create_sends_batches(fake, todoist):
+    """Test that 250 tasks are created with one request per 100 commands"""
+    result = await todoist.bulk_create([{"title": f"Task {i}"} for i in range(250)])
+
+    assert result["success"] is True
+    assert len(result["results"]) == 250
+    assert fake.requests == 3
+    items = fake.account(TOKEN).items
+    assert [items[r["task_id"]]["content"] for r in result["results"][:2]] == ["Task 0", "Task 1"]
+
+@pytest.mark.asyncio
+async def test_partial_failures_are_reported_per_item(fake, todoist):
+    """Test that unknown tasks fail on their own while the rest of the batch goes through"""
+    account = fake.account(TOKEN)
+    milk = account.add_task("Buy milk")
+    rent = account.add_task("Pay rent")
+
+    result = await todoist.bulk_complete([milk["id"], "missing", rent["id"]])
+
+    assert result["success"] is False
+    assert result["failed"] == 1
+    assert [r["success"] for r in result["results"]] == [True, False, True]
+    assert result["results"][1]["error"] == "Item not found"
+    assert milk["checked"] and rent["checked"]
+    assert fake.requests == 1
+
+@pytest.mark.asyncio
+async def test_bulk_update_and_delete_keep_workspace_cache_current(fake, todoist):
+    """Test that successful bulk changes are applied to the cached workspace"""
+    account = fake.account(TOKEN)
+    milk = account.add_task("Buy milk")
+    rent = account.add_task("Pay rent")
+    await TodoistTools.get_active_tasks()
+
+    updated = await todoist.bulk_update([{"task_id": milk["id"], "title": "Buy oat milk", "priority": 3}])
+    deleted = await todoist.bulk_delete([rent["id"]])
+    tasks = await TodoistTools.get_active_tasks()
+
+    assert updated["success"] and deleted["success"]
+    assert account.items[milk["id"]]["content"] == "Buy oat milk"
+    assert [(t["content"], t["priority"]) for t in tasks] == [("Buy oat milk", 3)]
+
+@pytest.mark.asyncio
+async def test_failed_request_fails_its_batch(monkeypatch, todoist):
+    """Test that a transport error is reported for every command of the batch"""
+    monkeypatch.setattr(tasks_module.settings, "TODOIST_SYNC_BATCH_SIZE", 2)
+
+    async def unavailable(*args, **kwargs):
+        raise httpx.ConnectError("unavailable")
+
+    monkeypatch.setattr(todoist.sync_client, "sync", unavailable)
+
+    result = await todoist.bulk_delete(["1", "2", "3"])
+
+    assert result["failed"] == 3
+    assert all(r["error"] == "unavailable" for r in result["results"])
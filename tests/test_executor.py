@@ -0,0 +1,187 @@
+import asyncio
+import json
+
+import pytest
+from app.agent import executor
+from app.agent.executor import execute_steps, execution_waves
+from app.agent.registry import ToolRegistry
+
+class FakeLLM:
+    """Returns a canned execution plan per step and records planning order"""
+
+    def __init__(self, plans: dict, delay: float = 0.05):
+        self.plans = plans
+        self.delay = delay
+        self.planned = []
+
+    async def completion(self, config):
+        step = config["messages"][1]["content"].removeprefix("User intent: ")
+        self.planned.append(step)
+        await asyncio.sleep(self.delay)
+        return json.dumps(self.plans[step])
+
+@pytest.fixture
+def tool_log(monkeypatch):
+    """Replace the agent tools with recording fakes"""
+    log = []
+
+    def fake_tool(name):
+        async def tool(**arguments):
+            log.append(("start", name, arguments.get("task_id") or arguments.get("title")))
+            await asyncio.sleep(0.05)
+            log.append(("end", name, arguments.get("task_id") or arguments.get("title")))
+            return {"success": True}
+        return tool
+
+    names = ["create_todoist_task", "complete_todoist_task", "update_todoist_task",
+             "delete_todoist_task", "get_active_todoist_tasks"]
+    registry = ToolRegistry()
+    for name in names:
+        registry.register(fake_tool(name), name=name)
+
+    async def execute_prompt(tool_descriptions, query=None, memory=""):
+        return "system"
+
+    monkeypatch.setattr(executor, "registry", registry)
+    monkeypatch.setattr(executor, "execute_prompt", execute_prompt)
+    return log
+
+def call(tool_name, **arguments):
+    return {"tool_name": tool_name, "arguments": arguments}
+
+def test_reads_wait_for_mutations():
+    """Test that list/get steps are scheduled after mutating steps"""
+    steps = ["add: Add 'milk'", "complete: Complete the rent task", "list: List all tasks"]
+    assert execution_waves(steps) == [[0, 1], [2]]
+
+def test_step_mentioning_new_task_waits_for_add():
+    """Test that a step referring to a task created in the same request waits for it"""
+    steps = ["add: Add 'Buy milk'", "update: Set priority of 'buy milk' to 4", "delete: Remove 'Dentist'"]
+    assert execution_waves(steps) == [[0, 2], [1]]
+
+@pytest.mark.asyncio
+async def test_independent_steps_run_concurrently(tool_log):
+    """Test that independent steps are planned and executed in parallel"""
+    steps = ["add: Add 'X'", "complete: Complete Y", "delete: Delete Z"]
+    llm = FakeLLM({
+        steps[0]: [call("create_todoist_task", title="X")],
+        steps[1]: [call("complete_todoist_task", task_id="1")],
+        steps[2]: call("delete_todoist_task", task_id="2"),
+    })
+
+    started = asyncio.get_running_loop().time()
+    tool_calls = await execute_steps(llm, steps)
+    elapsed = asyncio.get_running_loop().time() - started
+
+    assert elapsed < 0.25
+    assert [t["step"]["tool_name"] for t in tool_calls] == [
+        "create_todoist_task", "complete_todoist_task", "delete_todoist_task"
+    ]
+    assert [event for event, *_ in tool_log[:3]] == ["start", "start", "start"]
+
+@pytest.mark.asyncio
+async def test_actions_on_same_task_keep_order(tool_log):
+    """Test that an update and a completion of one task do not overlap"""
+    steps = ["update: Rename task 1", "complete: Complete task 1"]
+    llm = FakeLLM({
+        steps[0]: [call("update_todoist_task", task_id="1", title="New")],
+        steps[1]: [call("complete_todoist_task", task_id="1")],
+    })
+
+    await execute_steps(llm, steps)
+
+    assert tool_log == [
+        ("start", "update_todoist_task", "1"),
+        ("end", "update_todoist_task", "1"),
+        ("start", "complete_todoist_task", "1"),
+        ("end", "complete_todoist_task", "1"),
+    ]
+
+@pytest.mark.asyncio
+async def test_list_step_is_planned_after_mutations(tool_log):
+    """Test that a dependent step is planned only after earlier waves executed"""
+    steps = ["add: Add 'X'", "list: List all tasks"]
+    llm = FakeLLM({
+        steps[0]: [call("create_todoist_task", title="X")],
+        steps[1]: [call("get_active_todoist_tasks")],
+    })
+
+    await execute_steps(llm, steps)
+
+    assert llm.planned == steps
+    assert tool_log[1] == ("end", "create_todoist_task", "X")
+    assert tool_log[2][1] == "get_active_todoist_tasks"
+
+@pytest.mark.asyncio
+async def test_plan_errors_are_reported_per_step(tool_log):
+    """Test that an error plan is recorded and other steps still run"""
+    steps = ["delete: Remove 'Client meeting'", "add: Add 'X'"]
+    llm = FakeLLM({
+        steps[0]: {"error": True, "info": "No matching task"},
+        steps[1]: [call("create_todoist_task", title="X")],
+    })
+
+    tool_calls = await execute_steps(llm, steps)
+
+    assert tool_calls[0] == {"step": steps[0], "error": "No matching task"}
+    assert tool_calls[1]["result"] == {"success": True}
+
+@pytest.mark.asyncio
+async def test_native_tool_calling_mode(fake_llm, fake_todoist, monkeypatch):
+    """Test that native mode passes tool schemas instead of prose and runs the returned calls"""
+    from app.agent.agent import Agent
+    from app.core.config import get_settings
+    monkeypatch.setattr(get_settings(), "EXECUTE_TOOL_CALLING", "native")
+    fake_llm.responses["understand"] = {"_thinking": "", "complete": "Complete 'Buy milk'"}
+    fake_llm.responses["execute"] = [call("complete_todoist_task", task_id="t1")]
+    requests = []
+    create = fake_llm.create
+
+    async def record(**kwargs):
+        requests.append(kwargs)
+        return await create(**kwargs)
+
+    monkeypatch.setattr(fake_llm, "create", record)
+    plans = executor.execution_stats.plans["native"]
+
+    await Agent.process("Complete 'Buy milk'")
+
+    execute_request = requests[1]
+    assert [schema["function"]["name"] for schema in execute_request["tools"]][0] == "create_todoist_task"
+    assert "<tool_descriptions>" not in execute_request["messages"][0]["content"]
+    assert fake_todoist.calls == [("complete_task", ("t1",), {})]
+    assert executor.execution_stats.plans["native"] == plans + 1
+
+@pytest.mark.asyncio
+async def test_unparseable_plan_is_counted(tool_log):
+    """Test that a malformed JSON-mode answer counts as a parse failure"""
+    class BrokenLLM:
+        async def completion(self, config):
+            return "[{\"tool_name\": "
+
+    failures = executor.execution_stats.parse_failures["json"]
+
+    tool_calls = await execute_steps(BrokenLLM(), ["add: Add 'X'"])
+
+    assert "Could not plan step" in tool_calls[0]["error"]
+    assert executor.execution_stats.parse_failures["json"] == failures + 1
+    assert executor.execution_stats.stats()["json"]["parse_failure_rate"] > 0
+
+@pytest.mark.asyncio
+async def test_updates_of_one_task_are_coalesced(tool_log):
+    """Test that consecutive updates of a task become one call with merged fields"""
+    steps = ["update: Rename task 1", "update: Raise priority of task 1", "complete: Complete task 2"]
+    llm = FakeLLM({
+        steps[0]: [call("update_todoist_task", task_id="1", title="New"), call("update_todoist_task", task_id="1", title="Newer")],
+        steps[1]: [call("update_todoist_task", task_id="1", priority=4)],
+        steps[2]: [call("complete_todoist_task", task_id="2")],
+    })
+
+    tool_calls = await execute_steps(llm, steps)
+
+    assert [entry for entry in tool_log if entry[1] == "update_todoist_task"] == [
+        ("start", "update_todoist_task", "1"),
+        ("end", "update_todoist_task", "1"),
+    ]
+    assert len(tool_calls) == 4
+    assert all(t["result"] == {"success": True} for t in tool_calls)
@@ -0,0 +1,52 @@
+import pytest
+from app.agent.finalizer import FinalizerStats, render_summary
+
+def call(tool_name, result, **arguments):
+    return {"step": {"tool_name": tool_name, "arguments": arguments}, "result": result}
+
+def test_all_successes_use_template():
+    """Test that successful outcomes are rendered without the LLM"""
+    summary = render_summary([
+        call("create_todoist_task", {"success": True, "task_id": "1", "content": "Buy milk"}, title="Buy milk"),
+        call("complete_todoist_task", {"success": True, "content": "Pay rent"}, task_id="2"),
+    ])
+
+    assert summary.startswith("**Podsumowanie**:")
+    assert 'Utworzono zadanie "Buy milk".' in summary
+    assert 'Oznaczono zadanie "Pay rent" jako wykonane.' in summary
+
+def test_listing_renders_tasks():
+    """Test that a single listing result is rendered task by task"""
+    summary = render_summary([
+        call("get_active_todoist_tasks", [{"content": "Buy milk", "due": "2026-10-19"}, {"content": "Pay rent"}])
+    ])
+
+    assert "Zadania (2):" in summary
+    assert "Buy milk (termin: 2026-10-19)" in summary
+
+def test_empty_plan_uses_template():
+    """Test that an empty plan is summarized without the LLM"""
+    assert "Nie było potrzeby" in render_summary([])
+
+@pytest.mark.parametrize("tool_calls", [
+    [{"step": "delete: Remove 'x'", "error": "No matching task"}],
+    [call("create_todoist_task", {"success": True, "content": "a"}), call("delete_todoist_task", {"success": False, "error": "404"})],
+    [call("unknown_tool", {"success": True})],
+    [call("get_active_todoist_tasks", {"success": False, "error": "Todoist rate limit reached"})],
+    [call("complete_todoist_task", {"success": True}, task_id="8829612968")],
+])
+def test_errors_and_mixed_outcomes_need_llm(tool_calls):
+    """Test that errors, failed results, unknown tools and unnamed tasks fall back to the LLM"""
+    assert render_summary(tool_calls) is None
+
+def test_stats_report_saved_latency():
+    """Test that saved latency is the difference between LLM and fast path percentiles"""
+    stats = FinalizerStats()
+    for _ in range(3):
+        stats.record_fast_path(0.001)
+    stats.record_llm(1.001)
+
+    report = stats.stats()
+
+    assert report["fast_path_ratio"] == 0.75
+    assert report["saved_p50_ms"] == pytest.approx(1000)
@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import requests
+from app.tools.todoist.governor import MUTATION, READ, RateGovernor, TodoistRateLimited
+
+def http_error(status: int, retry_after: str = None) -> requests.HTTPError:
+    headers = {"Retry-After": retry_after} if retry_after else {}
+    return requests.HTTPError(f"{status} error", response=SimpleNamespace(status_code=status, headers=headers))
+
+class Flaky:
+    """Fails with the given errors first, then succeeds"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.attempts = 0
+
+    async def __call__(self):
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+@pytest.mark.asyncio
+async def test_bucket_limits_rate_after_burst():
+    """Test that calls beyond the burst wait for tokens to refill"""
+    governor = RateGovernor(rate=20, burst=2)
+
+    started = asyncio.get_running_loop().time()
+    await asyncio.gather(*(governor.acquire() for _ in range(4)))
+    elapsed = asyncio.get_running_loop().time() - started
+
+    assert 0.08 <= elapsed < 0.3
+    assert governor.stats["queue_wait"]["mutation"]["count"] == 4
+    assert governor.stats["queue_wait"]["mutation"]["max_ms"] >= 80
+
+@pytest.mark.asyncio
+async def test_mutations_are_served_before_reads():
+    """Test that queued mutations overtake reads that arrived earlier"""
+    governor = RateGovernor(rate=50, burst=1)
+    await governor.acquire()
+    order = []
+
+    async def queued(priority, name):
+        await governor.acquire(priority)
+        order.append(name)
+
+    reads = [asyncio.create_task(queued(READ, f"read-{i}")) for i in range(2)]
+    await asyncio.sleep(0)
+    mutation = asyncio.create_task(queued(MUTATION, "mutation"))
+    await asyncio.gather(*reads, mutation)
+
+    assert order == ["mutation", "read-0", "read-1"]
+
+@pytest.mark.asyncio
+async def test_429_pauses_and_retries_after_retry_after():
+    """Test that a throttled call waits for Retry-After and then succeeds"""
+    governor = RateGovernor(rate=100, burst=10, base_delay=0.01)
+    request = Flaky(http_error(429, retry_after="0.1"))
+
+    started = asyncio.get_running_loop().time()
+    result = await governor.call("get_tasks", request, priority=READ)
+    elapsed = asyncio.get_running_loop().time() - started
+
+    assert result == "ok"
+    assert request.attempts == 2
+    assert elapsed >= 0.1
+    assert governor.counters == {"requests": 2, "throttled": 1, "retries": 1, "failures": 0}
+
+@pytest.mark.asyncio
+async def test_persistent_throttling_raises_rate_limited():
+    """Test that the limit surfaces as TodoistRateLimited once retries run out"""
+    governor = RateGovernor(rate=100, burst=10, max_retries=1, base_delay=0.01)
+
+    with pytest.raises(TodoistRateLimited):
+        await governor.call("add_task", Flaky(http_error(429), http_error(429)))
+
+    assert governor.counters["failures"] == 1
+
+@pytest.mark.asyncio
+async def test_server_errors_retry_reads_but_not_mutations():
+    """Test that a 5xx is retried for a read and reported at once for a mutation"""
+    governor = RateGovernor(rate=100, burst=10, base_delay=0.01)
+    read = Flaky(http_error(503))
+    mutation = Flaky(http_error(503))
+
+    assert await governor.call("get_tasks", read, priority=READ) == "ok"
+    with pytest.raises(requests.HTTPError):
+        await governor.call("add_task", mutation, priority=MUTATION)
+
+    assert (read.attempts, mutation.attempts) == (2, 1)
@@ -0,0 +1,194 @@
+import asyncio
+
+import pytest
+from app.agent import agent as agent_module
+from app.agent.jobs import InMemoryJobQueue, Job, JobQueueFull, JobRunner, SQLiteJobQueue
+from app.api import endpoints
+
+def job(id, tenant):
+    return Job(id=id, tenant=tenant, request={"input": id})
+
+@pytest.fixture(params=["memory", "sqlite"])
+def queue(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryJobQueue(max_queued=10, max_queued_per_tenant=3, result_ttl=60)
+    return SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"), max_queued=10, max_queued_per_tenant=3, result_ttl=60)
+
+@pytest.mark.asyncio
+async def test_claim_is_fair_across_tenants(queue):
+    """Test that tenants take turns and a tenant at its running limit is skipped"""
+    for id, tenant in [("a1", "a"), ("a2", "a"), ("a3", "a"), ("b1", "b")]:
+        await queue.put(job(id, tenant))
+        await asyncio.sleep(0.001)
+
+    first = await queue.claim(max_per_tenant=1)
+    second = await queue.claim(max_per_tenant=1)
+    assert (first.id, second.id) == ("a1", "b1")
+    assert await queue.claim(max_per_tenant=1) is None
+
+    first.status, first.result, first.finished_at = "succeeded", {"response": "ok"}, 1e12
+    await queue.finish(first)
+    assert (await queue.claim(max_per_tenant=1)).id == "a2"
+    assert (await queue.get("a1")).result == {"response": "ok"}
+    assert (await queue.stats())["queued"] == 1
+
+@pytest.mark.asyncio
+async def test_queue_limits(queue):
+    """Test that a tenant cannot queue more than its share"""
+    for i in range(3):
+        await queue.put(job(f"a{i}", "a"))
+    with pytest.raises(JobQueueFull):
+        await queue.put(job("a3", "a"))
+    await queue.put(job("b0", "b"))
+
+@pytest.mark.asyncio
+async def test_sqlite_workers_never_share_a_job(tmp_path):
+    """Test that two processes' queues on one database claim different jobs"""
+    path = str(tmp_path / "jobs.sqlite3")
+    api, worker = (SQLiteJobQueue(path, 10, 10, 60) for _ in range(2))
+    await api.put(job("a1", "a"))
+    await api.put(job("a2", "a"))
+
+    claimed = await asyncio.gather(api.claim(5), worker.claim(5), worker.claim(5))
+
+    assert sorted(j.id for j in claimed if j) == ["a1", "a2"]
+
+@pytest.mark.asyncio
+async def test_runner_limits_each_tenant(monkeypatch):
+    """Test that a busy tenant runs one job at a time while others get the free workers"""
+    running, peak, order = {}, {}, []
+
+    async def process(input, **kwargs):
+        tenant = input[0]
+        running[tenant] = running.get(tenant, 0) + 1
+        peak[tenant] = max(peak.get(tenant, 0), running[tenant])
+        await asyncio.sleep(0.02)
+        running[tenant] -= 1
+        order.append(input)
+        return {"response": input}
+
+    monkeypatch.setattr(agent_module.Agent, "process", process)
+    runner = JobRunner(InMemoryJobQueue(10, 10, 60), workers=3, max_per_tenant=1, poll_interval=0.01)
+    jobs = [await runner.submit({"input": id}, tenant=id[0]) for id in ("a1", "a2", "a3", "b1")]
+
+    done = await asyncio.gather(*(runner.wait(j.id, timeout=2) for j in jobs))
+    stats = await runner.stats()
+    await runner.stop()
+
+    assert [j.status for j in done] == ["succeeded"] * 4
+    assert peak == {"a": 1, "b": 1}
+    assert order.index("b1") < order.index("a2")
+    assert (stats["succeeded"], stats["queued"], stats["running"]) == (4, 0, 0)
+
+@pytest.mark.asyncio
+async def test_chat_job_endpoints(client, fake_llm, fake_todoist, monkeypatch):
+    """Test submitting a chat job and long-polling for its result"""
+    runner = JobRunner(InMemoryJobQueue(10, 10, 60), workers=1, poll_interval=0.01)
+    monkeypatch.setattr(endpoints, "get_job_runner", lambda: runner)
+    fake_llm.responses["understand"] = {"_thinking": "", "complete": "Complete 'Buy milk'"}
+    fake_llm.responses["execute"] = [{"tool_name": "complete_todoist_task", "arguments": {"task_id": "t1"}}]
+
+    submitted = await client.post("/api/v1/chat/jobs", json={"input": "Buy milk is done", "todoist_token": "secret"})
+    job_id = submitted.json()["job_id"]
+    result = await client.get(f"/api/v1/chat/jobs/{job_id}", params={"wait": 5})
+    missing = await client.get("/api/v1/chat/jobs/unknown")
+    await runner.stop()
+
+    assert submitted.status_code == 202
+    assert submitted.json()["status"] == "queued"
+    assert result.json()["status"] == "succeeded"
+    assert result.json()["result"]["tool_calls"][0]["result"] == {"success": True, "content": "Buy milk"}
+    assert "secret" not in result.text
+    assert missing.status_code == 404
+
+@pytest.mark.asyncio
+async def test_drain_finishes_running_jobs_and_leaves_queued_ones(monkeypatch):
+    """Test that draining lets a running job finish and claims nothing new"""
+    async def process(input, **kwargs):
+        await asyncio.sleep(0.05)
+        return {"response": input}
+
+    monkeypatch.setattr(agent_module.Agent, "process", process)
+    runner = JobRunner(InMemoryJobQueue(10, 10, 60), workers=1, poll_interval=0.01)
+    first = await runner.submit({"input": "a1"}, tenant="a")
+    await asyncio.sleep(0.01)
+    second = await runner.submit({"input": "b1"}, tenant="b")
+
+    await runner.drain(timeout=1)
+
+    assert (await runner.queue.get(first.id)).status == "succeeded"
+    assert (await runner.queue.get(second.id)).status == "queued"
+    assert not runner._tasks
+
+@pytest.mark.asyncio
+async def test_cancelled_job_does_not_block_its_tenant(monkeypatch, tmp_path):
+    """Test that a job cancelled by a drain is failed with its token dropped, and the tenant can claim again"""
+    async def process(input, **kwargs):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(agent_module.Agent, "process", process)
+    path = str(tmp_path / "jobs.sqlite3")
+    runner = JobRunner(SQLiteJobQueue(path, 10, 10, 60), workers=1, poll_interval=0.01)
+    running = await runner.submit({"input": "a1"}, tenant="a", token="secret")
+    await asyncio.sleep(0.1)
+
+    await runner.drain(timeout=0.05)
+    restarted = SQLiteJobQueue(path, 10, 10, 60)
+    await restarted.put(Job(id="a2", tenant="a", request={"input": "a2"}))
+
+    interrupted = await restarted.get(running.id)
+    assert (interrupted.status, interrupted.token) == ("failed", None)
+    assert (await restarted.claim(max_per_tenant=1)).id == "a2"
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_recovered(tmp_path):
+    """Test that a running job whose worker stopped renewing its lease no longer counts against the tenant"""
+    path = str(tmp_path / "jobs.sqlite3")
+    crashed = SQLiteJobQueue(path, 10, 10, 60, lease=0.05)
+    await crashed.put(Job(id="a1", tenant="a", request={"input": "a1"}, token="secret"))
+    await crashed.put(job("a2", "a"))
+    assert (await crashed.claim(max_per_tenant=1)).id == "a1"
+    assert await crashed.claim(max_per_tenant=1) is None
+
+    await asyncio.sleep(0.1)
+    restarted = SQLiteJobQueue(path, 10, 10, 60)
+
+    stale = await restarted.get("a1")
+    assert (stale.status, stale.token) == ("failed", None)
+    assert (await restarted.claim(max_per_tenant=1)).id == "a2"
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_a_long_job_claimed(monkeypatch, tmp_path):
+    """Test that a job running longer than its lease is renewed instead of recovered"""
+    async def process(input, **kwargs):
+        await asyncio.sleep(0.3)
+        return {"response": input}
+
+    monkeypatch.setattr(agent_module.Agent, "process", process)
+    path = str(tmp_path / "jobs.sqlite3")
+    runner = JobRunner(SQLiteJobQueue(path, 10, 10, 60, lease=0.1), workers=1, poll_interval=0.01)
+    submitted = await runner.submit({"input": "a1"}, tenant="a")
+    await asyncio.sleep(0.2)
+
+    other_worker = SQLiteJobQueue(path, 10, 10, 60)
+    await other_worker.claim(max_per_tenant=1)
+    assert (await other_worker.get(submitted.id)).status == "running"
+    done = await runner.wait(submitted.id, timeout=2)
+    await runner.stop()
+
+    assert done.status == "succeeded"
+
+def test_memory_queue_is_refused_under_server_workers(monkeypatch, tmp_path):
+    """Test that several server workers cannot each get their own in-memory queue"""
+    from app.agent.jobs import get_job_runner
+    from app.core import metrics
+    from app.core.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "JOBS_BACKEND", "memory")
+    monkeypatch.setattr(metrics, "multiprocess_dir", str(tmp_path))
+    get_job_runner.cache_clear()
+    try:
+        with pytest.raises(RuntimeError, match="JOBS_BACKEND=sqlite"):
+            get_job_runner()
+    finally:
+        get_job_runner.cache_clear()
@@ -0,0 +1,71 @@
+import pytest
+from app.agent.agent import Agent
+from app.agent.llm_cache import DiskTier, LLMResponseCache, cache_key
+from app.tools.todoist import tasks as tasks_module
+from app.tools.todoist.tasks import TodoistTools
+
+def messages(content: str) -> list:
+    return [{"role": "system", "content": "You are a planner"}, {"role": "user", "content": content}]
+
+def test_cache_key_normalizes_whitespace_and_includes_version():
+    """Test that keys ignore formatting but never span workspace versions"""
+    key = cache_key("gpt-4o", messages("list  tasks\n"), True, 1)
+
+    assert key == cache_key("gpt-4o", messages("list tasks"), True, 1)
+    assert key != cache_key("gpt-4o", messages("list tasks"), True, 2)
+    assert key != cache_key("gpt-4o", messages("list tasks"), False, 1)
+
+@pytest.mark.asyncio
+async def test_memory_tier_evicts_least_recently_used():
+    """Test the LRU order and hit-rate accounting of the memory tier"""
+    cache = LLMResponseCache(max_entries=2)
+    await cache.put("a", "1")
+    await cache.put("b", "2")
+    assert await cache.get("a") == "1"
+    await cache.put("c", "3")
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "1"
+    assert cache.stats["evictions"] == 1
+    assert cache.stats["hit_rate"] == pytest.approx(2 / 3)
+
+@pytest.mark.asyncio
+async def test_disk_tier_persists_and_evicts_by_size(tmp_path):
+    """Test that disk entries survive a restart and the tier stays under its size budget"""
+    cache = LLMResponseCache(max_entries=1, disk=DiskTier(str(tmp_path), max_bytes=200))
+    for i in range(5):
+        await cache.put(f"key{i}", "x" * 50)
+
+    disk = DiskTier(str(tmp_path), max_bytes=200)
+    assert disk.size <= 200
+    assert disk.evictions == 0 and cache.stats["disk_evictions"] > 0
+
+    restarted = LLMResponseCache(max_entries=1, disk=disk)
+    assert await restarted.get("key4") == "x" * 50
+    assert await restarted.get("key0") is None
+    assert restarted.stats["disk_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_repeated_query_is_served_from_cache(fake_llm, fake_todoist):
+    """Test that the same query against the same workspace skips the LLM"""
+    fake_llm.responses["understand"] = {"_thinking": "", "list": "List active tasks"}
+    fake_llm.responses["execute"] = [{"tool_name": "get_active_todoist_tasks", "arguments": {}}]
+
+    await Agent.process("What is due today?", llm_summary=True)
+    result = await Agent.process("What is due today?", llm_summary=True)
+
+    assert fake_llm.calls == ["understand", "execute", "finalizer", "finalizer"]
+    assert result["usage"]["llm_calls"] == 1
+
+@pytest.mark.asyncio
+async def test_changed_workspace_is_not_served_from_cache(fake_llm, fake_todoist):
+    """Test that a cached plan is not replayed after the workspace changed"""
+    fake_llm.responses["understand"] = {"_thinking": "", "complete": "Complete 'Buy milk'"}
+    fake_llm.responses["execute"] = [{"tool_name": "complete_todoist_task", "arguments": {"task_id": "t1"}}]
+
+    await Agent.process("Complete 'Buy milk'")
+    tasks_module.workspace_cache.add_task(TodoistTools().user_key, {"id": "t1", "content": "Buy milk"})
+    await Agent.process("Complete 'Buy milk'")
+
+    assert fake_llm.calls == ["understand", "execute", "understand", "execute"]
+    assert [call[0] for call in fake_todoist.calls] == ["complete_task", "complete_task"]
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+
+from app.core.logging import LogSampler, _patch, clip
+
+class CountingRepr:
+    """Object that records how often it is rendered"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __repr__(self):
+        self.calls += 1
+        return "x" * 1000
+
+def record(name, level=20, message=""):
+    return {"name": name, "level": SimpleNamespace(no=level), "message": message, "extra": {}}
+
+def test_clip_renders_lazily_and_truncates():
+    """Test that a clipped value is rendered only when formatted, and cut to the limit"""
+    value = CountingRepr()
+    clipped = clip(value, limit=50)
+    assert value.calls == 0
+
+    text = f"{clipped}"
+
+    assert value.calls == 1
+    assert text.startswith("x" * 50 + "…")
+    assert len(text) < 100
+
+def test_clip_abbreviates_large_containers():
+    """Test that long lists are abbreviated while rendering"""
+    text = str(clip([{"id": i} for i in range(500)], limit=10_000))
+
+    assert "..." in text
+    assert "'id': 499" not in text
+
+def test_sampler_uses_longest_prefix():
+    """Test that the most specific logger prefix decides the rate"""
+    sampler = LogSampler({"app": 1.0, "app.agent": 0.0, "app.agent.nodes": 0.5}, seed=1)
+
+    assert sampler.rate("app.api.endpoints") == 1.0
+    assert sampler.rate("app.agent.executor") == 0.0
+    assert sampler.rate("app.agent.nodes") == 0.5
+    assert sampler.rate("app.agentx") == 1.0
+    assert sampler.rate("httpx") == 1.0
+
+def test_sampler_keeps_roughly_its_rate_and_all_warnings():
+    """Test that INFO records are sampled while warnings always pass"""
+    sampler = LogSampler({"app.agent": 0.1}, seed=42)
+
+    kept = sum(sampler.keep(record("app.agent.nodes")) for _ in range(2000))
+    warnings = [sampler.keep(record("app.agent.nodes", level=30)) for _ in range(50)]
+
+    assert 120 < kept < 280
+    assert all(warnings)
+    assert sampler.stats["kept"] + sampler.stats["dropped"] == 2000
+
+def test_patch_truncates_long_messages():
+    """Test that messages over the cap are cut and marked with their length"""
+    long = record("app.agent.agent", message="y" * 5000)
+    short = record("app.agent.agent", message="ok")
+
+    _patch(long, max_chars=100)
+    _patch(short, max_chars=100)
+
+    assert long["message"] == "y" * 100 + "… (5000 chars)"
+    assert short["message"] == "ok"
+    assert long["extra"]["sampled"] is True
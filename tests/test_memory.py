@@ -0,0 +1,87 @@
+import pytest
+from app.agent import agent as agent_module
+from app.agent.agent import Agent
+from app.agent.memory import ConversationMemory, ConversationStore, InMemoryBackend, SQLiteBackend
+
+def complete(task_id):
+    return {"step": {"tool_name": "complete_todoist_task", "arguments": {"task_id": task_id}}, "result": {"success": True}}
+
+def test_memory_is_bounded():
+    """Test that turns, referenced tasks and long inputs are all capped"""
+    memory = ConversationMemory(key="k", max_turns=2, max_tasks=3)
+    for i in range(5):
+        memory.record(f"Complete task {i} " + "x" * 500, [complete(f"t{i}")])
+
+    assert len(memory.turns) == 2
+    assert list(memory.tasks) == ["t2", "t3", "t4"]
+    assert len(memory.turns[-1]["input"]) == 200
+    assert "complete_todoist_task(t4): ok" in memory.render()
+
+def test_listed_tasks_are_remembered_with_their_content():
+    """Test that listing results make their IDs and titles available to follow-ups"""
+    memory = ConversationMemory(key="k")
+    listed = [{"id": "t1", "content": "Buy milk"}, {"id": "t2", "content": "Pay rent"}]
+    memory.record("What is due?", [{"step": {"tool_name": "get_active_todoist_tasks", "arguments": {}}, "result": listed}])
+
+    rendered = memory.render()
+    assert "get_active_todoist_tasks: 2 tasks" in rendered
+    assert '{"id": "t2", "content": "Pay rent"}' in rendered
+    assert ConversationMemory(key="k").render() == ""
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_store_round_trip_and_eviction(backend, tmp_path):
+    """Test that both backends restore a conversation and evict the least recently used one"""
+    backend = InMemoryBackend(2) if backend == "memory" else SQLiteBackend(str(tmp_path / "memory.sqlite3"), 2)
+    store = ConversationStore(backend)
+    for key in ("a", "b"):
+        memory = await store.load(key)
+        memory.record(f"input {key}", [complete(key)])
+        await store.save(memory)
+    await store.load("a")
+    await store.save(await store.load("c"))
+
+    assert list((await store.load("a")).tasks) == ["a"]
+    assert not (await store.load("b")).turns
+    assert store.stats["sessions"] == 2
+    assert store.stats["evictions"] == 1
+
+@pytest.mark.asyncio
+async def test_follow_up_sees_previous_turn(fake_llm, fake_todoist, monkeypatch):
+    """Test that a second request in the same conversation gets the memory block, and others do not"""
+    store = ConversationStore(InMemoryBackend(10))
+    monkeypatch.setattr(agent_module, "get_memory_store", lambda: store)
+    prompts = []
+
+    def understand(messages):
+        prompts.append(messages[0]["content"])
+        return {"_thinking": "", "complete": "Complete 'Buy milk'"}
+
+    fake_llm.responses["understand"] = understand
+    fake_llm.responses["execute"] = [{"tool_name": "complete_todoist_task", "arguments": {"task_id": "t1"}}]
+
+    await Agent.process("Mark buy milk as done", conversation_id="c1")
+    result = await Agent.process("Actually, complete it again", conversation_id="c1")
+    await Agent.process("Mark buy milk as done, please", conversation_id="c2")
+
+    assert "<conversation_memory>" not in prompts[0]
+    assert '"Mark buy milk as done" -> complete_todoist_task(t1): ok' in prompts[1]
+    assert '{"id": "t1"' in prompts[1]
+    assert "<conversation_memory>" not in prompts[2]
+    assert "memory" not in result
+    assert len((await store.load(next(iter(store.backend._sessions)))).turns) == 2
+
+def test_memory_store_is_refused_under_server_workers(monkeypatch, tmp_path):
+    """Test that several server workers cannot each keep conversations to themselves"""
+    from app.agent.memory import get_memory_store
+    from app.core import metrics
+    from app.core.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "MEMORY_BACKEND", "memory")
+    monkeypatch.setattr(metrics, "multiprocess_dir", str(tmp_path))
+    get_memory_store.cache_clear()
+    try:
+        with pytest.raises(RuntimeError, match="MEMORY_BACKEND"):
+            get_memory_store()
+    finally:
+        get_memory_store.cache_clear()
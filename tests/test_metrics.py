@@ -0,0 +1,116 @@
+import json
+import os
+
+import pytest
+from app.core.metrics import MetricsRegistry, add_span, collect_spans, summarize_spans, timed
+from app.tools.todoist.governor import RateGovernor
+
+def test_histogram_renders_cumulative_buckets():
+    """Test the Prometheus text format of a labelled histogram and counter"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("op_seconds", "Op latency", ["op"], buckets=(0.1, 1.0))
+    counter = registry.counter("op_total", "Ops", ["op"])
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, 'say "hi"')
+    counter.inc(3, "a")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE op_seconds histogram" in lines
+    assert 'op_seconds_bucket{op="say \\"hi\\"",le="0.1"} 1' in lines
+    assert 'op_seconds_bucket{op="say \\"hi\\"",le="1"} 2' in lines
+    assert 'op_seconds_bucket{op="say \\"hi\\"",le="+Inf"} 3' in lines
+    assert 'op_seconds_sum{op="say \\"hi\\""} 5.55' in lines
+    assert 'op_seconds_count{op="say \\"hi\\""} 3' in lines
+    assert 'op_total{op="a"} 3' in lines
+
+@pytest.mark.asyncio
+async def test_timed_adds_spans_only_while_collecting():
+    """Test that a timed coroutine is always observed but only becomes a span inside collect_spans"""
+    histogram = MetricsRegistry().histogram("step_seconds", "Step", ["step"])
+
+    @timed(histogram, "node")
+    async def step():
+        return "done"
+
+    await step()
+    with collect_spans() as spans:
+        assert await step() == "done"
+        add_span("llm", "understand", 0.25, prompt_tokens=10)
+
+    assert histogram.count("step") == 2
+    assert [(s["kind"], s["name"]) for s in spans] == [("node", "step"), ("llm", "understand")]
+    assert summarize_spans(spans)["total_ms"]["llm"] == 250.0
+
+@pytest.mark.asyncio
+async def test_governor_times_each_attempt():
+    """Test that every Todoist attempt is a span with its outcome"""
+    governor = RateGovernor(rate=100, burst=10, base_delay=0.001)
+    attempts = []
+
+    async def request():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("reset")
+        return "ok"
+
+    with collect_spans() as spans:
+        with pytest.raises(ConnectionError):
+            await governor.call("tasks", request)
+        await governor.call("tasks", request)
+
+    assert [(s["name"], s["outcome"]) for s in spans] == [("tasks", "error"), ("tasks", "ok")]
+
+@pytest.mark.asyncio
+async def test_debug_header_attaches_metrics(client, fake_llm, fake_todoist):
+    """Test that X-Debug-Metrics adds the per-request breakdown and /metrics exposes the totals"""
+    fake_llm.responses["understand"] = {"_thinking": "", "complete": "Complete 'Buy milk'"}
+    fake_llm.responses["execute"] = [{"tool_name": "complete_todoist_task", "arguments": {"task_id": "t1"}}]
+
+    plain = await client.post("/api/v1/chat", json={"input": "Buy milk is done", "mode": "multi_node"})
+    debug = await client.post(
+        "/api/v1/chat", json={"input": "Pay rent is done", "mode": "multi_node"}, headers={"X-Debug-Metrics": "1"}
+    )
+    streamed = await client.post(
+        "/api/v1/chat/stream", json={"input": "Buy milk is done", "mode": "multi_node"}, headers={"X-Debug-Metrics": "1"}
+    )
+    exposition = await client.get("/metrics")
+
+    assert "metrics" not in plain.json()["details"]
+    assert "Server-Timing" not in plain.headers
+    metrics = debug.json()["details"]["metrics"]
+    spans = {(s["kind"], s["name"]) for s in metrics["spans"]}
+    assert {("node", "understand"), ("node", "execute"), ("node", "finalize")} <= spans
+    assert ("prompt", "understand_prompt") in spans
+    llm = next(s for s in metrics["spans"] if s["kind"] == "llm" and s["name"] == "understand")
+    assert llm["prompt_tokens"] > 0 and llm["model"]
+    assert "node;dur=" in debug.headers["Server-Timing"]
+    final = json.loads(streamed.text.strip().splitlines()[-1])
+    assert final["event"] == "final" and final["metrics"]["total_ms"]["node"] > 0
+    assert exposition.status_code == 200
+    assert exposition.headers["content-type"].startswith("text/plain")
+    assert 'agent_node_duration_seconds_count{node="understand"}' in exposition.text
+    assert 'llm_tokens_total{name="understand"' in exposition.text
+
+def test_multiprocess_render_sums_all_workers(tmp_path, monkeypatch):
+    """Test that /metrics under the supervisor adds up the snapshots of every worker"""
+    from app.core import metrics
+
+    worker = MetricsRegistry()
+    worker.histogram("agent_node_duration_seconds", "Node", ["node"]).observe(0.02, "understand")
+    worker.counter("llm_tokens_total", "Tokens", ["name", "model", "type"]).inc(7, "understand", "m", "prompt")
+    (tmp_path / "stale.json").write_text("{}")
+    # Restored to a single process after the test
+    monkeypatch.setattr(metrics, "multiprocess_dir", None)
+    metrics.enable_multiprocess(str(tmp_path))
+    (tmp_path / "1.json").write_text(json.dumps(worker.dump()))
+    (tmp_path / "2.json").write_text("not json")
+
+    before = metrics.node_seconds.count("understand")
+    tokens = metrics.llm_tokens.value("understand", "m", "prompt")
+    lines = metrics.render_all().splitlines()
+
+    assert f'agent_node_duration_seconds_count{{node="understand"}} {before + 1}' in lines
+    assert f'llm_tokens_total{{name="understand",model="m",type="prompt"}} {int(tokens + 7)}' in lines
+    assert not (tmp_path / "stale.json").exists()
+    assert (tmp_path / f"{os.getpid()}.json").exists()
@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from app.agent.openai_service import OpenAIService, get_async_client
+from app.core.tracing import InMemorySink, TraceExporter
+
+class FakeCompletions:
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        message = SimpleNamespace(content=f"reply to {kwargs['messages'][0]['content']}")
+        usage = SimpleNamespace(prompt_tokens=3, completion_tokens=2, total_tokens=5)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+def fake_client(completions: FakeCompletions):
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+def user_message(content: str) -> dict:
+    return {"messages": [{"role": "user", "content": content}], "name": "test"}
+
+def test_async_client_is_shared():
+    """Test that services reuse one pooled client"""
+    assert OpenAIService().client is OpenAIService().client
+    assert OpenAIService().client is get_async_client()
+
+@pytest.mark.asyncio
+async def test_completions_run_concurrently():
+    """Test that completions do not block each other"""
+    completions = FakeCompletions(delay=0.1)
+    service = OpenAIService(client=fake_client(completions))
+
+    started = asyncio.get_running_loop().time()
+    replies = await asyncio.gather(
+        *(service.completion(user_message(f"call-{i}")) for i in range(5))
+    )
+    elapsed = asyncio.get_running_loop().time() - started
+
+    assert replies == [f"reply to call-{i}" for i in range(5)]
+    assert completions.max_in_flight == 5
+    assert elapsed < 0.4
+
+@pytest.mark.asyncio
+async def test_completion_is_traced_in_background():
+    """Test that each completion is handed to the trace exporter"""
+    sink = InMemorySink()
+    tracer = TraceExporter(sink, flush_interval=0.05)
+    service = OpenAIService(client=fake_client(FakeCompletions(delay=0)), tracer=tracer)
+
+    await service.completion(user_message("hello"))
+    tracer.shutdown()
+
+    assert len(sink.events) == 1
+    assert sink.events[0]["output"] == "reply to hello"
+    assert sink.events[0]["usage"] == {"input": 3, "output": 2, "total": 5}
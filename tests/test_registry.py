@@ -0,0 +1,68 @@
+from typing import Optional
+
+import pytest
+from pydantic import ValidationError
+from app.agent import executor
+from app.agent.registry import ToolRegistry, registry
+from app.agent.schema.response import ExecuteResponse
+
+def make_registry():
+    tools = ToolRegistry()
+    calls = []
+
+    @tools.register
+    async def rename_task(task_id: str, title: Optional[str] = None, priority: int = 1) -> dict:
+        """Rename a task.
+        Args:
+            task_id: The ID of the task
+            title: New title
+        """
+        calls.append((task_id, title, priority))
+        return {"success": True}
+
+    return tools, calls
+
+def test_registration_precomputes_description_and_schema():
+    """Test that the prose description and function-calling schema are built once"""
+    tools, _ = make_registry()
+    rename = tools.get("rename_task")
+
+    assert tools.descriptions == rename.description
+    assert rename.description.startswith("- rename_task: Rename a task.")
+    assert "Parameters: task_id: str, title: Optional (default: None), priority: int (default: 1)" in rename.description
+    function = rename.json_schema["function"]
+    assert function["description"] == "Rename a task."
+    assert function["parameters"]["required"] == ["task_id"]
+    assert function["parameters"]["properties"]["task_id"]["description"] == "The ID of the task"
+    assert tools.schemas == [rename.json_schema]
+
+def test_validation_coerces_and_rejects():
+    """Test that arguments are coerced to the annotated types and unknown ones are rejected"""
+    tools, _ = make_registry()
+    rename = tools.get("rename_task")
+
+    assert rename.validate({"task_id": "t1", "priority": "3"}) == {"task_id": "t1", "priority": 3}
+    with pytest.raises(ValidationError):
+        rename.validate({"task_id": "t1", "name": "x"})
+    with pytest.raises(ValidationError):
+        rename.validate({"title": "x"})
+
+def test_agent_tools_are_registered():
+    """Test that importing the agent tools fills the shared registry"""
+    import app.agent.tools  # noqa: F401
+
+    assert "create_todoist_task" in registry
+    assert "search_todoist_tasks" in registry
+    assert len(registry.schemas) == len(registry)
+
+@pytest.mark.asyncio
+async def test_invalid_arguments_are_reported_without_calling_the_tool(monkeypatch):
+    """Test that the executor reports argument errors instead of calling the tool"""
+    tools, calls = make_registry()
+    monkeypatch.setattr(executor, "registry", tools)
+    action = ExecuteResponse(tool_name="rename_task", arguments={"title": "x"})
+
+    results = await executor.execute_plan([action], "update: rename")
+
+    assert calls == []
+    assert "rename_task failed" in results[0]["error"]
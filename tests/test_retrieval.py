@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+from app.agent.prompts import workspace_context
+from app.agent.retrieval import score_tasks, select_tasks
+
+TODAY = date(2025, 3, 10)
+
+PROJECTS = [{"id": "p1", "name": "Inbox"}, {"id": "p2", "name": "Dom"}]
+
+def task(task_id: str, content: str, project_id: str = "p1", due: str = None) -> dict:
+    return {"id": task_id, "content": content, "project_id": project_id, "due": due, "labels": []}
+
+def line(t: dict) -> str:
+    return f'{t["id"]} {t["content"]}'
+
+def filler(count: int) -> list:
+    return [task(f"f{i}", f"Filler item number {i}") for i in range(count)]
+
+def test_small_workspace_is_not_filtered():
+    """Test that a workspace within the budget is passed through unchanged"""
+    tasks = filler(5)
+
+    assert select_tasks("anything", tasks, PROJECTS, 10, 1000, line, TODAY) == tasks
+
+def test_lexical_and_fuzzy_matches_rank_first():
+    """Test that exact and inflected word matches beat unrelated tasks"""
+    tasks = filler(50) + [task("t1", "Kupić mleko"), task("t2", "Zrobić zakupy w sklepie")]
+
+    selected = select_tasks("dodaj mleko do zakupów", tasks, PROJECTS, 2, 1000, line, TODAY)
+
+    assert {t["id"] for t in selected} == {"t1", "t2"}
+
+def test_project_and_due_window_signals():
+    """Test that a named project and a due-date window raise a task's score"""
+    tasks = [
+        task("t1", "Umyć okna", project_id="p2"),
+        task("t2", "Umyć samochód"),
+        task("t3", "Odebrać paczkę", due="2025-03-11"),
+        task("t4", "Odebrać list", due="2025-03-20"),
+    ]
+
+    scores = score_tasks("co mam jutro w projekcie dom", tasks, PROJECTS, TODAY)
+
+    assert scores[0] > scores[1]
+    assert scores[2] > scores[3]
+
+def test_selection_respects_token_budget_and_keeps_order():
+    """Test that selection stops at the token budget and keeps the original order"""
+    tasks = [task(f"t{i}", f"Report section {i}") for i in range(20)]
+
+    selected = select_tasks("report", tasks, PROJECTS, 20, 20, line, TODAY)
+
+    assert 0 < len(selected) < 20
+    assert sum(len(line(t)) // 4 + 1 for t in selected) <= 20
+    assert selected == sorted(selected, key=lambda t: int(t["id"][1:]))
+
+@pytest.mark.asyncio
+async def test_workspace_context_reports_left_out_tasks(fake_todoist, monkeypatch):
+    """Test that the prompt context holds only the budgeted tasks and says how many were skipped"""
+    from app.core.config import get_settings
+    monkeypatch.setattr(get_settings(), "CONTEXT_MAX_TASKS", 3)
+    fake_todoist.tasks = filler(100) + [task("t1", "Buy milk")]
+
+    _, tasks_str = await workspace_context("buy milk")
+
+    assert '"id": "t1"' in tasks_str
+    assert len(tasks_str.splitlines()) == 4
+    assert "showing 3 of 101 active tasks" in tasks_str
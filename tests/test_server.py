@@ -0,0 +1,16 @@
+import pytest
+from app import server
+from app.core.config import get_settings
+
+def test_several_workers_need_shared_jobs_and_memory(monkeypatch):
+    """Test that the server refuses to fork workers that would keep jobs and memory to themselves"""
+    monkeypatch.setattr(get_settings(), "JOBS_BACKEND", "memory")
+    monkeypatch.setattr(get_settings(), "MEMORY_BACKEND", "memory")
+    monkeypatch.setattr(server, "preload", lambda: pytest.fail("preloaded despite unshared state"))
+
+    with pytest.raises(SystemExit):
+        server.main(["--workers", "2"])
+
+    monkeypatch.setattr(get_settings(), "JOBS_BACKEND", "sqlite")
+    monkeypatch.setattr(get_settings(), "MEMORY_BACKEND", "none")
+    assert server.shared_state_problems(get_settings()) == []
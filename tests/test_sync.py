@@ -0,0 +1,82 @@
+import asyncio
+
+import httpx
+import pytest
+from app.tools.todoist import tasks as tasks_module
+from app.tools.todoist.cache import WorkspaceCache
+from app.tools.todoist.fake_server import FakeTodoist, create_app
+from app.tools.todoist.sync import TodoistSyncClient, WorkspaceReplica
+from app.tools.todoist.tasks import TodoistTools
+
+TOKEN = "test-token"
+
+@pytest.fixture
+def fake():
+    return FakeTodoist()
+
+@pytest.fixture
+def replica(fake):
+    transport = httpx.ASGITransport(app=create_app(fake))
+    client = httpx.AsyncClient(transport=transport)
+    return WorkspaceReplica(TodoistSyncClient(TOKEN, "http://fake/sync/v9", client))
+
+@pytest.mark.asyncio
+async def test_full_then_incremental_sync(fake, replica):
+    """Test that only changes since the last sync token are applied"""
+    account = fake.account(TOKEN)
+    inbox = account.add_project("Inbox")
+    milk = account.add_task("Buy milk", project_id=inbox["id"], due="2026-10-19")
+    rent = account.add_task("Pay rent", project_id=inbox["id"])
+
+    tasks = await replica.get_active_tasks()
+    assert sorted(t["content"] for t in tasks) == ["Buy milk", "Pay rent"]
+    assert replica.stats["full_syncs"] == 1
+
+    account.complete_task(milk["id"])
+    account.update_task(rent["id"], content="Pay the rent")
+    account.add_task("Call mom", project_id=inbox["id"])
+    changes = replica.stats["changes_applied"]
+
+    tasks = await replica.get_active_tasks()
+    assert sorted(t["content"] for t in tasks) == ["Call mom", "Pay the rent"]
+    assert replica.stats["incremental_syncs"] == 1
+    assert replica.stats["changes_applied"] - changes == 3
+
+@pytest.mark.asyncio
+async def test_deleted_tasks_leave_replica(fake, replica):
+    """Test that deletions arrive as deltas and are dropped locally"""
+    account = fake.account(TOKEN)
+    task = account.add_task("Dentist")
+    await replica.refresh()
+
+    account.delete_task(task["id"])
+    await replica.refresh()
+
+    assert replica.tasks == {}
+
+@pytest.mark.asyncio
+async def test_concurrent_refreshes_share_one_request(fake, replica):
+    """Test that simultaneous readers trigger a single sync"""
+    fake.account(TOKEN).add_task("Buy milk")
+
+    await asyncio.gather(replica.get_projects(), replica.get_active_tasks(), replica.refresh())
+
+    assert fake.requests == 1
+
+@pytest.mark.asyncio
+async def test_tool_reads_are_served_from_replica(monkeypatch, fake, replica):
+    """Test that TodoistTools reads go through the replica instead of REST listings"""
+    account = fake.account(TOKEN)
+    work = account.add_project("Work")
+    account.add_task("Write report", project_id=work["id"], priority=4)
+    account.add_task("Buy milk")
+    todoist = TodoistTools()
+    monkeypatch.setattr(tasks_module, "workspace_cache", WorkspaceCache(ttl=0))
+    monkeypatch.setattr(todoist.tenant, "replica", replica)
+
+    projects = await TodoistTools.get_projects()
+    work_tasks = await todoist.get_tasks(project_id=work["id"])
+
+    assert [p["name"] for p in projects] == ["Work"]
+    assert work_tasks == [{"id": work_tasks[0]["id"], "content": "Write report", "due": None, "priority": 4}]
+    assert replica.stats["full_syncs"] == 1
@@ -0,0 +1,73 @@
+import pytest
+from app.agent.tools import search_todoist_tasks
+from app.tools.todoist.cache import WorkspaceCache
+from app.tools.todoist.index import TaskIndex
+
+PROJECTS = [{"id": "p1", "name": "Inbox"}, {"id": "p2", "name": "Home"}]
+
+def task(task_id: str, content: str, project_id: str = "p1", labels: list = None) -> dict:
+    return {"id": task_id, "content": content, "project_id": project_id, "labels": labels or []}
+
+def test_search_matches_content_labels_and_stems():
+    """Test that words, labels and inflected forms find the right tasks"""
+    index = TaskIndex([
+        task("t1", "Buy groceries for the weekend"),
+        task("t2", "Call the dentist", labels=["health"]),
+        task("t3", "Zrobić zakupy"),
+    ], PROJECTS)
+
+    assert [t["id"] for t in index.search("groceries")] == ["t1"]
+    assert [t["id"] for t in index.search("health")] == ["t2"]
+    assert [t["id"] for t in index.search("lista zakupów")] == ["t3"]
+    assert index.search("nothing like that") == []
+
+def test_project_name_ranks_and_lists_tasks():
+    """Test that naming a project boosts its tasks and lists them on its own"""
+    index = TaskIndex([task("t1", "Clean windows"), task("t2", "Clean kitchen", "p2")], PROJECTS)
+
+    assert [t["id"] for t in index.search("clean at home")] == ["t2", "t1"]
+    assert [t["id"] for t in index.search("home")] == ["t2"]
+
+def test_updates_and_removals_keep_postings_current():
+    """Test that replaced and removed tasks leave no stale postings"""
+    index = TaskIndex([task("t1", "Buy milk"), task("t2", "Buy bread")])
+
+    index.add(task("t1", "Sell bike"))
+    index.remove("t2")
+
+    assert index.search("milk") == []
+    assert index.search("bread") == []
+    assert [t["id"] for t in index.search("bike")] == ["t1"]
+    assert "buy" not in index._words
+
+@pytest.mark.asyncio
+async def test_cache_mutations_patch_the_index():
+    """Test that created, updated and removed tasks are reflected without rebuilding the index"""
+    cache = WorkspaceCache(ttl=60)
+
+    async def projects():
+        return PROJECTS
+
+    async def tasks():
+        return [task("t1", "Buy milk")]
+
+    snapshot = await cache.get("user", projects, tasks)
+    index = snapshot.search_index()
+    cache.add_task("user", task("t2", "Book flights"))
+    cache.update_task("user", "t1", {"content": "Buy oat milk"})
+    cache.remove_task("user", "t2")
+
+    assert snapshot.search_index() is index
+    assert [t["content"] for t in index.search("oat")] == ["Buy oat milk"]
+    assert index.search("flights") == []
+
+@pytest.mark.asyncio
+async def test_search_tool_reads_the_workspace_index(fake_todoist, monkeypatch):
+    """Test that the agent tool searches the cached workspace"""
+    from app.agent import tools as agent_tools
+    from app.tools.todoist.tasks import TodoistTools
+    monkeypatch.setattr(agent_tools, "todoist", TodoistTools)
+
+    result = await search_todoist_tasks("rent")
+
+    assert [t["id"] for t in result] == ["t2"]
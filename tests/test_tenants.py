@@ -0,0 +1,113 @@
+import httpx
+import pytest
+from app.core.config import get_settings
+from app.tools.todoist import client as client_module
+from app.tools.todoist import tasks as tasks_module
+from app.tools.todoist.cache import WorkspaceCache
+from app.tools.todoist.client import current_token
+from app.tools.todoist.fake_server import FakeTodoist, create_app
+from app.tools.todoist.tenants import TenantPool
+from app.tools.todoist.tasks import TodoistTools
+
+@pytest.fixture
+def fake(monkeypatch):
+    """Serve every tenant's Sync API requests from one FakeTodoist"""
+    fake = FakeTodoist()
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(fake)))
+    monkeypatch.setattr(client_module, "_http_client", http_client)
+    monkeypatch.setattr(get_settings(), "TODOIST_SYNC_URL", "http://fake/sync/v9")
+    monkeypatch.setattr(tasks_module, "workspace_cache", WorkspaceCache(ttl=60))
+    monkeypatch.setattr(tasks_module, "tenants", TenantPool(max_tenants=2, on_evict=tasks_module.workspace_cache.invalidate))
+    return fake
+
+async def active_tasks(token: str) -> list:
+    reset = current_token.set(token)
+    try:
+        return [task["content"] for task in await TodoistTools.get_active_tasks()]
+    finally:
+        current_token.reset(reset)
+
+@pytest.mark.asyncio
+async def test_tenants_see_only_their_own_workspace(fake):
+    """Test that the request token picks the account, its replica and its cache entry"""
+    fake.account("alice").add_task("Buy milk")
+    fake.account("bob").add_task("Pay rent")
+
+    assert await active_tasks("alice") == ["Buy milk"]
+    assert await active_tasks("bob") == ["Pay rent"]
+    assert len(tasks_module.workspace_cache) == 2
+    assert tasks_module.tenants.get("alice").replica.tasks != tasks_module.tenants.get("bob").replica.tasks
+
+@pytest.mark.asyncio
+async def test_evicted_tenant_drops_its_workspace(fake):
+    """Test that the least recently used tenant and its cached snapshot are evicted"""
+    for token in ("alice", "bob", "carol"):
+        fake.account(token).add_task(f"Task of {token}")
+        await active_tasks(token)
+
+    pool = tasks_module.tenants
+    assert len(pool) == 2
+    assert pool.stats["evictions"] == 1
+    assert len(tasks_module.workspace_cache) == 2
+    assert await active_tasks("alice") == ["Task of alice"]
+    assert pool.stats["created"] == 4
+
+@pytest.mark.asyncio
+async def test_workspace_cache_caps_total_tasks():
+    """Test that the task cap evicts the least recently used snapshots first"""
+    cache = WorkspaceCache(ttl=60, max_users=10, max_tasks=5)
+
+    def loader(count):
+        async def load():
+            return [{"id": str(i), "content": "x"} for i in range(count)]
+        return load
+
+    async def no_projects():
+        return []
+
+    await cache.get("a", no_projects, loader(2))
+    await cache.get("b", no_projects, loader(2))
+    await cache.get("a", no_projects, loader(2))
+    await cache.get("c", no_projects, loader(2))
+
+    assert cache.version("b") == 0
+    assert cache.version("a") and cache.version("c")
+    assert cache.stats["evictions"] == 1
+
+@pytest.mark.asyncio
+async def test_chat_token_is_used_but_never_returned(client, fake_llm, fake_todoist, monkeypatch):
+    """Test that the request token reaches the tools and is kept out of the response"""
+    from app.agent import tools as agent_tools
+    seen = []
+
+    async def get_active_tasks():
+        seen.append(current_token.get())
+        return fake_todoist.tasks
+
+    monkeypatch.setattr(fake_todoist, "get_active_tasks", get_active_tasks, raising=False)
+    fake_llm.responses["understand"] = {"_thinking": "", "list": "List active tasks"}
+    fake_llm.responses["execute"] = [{"tool_name": "get_active_todoist_tasks", "arguments": {}}]
+
+    response = await client.post("/api/v1/chat", json={"input": "What is due?", "todoist_token": "secret-token"})
+
+    assert response.status_code == 200
+    assert seen == ["secret-token"]
+    assert "secret-token" not in response.text
+    assert agent_tools.todoist is fake_todoist
+
+@pytest.mark.asyncio
+async def test_requests_without_a_token_are_rejected(client, fake_llm, fake_todoist, monkeypatch):
+    """Test that no endpoint falls back to the operator's account when tokens are required"""
+    monkeypatch.setattr(get_settings(), "TODOIST_REQUIRE_TOKEN", True)
+    body = {"input": "What is due?"}
+
+    responses = [
+        await client.post("/api/v1/chat", json=body),
+        await client.post("/api/v1/chat/stream", json=body),
+        await client.post("/api/v1/chat/jobs", json=body),
+        await client.post("/api/v1/chat/audio", content=b"RIFF", headers={"Content-Type": "audio/wav"}),
+        await client.post("/api/v1/chat", json={**body, "todoist_token": ""}),
+    ]
+
+    assert [r.status_code for r in responses] == [401] * 5
+    assert fake_llm.calls == []
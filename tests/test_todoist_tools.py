@@ -1,4 +1,6 @@
 import pytest
+from app.core.config import get_settings
+from app.tools.todoist.client import TimeoutHTTPAdapter, close_todoist_clients
 from app.tools.todoist.tasks import TodoistTools
 
 @pytest.mark.asyncio
@@ -66,4 +68,17 @@ async def test_delete_task(todoist_tools: TodoistTools, test_task_data: dict):
     
     # Delete the task
     delete_result = await todoist_tools.delete_task(task_id)
-    assert delete_result["success"] is True 
\ No newline at end of file
+    assert delete_result["success"] is True 
+@pytest.mark.asyncio
+async def test_clients_are_pooled_per_process():
+    """Test that every TodoistTools instance shares one pooled client"""
+    api = TodoistTools().api
+    assert TodoistTools().api is api
+
+    session = api._api._session
+    adapter = session.get_adapter("https://api.todoist.com")
+    assert isinstance(adapter, TimeoutHTTPAdapter)
+    assert adapter._pool_maxsize == get_settings().TODOIST_POOL_SIZE
+
+    await close_todoist_clients()
+    assert TodoistTools().api is not api
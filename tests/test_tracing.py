@@ -0,0 +1,82 @@
+import json
+import threading
+
+from app.core.tracing import FileSink, InMemorySink, TraceExporter
+
+class BlockingSink(InMemorySink):
+    """Sink that holds the worker until released, so the queue can fill up"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def export(self, batch):
+        self.release.wait(5)
+        super().export(batch)
+
+def test_events_are_batched():
+    """Test that queued events are exported in batches"""
+    sink = InMemorySink()
+    exporter = TraceExporter(sink, batch_size=10, flush_interval=0.5)
+
+    for i in range(25):
+        exporter.submit({"name": f"event-{i}"})
+    assert exporter.flush(timeout=5)
+    exporter.shutdown()
+
+    assert [e["name"] for e in sink.events] == [f"event-{i}" for i in range(25)]
+    assert sink.batches == 3
+    assert exporter.stats["exported"] == 25
+
+def test_drop_new_when_queue_full():
+    """Test that new events are dropped once the queue is full"""
+    sink = BlockingSink()
+    exporter = TraceExporter(sink, queue_size=2, batch_size=1, flush_interval=0.01)
+    exporter.submit({"name": "in-flight"})
+    while exporter._queue.qsize():
+        pass
+
+    results = [exporter.submit({"name": f"event-{i}"}) for i in range(4)]
+    sink.release.set()
+    exporter.shutdown()
+
+    assert results == [True, True, False, False]
+    assert exporter.stats["dropped"] == 2
+    assert [e["name"] for e in sink.events] == ["in-flight", "event-0", "event-1"]
+
+def test_drop_oldest_when_queue_full():
+    """Test that the oldest queued events make room for new ones"""
+    sink = BlockingSink()
+    exporter = TraceExporter(sink, queue_size=2, batch_size=1, flush_interval=0.01, drop_policy="drop_oldest")
+    exporter.submit({"name": "in-flight"})
+    while exporter._queue.qsize():
+        pass
+
+    for i in range(4):
+        exporter.submit({"name": f"event-{i}"})
+    sink.release.set()
+    exporter.shutdown()
+
+    assert exporter.stats["dropped"] == 2
+    assert [e["name"] for e in sink.events] == ["in-flight", "event-2", "event-3"]
+
+def test_shutdown_flushes_and_rejects_new_events():
+    """Test that shutdown exports pending events and stops accepting new ones"""
+    sink = InMemorySink()
+    exporter = TraceExporter(sink, batch_size=100, flush_interval=10)
+    exporter.submit({"name": "pending"})
+
+    exporter.shutdown()
+
+    assert [e["name"] for e in sink.events] == ["pending"]
+    assert exporter.submit({"name": "late"}) is False
+
+def test_file_sink_writes_json_lines(tmp_path):
+    """Test that the file sink appends one JSON object per event"""
+    path = tmp_path / "traces.jsonl"
+    exporter = TraceExporter(FileSink(str(path)), flush_interval=0.05)
+    exporter.submit({"name": "understand", "usage": {"total": 12}})
+    exporter.shutdown()
+
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["understand"]
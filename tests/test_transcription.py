@@ -0,0 +1,137 @@
+import asyncio
+import os
+import threading
+
+import pytest
+from app.api import endpoints
+from app.core.config import get_settings
+from app.tools.audio.transcription import (
+    AudioTooLarge,
+    LocalBackend,
+    TranscriptionPool,
+    TranscriptionQueueFull,
+    read_wav,
+    silent_wav,
+    spool_upload,
+)
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = TranscriptionPool(LocalBackend(), max_workers=2, max_queue=2)
+    monkeypatch.setattr(endpoints, "get_transcription_pool", lambda: pool)
+    yield pool
+    pool.shutdown()
+
+def test_read_wav(tmp_path):
+    """Test that the duration and transcript come from the chunk headers"""
+    path = tmp_path / "command.wav"
+    path.write_bytes(silent_wav(1.5, "Add milk"))
+
+    assert read_wav(str(path)) == (1.5, "Add milk")
+    path.write_bytes(b"RIFF")
+    with pytest.raises(ValueError):
+        read_wav(str(path))
+
+@pytest.mark.asyncio
+async def test_spool_upload_enforces_size_limit(tmp_path):
+    """Test that an oversized upload is rejected and its file removed"""
+    async def chunks():
+        for _ in range(4):
+            yield b"x" * 100
+
+    path = await spool_upload(chunks(), max_bytes=400, directory=str(tmp_path))
+    assert os.path.getsize(path) == 400
+    with pytest.raises(AudioTooLarge):
+        await spool_upload(chunks(), max_bytes=399, directory=str(tmp_path))
+    assert os.listdir(tmp_path) == [os.path.basename(path)]
+
+@pytest.mark.asyncio
+async def test_pool_bounds_queue_and_reports_rtf(tmp_path):
+    """Test that submissions beyond workers plus queue fail fast and RTF is measured"""
+    paths = [tmp_path / f"command-{i}.wav" for i in range(3)]
+    for path in paths:
+        path.write_bytes(silent_wav(1.0, "Add milk"))
+    pool = TranscriptionPool(LocalBackend(rtf=0.1), max_workers=1, max_queue=1)
+
+    results = await asyncio.gather(*(pool.transcribe(str(path)) for path in paths), return_exceptions=True)
+    pool.shutdown()
+
+    assert [type(r).__name__ for r in results].count("TranscriptionQueueFull") == 1
+    assert all(r.text == "Add milk" for r in results if not isinstance(r, TranscriptionQueueFull))
+    stats = pool.stats
+    assert (stats["completed"], stats["rejected"], stats["max_queue_depth"], stats["queue_depth"]) == (2, 1, 1, 0)
+    assert 0.09 < stats["real_time_factor"] < 0.5
+    assert os.listdir(tmp_path) == []
+
+@pytest.mark.asyncio
+async def test_audio_chat_runs_transcript_through_agent(client, fake_llm, fake_todoist, pool):
+    """Test that raw and multipart uploads are transcribed and processed like text input"""
+    inputs = []
+
+    def understand(messages):
+        inputs.append(messages[1]["content"])
+        return {"_thinking": "", "complete": "Complete 'Buy milk'"}
+
+    fake_llm.responses["understand"] = understand
+    fake_llm.responses["execute"] = [{"tool_name": "complete_todoist_task", "arguments": {"task_id": "t1"}}]
+
+    raw = await client.post("/api/v1/chat/audio", content=silent_wav(2.0, "Mark buy milk as done"),
+                            headers={"content-type": "audio/wav"})
+    multipart = await client.post("/api/v1/chat/audio", files={"file": ("a.wav", silent_wav(1.0, "Buy milk is done"))})
+
+    assert raw.status_code == 200 and multipart.status_code == 200
+    assert inputs == ["Mark buy milk as done", "Buy milk is done"]
+    transcription = raw.json()["details"]["transcription"]
+    assert transcription["text"] == "Mark buy milk as done"
+    assert transcription["audio_seconds"] == 2.0
+    assert fake_todoist.calls[0][0] == "complete_task"
+    assert pool.stats["completed"] == 2
+
+@pytest.mark.asyncio
+async def test_audio_chat_rejects_bad_uploads(client, pool, monkeypatch):
+    """Test the status codes for oversized, unreadable and silent recordings"""
+    monkeypatch.setattr(get_settings(), "AUDIO_MAX_BYTES", 1000)
+
+    too_large = await client.post("/api/v1/chat/audio", content=silent_wav(1.0, "Add milk"))
+    not_audio = await client.post("/api/v1/chat/audio", content=b"hello")
+    silent = await client.post("/api/v1/chat/audio", content=silent_wav(0.01))
+
+    assert too_large.status_code == 413
+    assert not_audio.status_code == 422
+    assert silent.status_code == 422
+
+@pytest.mark.asyncio
+async def test_disconnected_client_keeps_its_slot_until_the_worker_finishes(tmp_path):
+    """Test that cancelling a transcription keeps its slot and file while the worker still runs"""
+    release = threading.Event()
+
+    class BlockingBackend:
+        def transcribe(self, path):
+            release.wait(5)
+            with open(path) as f:
+                return f.read(), 1.0
+
+    paths = [tmp_path / f"command-{i}.wav" for i in range(3)]
+    for path in paths:
+        path.write_text("Add milk")
+    pool = TranscriptionPool(BlockingBackend(), max_workers=1, max_queue=0)
+    request = asyncio.create_task(pool.transcribe(str(paths[0])))
+    await asyncio.sleep(0.05)
+    request.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await request
+
+    with pytest.raises(TranscriptionQueueFull):
+        await pool.transcribe(str(paths[1]))
+    assert paths[0].exists() and not paths[1].exists()
+    release.set()
+    for _ in range(100):
+        if pool.stats["completed"]:
+            break
+        await asyncio.sleep(0.01)
+    result = await pool.transcribe(str(paths[2]))
+    pool.shutdown()
+
+    assert result.text == "Add milk"
+    assert os.listdir(tmp_path) == []
+    assert (pool.stats["completed"], pool.stats["rejected"], pool.stats["running"]) == (2, 1, 0)
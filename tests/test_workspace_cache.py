@@ -0,0 +1,172 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from app.agent.prompts import execute_prompt, understand_prompt
+from app.tools.todoist import tasks as tasks_module
+from app.tools.todoist.cache import WorkspaceCache
+from app.tools.todoist.client import api_calls
+from app.tools.todoist.tasks import TodoistTools
+
+PROJECTS = [{"id": "p1", "name": "Inbox"}]
+TASKS = [
+    {"id": "t1", "content": "Buy milk", "priority": 1, "project_id": "p1"},
+    {"id": "t2", "content": "Call mom", "priority": 1, "project_id": "p1"},
+]
+
+class Loaders:
+    def __init__(self):
+        self.calls = {"projects": 0, "tasks": 0}
+
+    async def projects(self):
+        self.calls["projects"] += 1
+        await asyncio.sleep(0.01)
+        return list(PROJECTS)
+
+    async def tasks(self):
+        self.calls["tasks"] += 1
+        await asyncio.sleep(0.01)
+        return list(TASKS)
+
+@pytest.mark.asyncio
+async def test_snapshot_is_reused_within_ttl():
+    """Test that concurrent and repeated reads share one load"""
+    cache = WorkspaceCache(ttl=60)
+    loaders = Loaders()
+
+    snapshots = await asyncio.gather(*(cache.get("user", loaders.projects, loaders.tasks) for _ in range(3)))
+    await cache.get("user", loaders.projects, loaders.tasks)
+
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
+    assert loaders.calls == {"projects": 1, "tasks": 1}
+    assert cache.stats["misses"] == 1
+    assert cache.stats["hits"] == 3
+
+@pytest.mark.asyncio
+async def test_snapshot_expires_after_ttl():
+    """Test that an expired snapshot is reloaded"""
+    cache = WorkspaceCache(ttl=0)
+    loaders = Loaders()
+
+    await cache.get("user", loaders.projects, loaders.tasks)
+    await cache.get("user", loaders.projects, loaders.tasks)
+
+    assert loaders.calls == {"projects": 2, "tasks": 2}
+
+@pytest.mark.asyncio
+async def test_mutations_patch_snapshot_in_place():
+    """Test that completed, created and updated tasks are applied without a reload"""
+    cache = WorkspaceCache(ttl=60)
+    loaders = Loaders()
+    snapshot = await cache.get("user", loaders.projects, loaders.tasks)
+    version = snapshot.version
+
+    cache.remove_task("user", "t1")
+    cache.add_task("user", {"id": "t3", "content": "Pay rent", "project_id": "p1"})
+    cache.update_task("user", "t2", {"content": "Call dad"})
+    snapshot = await cache.get("user", loaders.projects, loaders.tasks)
+
+    assert [t["content"] for t in snapshot.tasks] == ["Call dad", "Pay rent"]
+    assert snapshot.version > version
+    assert loaders.calls == {"projects": 1, "tasks": 1}
+
+@pytest.mark.asyncio
+async def test_invalidate_tasks_keeps_projects():
+    """Test that a task invalidation reloads only the task list"""
+    cache = WorkspaceCache(ttl=60)
+    loaders = Loaders()
+    await cache.get("user", loaders.projects, loaders.tasks)
+
+    cache.invalidate_tasks("user")
+    await cache.get("user", loaders.projects, loaders.tasks)
+
+    assert loaders.calls == {"projects": 1, "tasks": 2}
+
+@pytest.mark.asyncio
+async def test_prompts_share_one_snapshot(monkeypatch):
+    """Test that understand and execute prompts of one request reuse the snapshot"""
+    cache = WorkspaceCache(ttl=60)
+    loaders = Loaders()
+    monkeypatch.setattr(tasks_module, "workspace_cache", cache)
+    monkeypatch.setattr(TodoistTools, "_fetch_projects", lambda self: loaders.projects())
+    monkeypatch.setattr(TodoistTools, "_fetch_active_tasks", lambda self: loaders.tasks())
+
+    prompt = await understand_prompt()
+    for _ in range(4):
+        await execute_prompt("tools")
+
+    assert "Buy milk" in prompt
+    assert loaders.calls == {"projects": 1, "tasks": 1}
+    assert cache.stats == {"hits": 4, "misses": 1, "invalidations": 0, "evictions": 0}
+
+@pytest.mark.asyncio
+async def test_complete_task_removes_it_from_cache(monkeypatch):
+    """Test that a completed task disappears from the cached snapshot"""
+    cache = WorkspaceCache(ttl=60)
+    loaders = Loaders()
+    monkeypatch.setattr(tasks_module, "workspace_cache", cache)
+    monkeypatch.setattr(TodoistTools, "_fetch_projects", lambda self: loaders.projects())
+    monkeypatch.setattr(TodoistTools, "_fetch_active_tasks", lambda self: loaders.tasks())
+    todoist = TodoistTools()
+
+    async def close_task(task_id):
+        return True
+
+    monkeypatch.setattr(TodoistTools, "api", SimpleNamespace(close_task=close_task))
+    await TodoistTools.get_workspace_snapshot()
+
+    result = await todoist.complete_task("t1")
+    tasks = await TodoistTools.get_active_tasks()
+
+    assert result == {"success": True, "content": "Buy milk"}
+    assert [t["id"] for t in tasks] == ["t2"]
+    assert loaders.calls["tasks"] == 1
+
+@pytest.mark.asyncio
+async def test_update_is_a_single_request(monkeypatch):
+    """Test that an update skips the pre-read and that tasks missing from the cache are left to Todoist"""
+    cache = WorkspaceCache(ttl=60)
+    loaders = Loaders()
+    monkeypatch.setattr(tasks_module, "workspace_cache", cache)
+    monkeypatch.setattr(TodoistTools, "_fetch_projects", lambda self: loaders.projects())
+    monkeypatch.setattr(TodoistTools, "_fetch_active_tasks", lambda self: loaders.tasks())
+    todoist = TodoistTools()
+    requests = []
+
+    async def update_task(task_id, **fields):
+        requests.append((task_id, fields))
+        if task_id == "t9":
+            raise LookupError("404 Not Found")
+        return True
+
+    monkeypatch.setattr(TodoistTools, "api", SimpleNamespace(update_task=update_task))
+    await TodoistTools.get_workspace_snapshot()
+    calls = []
+    token = api_calls.set(calls)
+    try:
+        updated = await todoist.update_task("t1", title="Buy oat milk")
+        # Created in the Todoist app after the task list was cached
+        uncached = await todoist.update_task("t8", title="New task")
+        missing = await todoist.update_task("t9", title="Nothing")
+    finally:
+        api_calls.reset(token)
+
+    assert updated["success"] is True
+    assert uncached["success"] is True
+    assert missing == {"success": False, "error": "404 Not Found"}
+    assert [task_id for task_id, _ in requests] == ["t1", "t8", "t9"]
+    assert calls == ["update_task"] * 3
+
+@pytest.mark.asyncio
+async def test_listing_reports_todoist_errors(monkeypatch):
+    """Test that a failed read is an error result, not an empty task list"""
+    async def unavailable(self):
+        raise ConnectionError("Todoist is unavailable")
+
+    monkeypatch.setattr(tasks_module, "workspace_cache", WorkspaceCache(ttl=60))
+    monkeypatch.setattr(TodoistTools, "_fetch_projects", unavailable)
+    monkeypatch.setattr(TodoistTools, "_fetch_active_tasks", unavailable)
+
+    result = await TodoistTools.get_active_tasks()
+
+    assert result == {"success": False, "error": "Todoist is unavailable"}